@@ -2,8 +2,23 @@ import logging
 from flask import Flask
 from .models import db, connect_db, bcrypt
 from .config import Config, Testing
+from .structured_logging import structured_logging
+from .metrics import metrics
+from .trace_sampling import trace_sampler
+from .http_client import http_client
+from .quota import quota
+from .circuit_breaker import circuits
+from .cache import cache
+from .jobs import jobs
+from .commands import register_commands
+from .json_provider import FastJSONProvider
+from .middleware.compression import compress
+from .middleware.query_budget import query_budget
+from .middleware.profiler import profiler
 from .routes.users import users_bp as users
 from .routes.books import books_bp as books
+from .routes.jobs import jobs_bp
+from .routes.admin import admin_bp
 from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
@@ -17,16 +32,7 @@ load_dotenv()
 
 jwt = JWTManager()
 
-# Global logging setup
-logging.basicConfig(
-    level=logging.DEBUG,  # Use DEBUG for development, change to INFO for production
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-    handlers=[
-        logging.StreamHandler(),  # Logs to console
-        logging.FileHandler("app.log"),  # Saves logs to a file
-    ],
-)
-logger = logging.getLogger(__name__)  # Creates a logger for this module
+logger = logging.getLogger(__name__)
 
 def create_app(config_name="Config"):
     """Flask Application factory function: Creates flask app context, initializes
@@ -35,6 +41,7 @@ def create_app(config_name="Config"):
     logger.info("Initializing Flask app...")  # Example log message
     
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
     
     # Sets the configuration class based on the 'config_name' argument
     if config_name == 'Config':
@@ -46,15 +53,16 @@ def create_app(config_name="Config"):
     else:
         logger.error(f"Invalid configuration name: {config_name}")
         raise ValueError("Invalid configuration name")
+
+    structured_logging.init_app(app)
     
-    # Initialize Sentry inside the app context
+    # Initialize Sentry inside the app context; traces are sampled per route
+    trace_sampler.init_app(app)
     sentry_sdk.init(
         dsn=os.environ.get("SENTRY_DSN", ""),
         integrations=[FlaskIntegration()],
-        traces_sample_rate=1.0,
-        _experiments={
-            "continuous_profiling_auto_start": True,
-        },
+        traces_sampler=trace_sampler.traces_sampler,
+        before_send_transaction=trace_sampler.before_send_transaction,
     )
     logger.info("Sentry initialized.")
 
@@ -62,6 +70,15 @@ def create_app(config_name="Config"):
     db.init_app(app)
     bcrypt.init_app(app)
     jwt.init_app(app)
+    profiler.init_app(app)
+    metrics.init_app(app)
+    query_budget.init_app(app)
+    http_client.init_app(app)
+    quota.init_app(app)
+    circuits.init_app(app)
+    cache.init_app(app)
+    jobs.init_app(app)
+    compress.init_app(app)
     migrate = Migrate(app, db)
     CORS(app)
     logger.info("Extensions initialized.")
@@ -69,8 +86,12 @@ def create_app(config_name="Config"):
     # Register blueprints with URL prefixes
     app.register_blueprint(users, url_prefix='/api/users')
     app.register_blueprint(books, url_prefix='/api/books')
+    app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
     logger.debug("Blueprints registered.")
 
+    register_commands(app)
+
     # Simple route for index page
     @app.route("/")
     def index():
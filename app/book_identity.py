@@ -0,0 +1,124 @@
+import hashlib
+import re
+
+from sqlalchemy import case, or_
+
+from .models import Book
+
+# Google ids of NYT-hydrated rows are "isbn_<isbn13>"
+ISBN_ID_PREFIX = "isbn_"
+
+# Placeholder titles/authors that must never be used to match two books
+UNKNOWN_VALUES = {"", "unknown title", "unknown author"}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_text(value):
+    """Lowercase and reduce to ASCII letters/digits separated by single spaces."""
+    return _NON_ALNUM.sub(" ", (value or "").lower()).strip()
+
+
+def identity_hash(title, authors):
+    """
+    Hash of the normalized title and author string, or None when either is
+    missing. The books.identity_hash backfill (migration 7d2e5a1c9f43)
+    computes the same value in SQL, so keep the two in step.
+    """
+    title = normalize_text(title)
+    authors = normalize_text(authors)
+    if title in UNKNOWN_VALUES or authors in UNKNOWN_VALUES:
+        return None
+    return hashlib.md5(f"{title}|{authors}".encode("utf-8")).hexdigest()
+
+
+def clean_isbn(value):
+    """Strip separators from an ISBN; None unless 10 or 13 characters remain."""
+    value = re.sub(r"[^0-9Xx]", "", value or "").upper()
+    return value if len(value) in (10, 13) else None
+
+
+def isbn10_to_13(isbn10):
+    """Convert an ISBN-10 to its 978-prefixed ISBN-13."""
+    core = "978" + isbn10[:9]
+    total = sum(int(digit) * (3 if i % 2 else 1) for i, digit in enumerate(core))
+    return core + str((10 - total % 10) % 10)
+
+
+def isbns_from_volume(volume_info):
+    """(isbn_10, isbn_13) from a Google volumeInfo's industryIdentifiers."""
+    isbns = {"ISBN_10": None, "ISBN_13": None}
+    for identifier in volume_info.get("industryIdentifiers", []):
+        if identifier.get("type") in isbns:
+            isbns[identifier["type"]] = clean_isbn(identifier.get("identifier"))
+    return isbns["ISBN_10"], isbns["ISBN_13"]
+
+
+def book_identity(google_books_id, title, authors, isbn_10=None, isbn_13=None, volume_id=None):
+    """
+    Canonical identity columns for a book row: volume_id, isbn_10, isbn_13 and
+    identity_hash. `authors` is the comma-separated string stored on Book.
+    ISBN-keyed rows only get a volume_id when one is passed in.
+    """
+    if google_books_id and google_books_id.startswith(ISBN_ID_PREFIX):
+        isbn = clean_isbn(google_books_id[len(ISBN_ID_PREFIX):])
+        if isbn and len(isbn) == 13:
+            isbn_13 = isbn_13 or isbn
+        elif isbn:
+            isbn_10 = isbn_10 or isbn
+    else:
+        volume_id = google_books_id
+
+    isbn_10, isbn_13 = clean_isbn(isbn_10), clean_isbn(isbn_13)
+    if isbn_10 and len(isbn_10) != 10:
+        isbn_10 = None
+    if isbn_13 and len(isbn_13) != 13:
+        isbn_13 = None
+    if isbn_10 and not isbn_13 and isbn_10[:9].isdigit():
+        isbn_13 = isbn10_to_13(isbn_10)
+
+    return {
+        "volume_id": volume_id,
+        "isbn_10": isbn_10,
+        "isbn_13": isbn_13,
+        "identity_hash": identity_hash(title, authors),
+    }
+
+
+def with_identity(row):
+    """Return `row` (a books insert dict) with its identity columns filled in."""
+    identity = book_identity(
+        row["google_books_id"], row.get("title"), row.get("authors"), row.get("isbn_10"), row.get("isbn_13"),
+        row.get("volume_id"))
+    return {**row, **identity}
+
+
+def book_matches(google_books_id, identity):
+    """
+    Conditions matching a stored Book on `google_books_id` or any part of
+    `identity`, strongest identifier first.
+    """
+    conditions = [Book.google_books_id == google_books_id]
+    for column in ("volume_id", "isbn_13", "isbn_10", "identity_hash"):
+        if identity.get(column):
+            conditions.append(getattr(Book, column) == identity[column])
+    return conditions
+
+
+def find_book(google_books_id, identity):
+    """
+    The stored Book matching any part of `identity`, or None.
+
+    One query; each branch of the OR is an index lookup. When several rows
+    match, the strongest identifier wins: google_books_id, then volume id,
+    ISBN-13, ISBN-10 and finally the title/author hash. The ranking happens in
+    SQL, so only the winning row is loaded however many rows share a hash.
+    """
+    conditions = book_matches(google_books_id, identity)
+    strength = [(match, rank) for rank, match in enumerate(conditions)]
+    return (
+        Book.query
+        .filter(or_(*conditions))
+        .order_by(case(*strength, else_=len(strength)), Book.id)
+        .first()
+    )
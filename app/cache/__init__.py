@@ -0,0 +1,113 @@
+import threading
+from collections import defaultdict
+from functools import wraps
+
+from .base import CacheBackend
+from .memory import MemoryBackend
+from .sqlite import SQLiteBackend
+
+DEFAULT_TTL = 60 * 60  # 1 hour
+
+
+class Cache:
+    """
+    Namespaced application cache (search, genre, detail, isbn, ...).
+
+    Each namespace gets its own TTL from `CACHE_TTLS`; all namespaces share one
+    backend chosen by `CACHE_BACKEND`: "memory" (a bounded per-process LRU) or
+    "sqlite" (a file shared by every worker on the host, so one worker's
+    upstream fetch serves the others). Hits and misses are counted per namespace.
+    """
+
+    def __init__(self, app=None):
+        self.backend = MemoryBackend()
+        self.ttls = {}
+        self.default_ttl = DEFAULT_TTL
+        self.stale_ttl = 0
+        self._counters = defaultdict(lambda: {"hits": 0, "misses": 0, "stale_hits": 0})
+        self._counter_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.backend = self._build_backend(app.config)
+        self.ttls = dict(app.config.get("CACHE_TTLS", {}))
+        self.default_ttl = app.config.get("CACHE_DEFAULT_TTL", DEFAULT_TTL)
+        self.stale_ttl = app.config.get("CACHE_STALE_TTL", 0)
+        app.extensions["cache"] = self
+
+    @staticmethod
+    def _build_backend(config):
+        backend = config.get("CACHE_BACKEND", "memory")
+        if backend == "memory":
+            return MemoryBackend(
+                max_entries=config.get("CACHE_MAX_ENTRIES", 5000),
+                max_bytes=config.get("CACHE_MAX_BYTES", 64 * 1024 * 1024),
+            )
+        if backend == "sqlite":
+            return SQLiteBackend(
+                config["CACHE_SQLITE_PATH"],
+                max_entries=config.get("CACHE_SQLITE_MAX_ENTRIES", 50000),
+            )
+        raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+
+    @staticmethod
+    def _key(namespace, key):
+        return f"{namespace}:{key}"
+
+    def _count(self, namespace, outcome):
+        with self._counter_lock:
+            self._counters[namespace][outcome] += 1
+
+    def get(self, namespace, key, default=None, allow_stale=False):
+        """
+        Return the cached value or `default`. With `allow_stale`, an expired
+        entry still inside its CACHE_STALE_TTL window is returned too (the
+        degraded-mode fallback when the upstream is unavailable).
+        """
+        found, value = self.backend.get(self._key(namespace, key), allow_stale=allow_stale)
+        self._count(namespace, ("stale_hits" if allow_stale else "hits") if found else "misses")
+        return value if found else default
+
+    def set(self, namespace, key, value, ttl=None):
+        self.backend.set(
+            self._key(namespace, key), value, ttl or self.ttls.get(namespace, self.default_ttl), self.stale_ttl)
+
+    def delete(self, namespace, key):
+        self.backend.delete(self._key(namespace, key))
+
+    def clear(self):
+        self.backend.clear()
+
+    def acquire_lock(self, name, ttl):
+        """Take a lock visible to every process sharing the backend; expires after `ttl`."""
+        return self.backend.add(self._key("lock", name), True, ttl)
+
+    def release_lock(self, name):
+        self.backend.delete(self._key("lock", name))
+
+    def cached(self, namespace, ttl=None):
+        """Decorator caching a function's result under `namespace`, keyed on its arguments."""
+        missing = object()
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                key = f"{func.__name__}_{args}_{sorted(kwargs.items())}"
+                result = self.get(namespace, key, missing)
+                if result is not missing:
+                    return result
+                result = func(*args, **kwargs)
+                self.set(namespace, key, result, ttl)
+                return result
+            return wrapper
+        return decorator
+
+    def stats(self):
+        """Backend size/eviction stats plus hit/miss counters per namespace."""
+        with self._counter_lock:
+            namespaces = {ns: dict(c) for ns, c in self._counters.items()}
+        return {**self.backend.stats(), "namespaces": namespaces}
+
+
+cache = Cache()
@@ -0,0 +1,28 @@
+class CacheBackend:
+    """
+    Interface every cache store implements.
+
+    Keys are strings and values are JSON-compatible data. `get` returns a
+    `(found, value)` pair so cached falsy values are distinguishable from misses.
+    Entries set with `stale_ttl` are kept that many seconds past their TTL,
+    and are only returned by `get(key, allow_stale=True)` during that time.
+    """
+
+    def get(self, key, allow_stale=False):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None, stale_ttl=0):
+        raise NotImplementedError
+
+    def add(self, key, value, ttl=None):
+        """Store `value` only if `key` is absent or expired; return True if stored."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
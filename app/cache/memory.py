@@ -0,0 +1,102 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from .base import CacheBackend
+
+
+class MemoryBackend(CacheBackend):
+    """
+    Thread-safe in-process cache bounded by entry count and approximate byte size.
+
+    Entries are evicted least-recently-used first once either limit is exceeded,
+    and expire after their TTL. Sizes are estimated from the pickled value.
+    """
+
+    def __init__(self, max_entries=5000, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # key -> (value, size, expires_at, stale_until)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _sizeof(value):
+        try:
+            return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return 1024  # Unpicklable values still count against the budget
+
+    def get(self, key, allow_stale=False):
+        """Return (found, value). Entries past their stale window are dropped on access."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            value, size, expires_at, stale_until = entry
+            now = time.time()
+            if expires_at is not None and expires_at <= now:
+                if stale_until <= now:
+                    self._remove(key)
+                    self.expirations += 1
+                    return False, None
+                if not allow_stale:
+                    return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, ttl=None, stale_ttl=0):
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return  # Never let one value flush the whole cache
+        expires_at = time.time() + ttl if ttl else None
+        stale_until = expires_at + stale_ttl if expires_at is not None else None
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, size, expires_at, stale_until)
+            self._bytes += size
+            self._evict()
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            found, _ = self.get(key)
+            if found:
+                return False
+            self.set(key, value, ttl)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        _, size, _, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def _evict(self):
+        while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+            key = next(iter(self._data))
+            self._remove(key)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+
+from ..sqlite_file import SQLiteFile
+from .base import CacheBackend
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Cache shared by every worker process on one host, stored in a SQLite file.
+
+    Uses WAL mode so readers in other workers never block on a writer. Each
+    thread keeps its own connection. Expired rows are purged and the table is
+    trimmed to `max_entries` (oldest writes first) every `purge_interval` sets.
+    """
+
+    def __init__(self, path, max_entries=50000, purge_interval=500):
+        self.path = path
+        self.max_entries = max_entries
+        self.purge_interval = purge_interval
+        self._sets = 0
+        self._sets_lock = threading.Lock()
+        self.evictions = 0
+
+        self.file = SQLiteFile(path)
+        conn = self.file.connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL,"
+            " stale_until REAL,"
+            " stored_at REAL NOT NULL)"
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(cache)")}
+        if "stale_until" not in columns:
+            # Cache files created before stale entries were kept
+            conn.execute("ALTER TABLE cache ADD COLUMN stale_until REAL")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_stored_at ON cache (stored_at)")
+
+    def get(self, key, allow_stale=False):
+        row = self.file.connection().execute(
+            "SELECT value, expires_at, stale_until FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return False, None
+        value, expires_at, stale_until = row
+        now = time.time()
+        if expires_at is not None and expires_at <= now:
+            if not allow_stale or (stale_until or expires_at) <= now:
+                return False, None
+        return True, json.loads(value)
+
+    def set(self, key, value, ttl=None, stale_ttl=0):
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        self.file.connection().execute(
+            "INSERT INTO cache (key, value, expires_at, stale_until, stored_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at, "
+            "stale_until = excluded.stale_until, stored_at = excluded.stored_at",
+            (key, json.dumps(value), expires_at, expires_at + stale_ttl if expires_at else None, now),
+        )
+        with self._sets_lock:
+            self._sets += 1
+            purge = self._sets % self.purge_interval == 0
+        if purge:
+            self._purge()
+
+    def add(self, key, value, ttl=None):
+        now = time.time()
+        cursor = self.file.connection().execute(
+            "INSERT INTO cache (key, value, expires_at, stale_until, stored_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at, "
+            "stale_until = excluded.stale_until, stored_at = excluded.stored_at "
+            "WHERE cache.expires_at IS NOT NULL AND cache.expires_at <= ?",
+            (key, json.dumps(value), now + ttl if ttl else None, now + ttl if ttl else None, now, now),
+        )
+        return cursor.rowcount == 1
+
+    def _purge(self):
+        conn = self.file.connection()
+        conn.execute(
+            "DELETE FROM cache WHERE expires_at IS NOT NULL AND COALESCE(stale_until, expires_at) <= ?",
+            (time.time(),),
+        )
+        cursor = conn.execute(
+            "DELETE FROM cache WHERE key IN ("
+            " SELECT key FROM cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        self.evictions += max(cursor.rowcount, 0)
+
+    def delete(self, key):
+        self.file.connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        self.file.connection().execute("DELETE FROM cache")
+
+    def stats(self):
+        entries, size = self.file.connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM cache"
+        ).fetchone()
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,148 @@
+import threading
+import time
+
+import requests
+from flask import g, has_request_context
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """The upstream's circuit is open; the call was not attempted."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Per-process circuit for one upstream.
+
+    Closed: calls go through, and `failure_threshold` consecutive failures
+    (connection errors, timeouts, 5xx) open it.
+    Open: calls fail immediately with CircuitOpenError for `recovery_timeout`
+    seconds.
+    Half-open: after that, up to `half_open_max_calls` probe calls go through.
+    A successful probe closes the circuit; a failed one reopens it.
+    """
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30, half_open_max_calls=1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probes = 0
+        self.times_opened = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now."""
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self.opened_at + self.recovery_timeout - time.monotonic()
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.name} circuit is open", retry_after=remaining)
+                self.state = HALF_OPEN
+                self.probes = 0
+            if self.state == HALF_OPEN:
+                if self.probes >= self.half_open_max_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.name} circuit is half-open; probe in flight")
+                self.probes += 1
+
+    def cancel_call(self):
+        """The call allowed by `before_call` was never made."""
+        with self._lock:
+            if self.state == HALF_OPEN and self.probes:
+                self.probes -= 1
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.probes = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.times_opened += 1
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+class CircuitBreakers:
+    """
+    Registry of circuit breakers per upstream, configured by `CIRCUIT_BREAKERS`
+    ({name: {hosts, failure_threshold, recovery_timeout, half_open_max_calls}}).
+    Also adds the `X-Degraded` header to responses served from a fallback
+    (see `mark_degraded`).
+    """
+
+    def __init__(self, app=None):
+        self.breakers = {}
+        self.hosts = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.breakers = {}
+        self.hosts = {}
+        for name, settings in app.config.get("CIRCUIT_BREAKERS", {}).items():
+            self.breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=settings.get("failure_threshold", 5),
+                recovery_timeout=settings.get("recovery_timeout", 30),
+                half_open_max_calls=settings.get("half_open_max_calls", 1),
+            )
+            for host in settings.get("hosts", []):
+                self.hosts[host] = name
+        app.after_request(self._degraded_header)
+        app.extensions["circuit_breakers"] = self
+
+    def for_host(self, host):
+        name = self.hosts.get(host)
+        return self.breakers.get(name) if name else None
+
+    def is_open(self, name):
+        breaker = self.breakers.get(name)
+        return breaker is not None and breaker.state != CLOSED
+
+    @staticmethod
+    def _degraded_header(response):
+        reasons = g.get("degraded") if has_request_context() else None
+        if reasons:
+            response.headers["X-Degraded"] = ", ".join(sorted(reasons))
+            # Don't let clients or proxies hold on to a fallback answer
+            response.headers["Cache-Control"] = "no-store"
+        return response
+
+    def stats(self):
+        return {name: breaker.stats() for name, breaker in self.breakers.items()}
+
+
+def mark_degraded(reason):
+    """Flag the current response as served from a fallback (`X-Degraded: <reason>`)."""
+    if has_request_context():
+        g.setdefault("degraded", set()).add(reason)
+
+
+circuits = CircuitBreakers()
@@ -0,0 +1,113 @@
+import json
+import threading
+import click
+from sqlalchemy import text
+from .models import Book, BookRanking, Job, UserBooks, db
+from .jobs import jobs
+
+
+def hot_queries():
+    """(description, statement, index it must use) for each hot query path."""
+    return [
+        (
+            "get_user_books: user_books by user_id and status",
+            UserBooks.query.filter(
+                UserBooks.user_id == 1,
+                UserBooks.status.in_(['currently_reading', 'previously_read', 'want_to_read']),
+            ).statement,
+            "ix_user_books_user_id_status",
+        ),
+        (
+            "save_book: user_books by (user_id, book_id)",
+            UserBooks.query.filter_by(user_id=1, book_id=1).statement,
+            "uq_user_books_user_id_book_id",
+        ),
+        (
+            "build_featured_lists_from_db: book_rankings ordered by (list_name, rank)",
+            # Only the rankings scan: each ranking then joins its book by
+            # books_pkey, and on near-empty test tables the planner would
+            # rather merge-join the two, hiding the ordered scan
+            db.session.query(BookRanking)
+            .order_by(BookRanking.list_name, BookRanking.rank)
+            .statement,
+            "ix_book_rankings_list_name_rank",
+        ),
+        (
+            "find_book: books by ISBN-13",
+            Book.query.filter_by(isbn_13="9780000000000").statement,
+            "ix_books_isbn_13",
+        ),
+        (
+            "find_book: books by title/author identity hash",
+            Book.query.filter_by(identity_hash="0" * 32).statement,
+            "ix_books_identity_hash",
+        ),
+        (
+            "job queue claim: oldest due queued job",
+            Job.query.filter(Job.status == "queued", Job.run_at <= db.func.now())
+            .order_by(Job.run_at, Job.id).limit(1).statement,
+            "ix_jobs_status_run_at",
+        ),
+    ]
+
+
+def _index_names(plan):
+    """Collect every index referenced anywhere in an EXPLAIN (FORMAT JSON) plan tree."""
+    names = set()
+    if "Index Name" in plan:
+        names.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        names |= _index_names(child)
+    return names
+
+
+def explain_index_usage(statement):
+    """
+    EXPLAIN `statement` with sequential scans disabled and return the indexes
+    its plan uses. Disabling seqscans keeps the check meaningful on small
+    tables, where Postgres would otherwise prefer a seq scan.
+    """
+    sql = str(statement.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}))
+    try:
+        db.session.execute(text("SET LOCAL enable_seqscan = off"))
+        plan = db.session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    finally:
+        db.session.rollback()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return _index_names(plan[0]["Plan"])
+
+
+def register_commands(app):
+    @app.cli.command("check-query-plans")
+    def check_query_plans():
+        """Fail if any hot query path doesn't use its index."""
+        failures = 0
+        for description, statement, index_name in hot_queries():
+            used = explain_index_usage(statement)
+            if index_name in used:
+                click.echo(f"ok    {description} -> {index_name}")
+            else:
+                failures += 1
+                click.echo(f"FAIL  {description}: expected {index_name}, plan used {sorted(used) or 'no index'}")
+        if failures:
+            raise SystemExit(1)
+
+    @app.cli.command("run-jobs")
+    @click.option("--workers", default=None, type=int, help="Worker threads (default: JOB_QUEUE_WORKERS).")
+    def run_jobs(workers):
+        """Run job queue workers in the foreground until interrupted."""
+        count = workers or app.config.get("JOB_QUEUE_WORKERS", 4) or 1
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=jobs.work, args=(stop,), name=f"job-worker-{i}", daemon=True)
+            for i in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        click.echo(f"Running {count} job workers ({app.config.get('JOB_QUEUE_BACKEND')} backend)")
+        try:
+            while any(thread.is_alive() for thread in threads):
+                stop.wait(1)
+        except KeyboardInterrupt:
+            stop.set()
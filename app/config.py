@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 
 class Config:
@@ -12,6 +13,172 @@ class Config:
     # Set JWT token expiration time
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
 
+    # Outbound HTTP client (Google Books / NYT)
+    HTTP_CONNECT_TIMEOUT = 3.05
+    HTTP_READ_TIMEOUT = 10
+    HTTP_MAX_RETRIES = 2
+    HTTP_BACKOFF_FACTOR = 0.3
+    HTTP_DEFAULT_POOL_SIZE = 10
+    HTTP_POOL_SIZES = {
+        'www.googleapis.com': 20,
+        'api.nytimes.com': 4,
+    }
+
+    # Shared request budget per upstream (see app/quota.py): 'sqlite' is shared
+    # by all workers on the host, 'memory' is per process. Rates are requests/sec;
+    # background calls leave QUOTA_BACKGROUND_RESERVE of each burst for user requests.
+    QUOTA_BACKEND = os.getenv('QUOTA_BACKEND', 'sqlite')
+    QUOTA_SQLITE_PATH = os.getenv(
+        'QUOTA_SQLITE_PATH', os.path.join(tempfile.gettempdir(), 'next_read_quota.sqlite3'))
+    QUOTA_UPSTREAMS = {
+        'google': {'hosts': ['www.googleapis.com'], 'rate': 10, 'burst': 20, 'min_rate': 0.5},
+        # NYT allows 10 requests/minute
+        'nyt': {'hosts': ['api.nytimes.com'], 'rate': 10 / 60, 'burst': 5, 'min_rate': 1 / 60},
+    }
+    QUOTA_BACKGROUND_RESERVE = 0.25
+    QUOTA_INTERACTIVE_TIMEOUT = 2.0
+    QUOTA_BACKGROUND_TIMEOUT = 60.0
+
+    # Circuit breakers per upstream: after failure_threshold consecutive failures,
+    # calls fail fast for recovery_timeout seconds, then one probe call is let through
+    CIRCUIT_BREAKERS = {
+        'google': {'hosts': ['www.googleapis.com'], 'failure_threshold': 5, 'recovery_timeout': 30},
+        'nyt': {'hosts': ['api.nytimes.com'], 'failure_threshold': 3, 'recovery_timeout': 120},
+    }
+
+    # Cache for upstream results: 'sqlite' is shared by all workers on the host,
+    # 'memory' is a per-process LRU. TTLs are in seconds.
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'sqlite')
+    CACHE_SQLITE_PATH = os.getenv(
+        'CACHE_SQLITE_PATH', os.path.join(tempfile.gettempdir(), 'next_read_cache.sqlite3'))
+    CACHE_SQLITE_MAX_ENTRIES = 50000
+    CACHE_MAX_ENTRIES = 5000
+    CACHE_MAX_BYTES = 64 * 1024 * 1024
+    CACHE_DEFAULT_TTL = 60 * 60
+    # Expired entries are kept this much longer as a fallback while an upstream is down
+    CACHE_STALE_TTL = 60 * 60 * 24 * 7
+    CACHE_TTLS = {
+        'search': 60 * 60 * 24,
+        'genre': 60 * 60,
+        'detail': 60 * 60 * 24,
+        'isbn': 60 * 60 * 24 * 7,
+    }
+
+    # /detail serves stored volumes and re-fetches them from Google once older than this
+    DETAIL_REFRESH_AFTER = timedelta(days=7)
+
+    # /search answers from the local full-text index when it has at least
+    # SEARCH_LOCAL_MIN_HITS matches ranked SEARCH_LOCAL_MIN_RANK or better
+    SEARCH_DEFAULT_MODE = 'hybrid'
+    SEARCH_LOCAL_MIN_HITS = 20
+    SEARCH_LOCAL_MIN_RANK = 0.01
+
+    # Response compression (brotli when installed, else gzip)
+    COMPRESS_MIN_SIZE = 1024
+    COMPRESS_GZIP_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 5
+    COMPRESS_CACHE_ENTRIES = 256
+    COMPRESS_CACHE_BYTES = 16 * 1024 * 1024
+
+    # /featured serves stored lists and refreshes them from NYT in the background
+    FEATURED_REFRESH_INTERVAL = timedelta(hours=24)
+    FEATURED_REFRESH_LOCK_TIMEOUT = timedelta(minutes=15)
+    FEATURED_REFRESH_RETRY_AFTER = timedelta(minutes=5)
+
+    # Job queue for upstream fetches that run off the request path: 'postgres'
+    # keeps jobs in the jobs table (shared by all workers), 'memory' per process.
+    # Each process runs JOB_QUEUE_WORKERS threads; `flask run-jobs` runs a worker
+    # process. Failed jobs retry after JOB_QUEUE_RETRY_BACKOFF * 2^(attempt - 1) seconds.
+    JOB_QUEUE_BACKEND = os.getenv('JOB_QUEUE_BACKEND', 'postgres')
+    JOB_QUEUE_WORKERS = int(os.getenv('JOB_QUEUE_WORKERS', 4))
+    JOB_QUEUE_POLL_INTERVAL = 1.0
+    JOB_QUEUE_MAX_ATTEMPTS = 5
+    JOB_QUEUE_RETRY_BACKOFF = 2.0
+    JOB_QUEUE_LEASE = timedelta(minutes=10)  # running jobs older than this are requeued
+    JOB_QUEUE_RETENTION = timedelta(days=7)  # finished jobs are purged after this
+    JOB_QUEUE_EAGER = False
+
+    # Prometheus metrics at /metrics. Scrapes must send METRICS_TOKEN as a bearer
+    # token (without one the endpoint only answers in debug mode and tests).
+    # 'sqlite' adds up the counters of every worker on the host; 'memory' reports
+    # only the worker answering the scrape.
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+    METRICS_BACKEND = os.getenv('METRICS_BACKEND', 'sqlite')
+    METRICS_SQLITE_PATH = os.getenv(
+        'METRICS_SQLITE_PATH', os.path.join(tempfile.gettempdir(), 'next_read_metrics.sqlite3'))
+    METRICS_FLUSH_INTERVAL = 5.0  # seconds between flushes of a worker's values
+
+    # SQL statements per request (see app/middleware/query_budget.py). Budgets are
+    # per endpoint; a query shape repeated QUERY_REPEAT_THRESHOLD times in one
+    # request is reported as a likely N+1. Violations are logged, and raise under
+    # QUERY_BUDGET_ENFORCE. QUERY_STATS_HEADERS adds X-Query-* response headers.
+    QUERY_BUDGET_DEFAULT = 25
+    QUERY_BUDGETS = {
+        'books_bp.search_google_books': 10,
+        'books_bp.search_genre': 10,
+        'books_bp.detail': 15,
+        'books_bp.get_author_books': 5,
+        'books_bp.get_category_books': 5,
+        'books_bp.save_book': 25,  # includes the enrichment job when jobs run inline
+        'books_bp.remove_user_book': 10,
+        'books_bp.get_user_books': 5,
+        'books_bp.get_featured_books': 30,  # includes the featured refresh when jobs run inline
+        'books_bp.get_featured_list_index': 5,
+    }
+    QUERY_REPEAT_THRESHOLD = 10
+    QUERY_BUDGET_ENFORCE = False
+    QUERY_STATS_HEADERS = os.getenv('QUERY_STATS_HEADERS', 'false').lower() == 'true'
+
+    # Logging: records are queued and written by a background thread, as JSON lines
+    # ('text' for local runs). Only LOG_DEBUG_SAMPLE_RATE of DEBUG records are kept.
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+    LOG_FILE = os.getenv('LOG_FILE')
+    LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '0.1'))
+    LOG_REQUESTS = True  # one line per request with status and duration
+    LOG_QUIET_LOGGERS = ('werkzeug', 'urllib3')
+
+    # Sentry trace sampling (see app/trace_sampling.py). Rates are per endpoint, 0 turns
+    # tracing off for the route. On top of the route rate, TAIL_RATE of the other requests
+    # are traced and only sent when they fail or are slow (over SLOW_THRESHOLD_MS); it is
+    # capped at MAX_TAIL_RATE to bound tracing overhead. Admins can change these at runtime
+    # with PATCH /api/admin/tracing (stored in the app_settings table).
+    SENTRY_TRACES_DEFAULT_RATE = 0.05
+    SENTRY_TRACES_ROUTE_RATES = {
+        'index': 0.0,
+        'metrics': 0.0,
+        'books_bp.search_google_books': 0.05,
+        'books_bp.search_genre': 0.05,
+        'books_bp.detail': 0.1,
+        'books_bp.save_book': 0.25,
+        'books_bp.get_user_books': 0.1,
+        'books_bp.get_featured_books': 0.1,
+    }
+    SENTRY_TRACES_TAIL_RATE = 0.05
+    SENTRY_TRACES_MAX_TAIL_RATE = 0.2
+    SENTRY_TRACES_SLOW_THRESHOLD_MS = 1000
+    SENTRY_TRACES_MAX_PER_MINUTE = 600  # per process
+    SENTRY_TRACES_SETTINGS_REFRESH = 30  # seconds between re-reads of runtime overrides
+
+    # Per-request profiling on demand (see app/middleware/profiler.py): requests sending
+    # a signed X-Profile token (or X-Profile: 1 with an admin's JWT) are run under cProfile
+    PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', 'true').lower() == 'true'
+    PROFILER_DIR = os.getenv('PROFILER_DIR', os.path.join(tempfile.gettempdir(), 'next_read_profiles'))
+    PROFILER_TOKEN_TTL = 15 * 60
+    PROFILER_TOKEN_MAX_TTL = 60 * 60  # longest ?ttl= an admin can ask a token for
+    PROFILER_MAX_PROFILES = 200
+
 class Testing(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = os.getenv('TEST_DATABASE_URI')
+    CACHE_BACKEND = 'memory'
+    QUOTA_BACKEND = 'memory'
+    METRICS_BACKEND = 'memory'
+    JOB_QUEUE_BACKEND = 'memory'
+    JOB_QUEUE_EAGER = True  # run jobs inline
+    QUERY_BUDGET_ENFORCE = True
+    QUERY_STATS_HEADERS = True
+    LOG_LEVEL = 'WARNING'
+    LOG_FORMAT = 'text'
+    LOG_REQUESTS = False
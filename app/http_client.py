@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .circuit_breaker import circuits
+from .metrics import metrics
+from .quota import quota
+
+
+class HttpClient:
+    """
+    Shared outbound HTTP client for Google Books and NYT calls.
+
+    Keeps one pooled `requests.Session` per process so upstream connections are
+    reused (keep-alive) instead of paying a TCP+TLS handshake on every call.
+    Every call gets a connect/read timeout, GETs are retried with backoff on
+    5xx, and per-host timings are recorded for instrumentation. Calls to
+    Google and NYT spend from the shared quota (see app.quota), which also
+    handles 429s.
+    """
+
+    def __init__(self, app=None):
+        self.session = None
+        self.timeout = (3.05, 10)
+        self._stats = defaultdict(lambda: {"calls": 0, "errors": 0, "total_time": 0.0, "max_time": 0.0, "statuses": defaultdict(int)})
+        self._stats_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Build the pooled session from the app's HTTP_* settings."""
+        self.timeout = (
+            app.config.get("HTTP_CONNECT_TIMEOUT", 3.05),
+            app.config.get("HTTP_READ_TIMEOUT", 10),
+        )
+        self.session = self._build_session(
+            pool_sizes=app.config.get("HTTP_POOL_SIZES", {}),
+            default_pool_size=app.config.get("HTTP_DEFAULT_POOL_SIZE", 10),
+            retries=app.config.get("HTTP_MAX_RETRIES", 2),
+            backoff_factor=app.config.get("HTTP_BACKOFF_FACTOR", 0.3),
+        )
+        app.extensions["http_client"] = self
+
+    @staticmethod
+    def _build_session(pool_sizes, default_pool_size, retries, backoff_factor):
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            # 429s are not retried here: the quota manager backs every worker off instead
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+            # Hand the final 5xx back to the caller instead of raising,
+            # so existing status handling at the call sites keeps working.
+            raise_on_status=False,
+        )
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_connections=default_pool_size, pool_maxsize=default_pool_size, max_retries=retry))
+        session.mount("http://", HTTPAdapter(pool_connections=default_pool_size, pool_maxsize=default_pool_size, max_retries=retry))
+
+        # Mount a dedicated, separately sized pool for each configured host.
+        for host, size in pool_sizes.items():
+            session.mount(f"https://{host}/", HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=retry))
+
+        return session
+
+    def get(self, url, params=None, timeout=None, priority=None, **kwargs):
+        """
+        Issue a GET through the shared session and record its timing.
+        `priority` (quota.INTERACTIVE / quota.BACKGROUND) defaults to
+        interactive inside a request and background elsewhere.
+        Raises CircuitOpenError right away while the upstream's circuit is open,
+        and QuotaExceeded when it has no budget left in time.
+        """
+        if self.session is None:
+            # Used outside of create_app (scripts, shell): fall back to defaults.
+            self.session = self._build_session({}, 10, 2, 0.3)
+
+        host = urlsplit(url).netloc
+        breaker = circuits.for_host(host)
+        if breaker:
+            breaker.before_call()
+        try:
+            quota.acquire(host, priority)
+        except Exception:
+            if breaker:
+                breaker.cancel_call()
+            raise
+
+        start = time.perf_counter()
+        status = None
+        try:
+            response = self.session.get(url, params=params, timeout=timeout or self.timeout, **kwargs)
+            status = response.status_code
+            quota.record(host, status, response.headers.get("Retry-After"))
+            return response
+        finally:
+            self._record(host, status, time.perf_counter() - start)
+            if breaker:
+                if status is None or status >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+
+    def _record(self, host, status, elapsed):
+        with self._stats_lock:
+            stats = self._stats[host]
+            stats["calls"] += 1
+            stats["total_time"] += elapsed
+            stats["max_time"] = max(stats["max_time"], elapsed)
+            stats["statuses"][status or "error"] += 1
+            if status is None or status >= 500:
+                stats["errors"] += 1
+        metrics.observe_upstream(host, status, elapsed)
+
+    def stats(self):
+        """Return a snapshot of per-host call counts and timings (seconds)."""
+        with self._stats_lock:
+            return {
+                host: {
+                    "calls": s["calls"],
+                    "errors": s["errors"],
+                    "avg_time": s["total_time"] / s["calls"] if s["calls"] else 0.0,
+                    "max_time": s["max_time"],
+                    "statuses": dict(s["statuses"]),
+                }
+                for host, s in self._stats.items()
+            }
+
+
+http_client = HttpClient()
@@ -0,0 +1,214 @@
+import datetime
+import logging
+import os
+import threading
+import time
+import traceback
+
+import sentry_sdk
+
+from ..metrics import metrics
+from .base import JobBackend
+from .memory import MemoryJobBackend
+
+DEFAULT_MAX_ATTEMPTS = 5
+
+logger = logging.getLogger(__name__)
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+class JobQueue:
+    """
+    Queue for outbound work (Google/NYT fetches) that must not block a request.
+
+    Handlers are registered by name with `@jobs.task("name")` and queued with
+    `jobs.enqueue("name", *args, dedup_key=...)`. Arguments must be
+    JSON-compatible. `JOB_QUEUE_BACKEND` picks the store: "postgres" (the
+    `jobs` table, shared by every process) or "memory" (per process).
+
+    Each process starts `JOB_QUEUE_WORKERS` worker threads the first time it
+    queues a job. `flask run-jobs` runs a dedicated worker process instead.
+    A failed job is retried with exponential backoff until `max_attempts`.
+    A job whose `dedup_key` is already queued or running is not queued twice.
+    With `JOB_QUEUE_EAGER` (tests), jobs run inline in `enqueue`.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.backend = MemoryJobBackend()
+        self._handlers = {}
+        self._threads = []
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.backend = self._build_backend(app.config)
+        self.workers = app.config.get("JOB_QUEUE_WORKERS", 4)
+        self.poll_interval = app.config.get("JOB_QUEUE_POLL_INTERVAL", 1.0)
+        self.default_max_attempts = app.config.get("JOB_QUEUE_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)
+        self.retry_backoff = app.config.get("JOB_QUEUE_RETRY_BACKOFF", 2.0)
+        self.lease = app.config.get("JOB_QUEUE_LEASE", datetime.timedelta(minutes=10))
+        self.retention = app.config.get("JOB_QUEUE_RETENTION", datetime.timedelta(days=7))
+        self.eager = app.config.get("JOB_QUEUE_EAGER", False)
+        app.extensions["jobs"] = self
+
+    @staticmethod
+    def _build_backend(config):
+        backend = config.get("JOB_QUEUE_BACKEND", "memory")
+        if backend == "memory":
+            return MemoryJobBackend()
+        if backend == "postgres":
+            from .postgres import PostgresJobBackend
+            return PostgresJobBackend()
+        raise ValueError(f"Unknown JOB_QUEUE_BACKEND: {backend}")
+
+    def task(self, name):
+        """Register the decorated function as the handler for jobs called `name`."""
+        def decorator(fn):
+            self._handlers[name] = fn
+            return fn
+        return decorator
+
+    def enqueue(self, name, *args, dedup_key=None, max_attempts=None, delay=0, owner_id=None, **kwargs):
+        """
+        Queue a job and return its id (or the id of the active job sharing
+        `dedup_key`). `owner_id` is the user it runs for, who may read it back
+        through /api/jobs.
+        """
+        if name not in self._handlers:
+            raise ValueError(f"No job handler registered for {name!r}")
+        now = _utcnow()
+        job_id = self.backend.enqueue(
+            name,
+            {"args": list(args), "kwargs": kwargs},
+            dedup_key,
+            max_attempts or self.default_max_attempts,
+            now + datetime.timedelta(seconds=delay),
+            now,
+            owner_id,
+        )
+        if self.eager:
+            self._run_due()
+        else:
+            self._ensure_workers()
+            self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        return self.backend.get(job_id)
+
+    def stats(self):
+        return {"depth": self.backend.depth(), "workers": len(self._threads)}
+
+    # Workers
+
+    def _ensure_workers(self):
+        """Start this process's worker threads (again after a fork)."""
+        if self._pid == os.getpid() or not self.workers:
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._threads = [
+                threading.Thread(target=self.work, name=f"job-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def work(self, stop=None):
+        """Worker loop: claim and run due jobs until `stop` (or shutdown) is set."""
+        stop = stop or self._stopping
+        last_maintenance = None
+        while not stop.is_set():
+            try:
+                with self.app.app_context():
+                    now = _utcnow()
+                    if last_maintenance is None or now - last_maintenance > datetime.timedelta(minutes=1):
+                        self.backend.requeue_stale(now - self.lease)
+                        self.backend.purge(now - self.retention)
+                        last_maintenance = now
+                    ran = self._run_due(limit=1)
+            except Exception as e:
+                logger.exception("Job worker error: %s", e)
+                ran = 0
+            if not ran:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _run_due(self, limit=None):
+        """Claim and run due jobs in the current app context; returns how many ran."""
+        ran = 0
+        while limit is None or ran < limit:
+            job = self.backend.claim(_utcnow())
+            if job is None:
+                break
+            self._execute(job)
+            ran += 1
+        return ran
+
+    def _execute(self, job):
+        from ..models import db
+
+        handler = self._handlers.get(job["name"])
+        if handler is None or job["attempts"] > job["max_attempts"]:
+            reason = "no handler registered" if handler is None else "attempts exhausted"
+            self.backend.fail(job["id"], reason, None, _utcnow())
+            return
+
+        start = time.perf_counter()
+        try:
+            result = handler(*job["payload"]["args"], **job["payload"]["kwargs"])
+        except Exception as e:
+            db.session.rollback()
+            error = "".join(traceback.format_exception_only(type(e), e)).strip()
+            if job["attempts"] < job["max_attempts"]:
+                # Never retry before the upstream's quota says it is worth trying again
+                delay = max(self.retry_backoff * 2 ** (job["attempts"] - 1), getattr(e, "retry_after", None) or 0)
+                retry_at = _utcnow() + datetime.timedelta(seconds=delay)
+            else:
+                retry_at = None
+                sentry_sdk.capture_exception(e)
+            metrics.observe_job(job["name"], "failed", time.perf_counter() - start)
+            logger.warning(
+                "Job #%s %s failed (attempt %s/%s): %s",
+                job["id"], job["name"], job["attempts"], job["max_attempts"], error,
+                extra={"job_id": job["id"], "job_name": job["name"]},
+            )
+            self.backend.fail(job["id"], error, retry_at, _utcnow())
+        else:
+            metrics.observe_job(job["name"], "succeeded", time.perf_counter() - start)
+            self.backend.complete(job["id"], result, _utcnow())
+
+
+def job_status(job):
+    """Public view of a job, for the /api/jobs endpoints."""
+    def iso(value):
+        return value.isoformat() if value else None
+
+    return {
+        "id": job["id"],
+        "name": job["name"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "max_attempts": job["max_attempts"],
+        "created_at": iso(job["created_at"]),
+        "run_at": iso(job["run_at"]),
+        "started_at": iso(job["started_at"]),
+        "finished_at": iso(job["finished_at"]),
+        "error": job["last_error"],
+        "result": job["result"],
+    }
+
+
+jobs = JobQueue()
@@ -0,0 +1,61 @@
+class JobBackend:
+    """
+    Interface every job store implements.
+
+    Jobs are plain dicts (see `job_dict`). Payloads and results are
+    JSON-compatible data. All times are timezone-aware UTC datetimes.
+    """
+
+    def enqueue(self, name, payload, dedup_key, max_attempts, run_at, now, owner_id=None):
+        """
+        Store a queued job (queued by user `owner_id`, if any) and return its
+        id. If a queued or running job already has `dedup_key`, return that
+        job's id instead.
+        """
+        raise NotImplementedError
+
+    def claim(self, now):
+        """Mark the oldest due queued job running and return it, or None."""
+        raise NotImplementedError
+
+    def complete(self, job_id, result, now):
+        raise NotImplementedError
+
+    def fail(self, job_id, error, retry_at, now):
+        """Record a failed attempt; requeue for `retry_at`, or give up when it is None."""
+        raise NotImplementedError
+
+    def requeue_stale(self, started_before):
+        """Requeue running jobs whose worker died (started before `started_before`)."""
+        raise NotImplementedError
+
+    def purge(self, finished_before):
+        """Delete finished jobs older than `finished_before`."""
+        raise NotImplementedError
+
+    def get(self, job_id):
+        raise NotImplementedError
+
+    def depth(self):
+        """Number of jobs per status."""
+        raise NotImplementedError
+
+
+def job_dict(job_id, name, payload, dedup_key, status, attempts, max_attempts, run_at,
+             created_at, started_at=None, finished_at=None, last_error=None, result=None, owner_id=None):
+    return {
+        "id": job_id,
+        "name": name,
+        "payload": payload,
+        "dedup_key": dedup_key,
+        "status": status,
+        "attempts": attempts,
+        "max_attempts": max_attempts,
+        "run_at": run_at,
+        "created_at": created_at,
+        "started_at": started_at,
+        "finished_at": finished_at,
+        "last_error": last_error,
+        "result": result,
+        "owner_id": owner_id,
+    }
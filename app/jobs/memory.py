@@ -0,0 +1,86 @@
+import itertools
+import threading
+from collections import deque
+
+from .base import JobBackend, job_dict
+
+
+class MemoryJobBackend(JobBackend):
+    """
+    Per-process job store. Jobs are lost on restart and are only run by this
+    process's workers. Keeps the most recent `max_finished` finished jobs for
+    status lookups.
+    """
+
+    def __init__(self, max_finished=1000):
+        self._jobs = {}
+        self._active = {}  # dedup_key -> job id, for queued/running jobs
+        self._finished = deque()
+        self._max_finished = max_finished
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def enqueue(self, name, payload, dedup_key, max_attempts, run_at, now, owner_id=None):
+        with self._lock:
+            if dedup_key is not None and dedup_key in self._active:
+                return self._active[dedup_key]
+            job_id = next(self._ids)
+            self._jobs[job_id] = job_dict(
+                job_id, name, payload, dedup_key, "queued", 0, max_attempts, run_at, now, owner_id=owner_id)
+            if dedup_key is not None:
+                self._active[dedup_key] = job_id
+            return job_id
+
+    def claim(self, now):
+        with self._lock:
+            due = [job for job in self._jobs.values() if job["status"] == "queued" and job["run_at"] <= now]
+            if not due:
+                return None
+            job = min(due, key=lambda j: (j["run_at"], j["id"]))
+            job.update(status="running", attempts=job["attempts"] + 1, started_at=now)
+            return dict(job)
+
+    def complete(self, job_id, result, now):
+        with self._lock:
+            self._finish(job_id, status="succeeded", result=result, finished_at=now)
+
+    def fail(self, job_id, error, retry_at, now):
+        with self._lock:
+            if retry_at is not None:
+                self._jobs[job_id].update(status="queued", run_at=retry_at, last_error=error)
+            else:
+                self._finish(job_id, status="failed", last_error=error, finished_at=now)
+
+    def _finish(self, job_id, **fields):
+        job = self._jobs[job_id]
+        job.update(fields)
+        if job["dedup_key"] is not None:
+            self._active.pop(job["dedup_key"], None)
+        self._finished.append(job_id)
+        while len(self._finished) > self._max_finished:
+            self._jobs.pop(self._finished.popleft(), None)
+
+    def requeue_stale(self, started_before):
+        with self._lock:
+            for job in self._jobs.values():
+                if job["status"] == "running" and job["started_at"] < started_before:
+                    job["status"] = "queued"
+
+    def purge(self, finished_before):
+        with self._lock:
+            for job_id in [j["id"] for j in self._jobs.values()
+                           if j["finished_at"] is not None and j["finished_at"] < finished_before]:
+                del self._jobs[job_id]
+            self._finished = deque(job_id for job_id in self._finished if job_id in self._jobs)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def depth(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return counts
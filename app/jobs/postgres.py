@@ -0,0 +1,126 @@
+import datetime
+
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..models import Job, db
+from .base import JobBackend, job_dict
+
+ACTIVE_STATUSES = ("queued", "running")
+# Predicate of the uq_jobs_dedup_key_active partial index
+ACTIVE_PREDICATE = text("status IN ('queued', 'running')")
+
+
+def _naive(value):
+    """The jobs table stores naive UTC timestamps."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _aware(value):
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+def _row_to_job(row):
+    return job_dict(
+        row["id"], row["name"], row["payload"], row["dedup_key"], row["status"], row["attempts"],
+        row["max_attempts"], _aware(row["run_at"]), _aware(row["created_at"]), _aware(row["started_at"]),
+        _aware(row["finished_at"]), row["last_error"], row["result"], row["owner_id"],
+    )
+
+
+class PostgresJobBackend(JobBackend):
+    """
+    Durable job store on the `jobs` table, shared by every process.
+
+    Each call runs in its own short transaction on the engine (never the
+    request's session), so a job is visible to workers as soon as it is queued.
+    Claims use FOR UPDATE SKIP LOCKED: concurrent workers each take a
+    different row without waiting on one another.
+    """
+
+    def enqueue(self, name, payload, dedup_key, max_attempts, run_at, now, owner_id=None):
+        values = {
+            "name": name,
+            "payload": payload,
+            "dedup_key": dedup_key,
+            "status": "queued",
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "run_at": _naive(run_at),
+            "created_at": _naive(now),
+            "owner_id": owner_id,
+        }
+        with db.engine.begin() as conn:
+            for _ in range(3):
+                job_id = conn.execute(
+                    pg_insert(Job).values(values)
+                    .on_conflict_do_nothing(
+                        index_elements=["dedup_key"], index_where=ACTIVE_PREDICATE)
+                    .returning(Job.id)
+                ).scalar()
+                if job_id is None:
+                    # Already queued or running: hand back that job
+                    job_id = conn.execute(
+                        select(Job.id).where(Job.dedup_key == dedup_key, Job.status.in_(ACTIVE_STATUSES))
+                    ).scalar()
+                if job_id is not None:
+                    return job_id
+        raise RuntimeError(f"Could not enqueue job {name} ({dedup_key})")
+
+    def claim(self, now):
+        due = (
+            select(Job.id)
+            .where(Job.status == "queued", Job.run_at <= _naive(now))
+            .order_by(Job.run_at, Job.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        with db.engine.begin() as conn:
+            row = conn.execute(
+                update(Job)
+                .where(Job.id == due)
+                .values(status="running", attempts=Job.attempts + 1, started_at=_naive(now))
+                .returning(*Job.__table__.c)
+            ).mappings().first()
+        return _row_to_job(row) if row else None
+
+    def complete(self, job_id, result, now):
+        with db.engine.begin() as conn:
+            conn.execute(
+                update(Job).where(Job.id == job_id)
+                .values(status="succeeded", result=result, finished_at=_naive(now))
+            )
+
+    def fail(self, job_id, error, retry_at, now):
+        if retry_at is not None:
+            values = {"status": "queued", "run_at": _naive(retry_at), "last_error": error}
+        else:
+            values = {"status": "failed", "finished_at": _naive(now), "last_error": error}
+        with db.engine.begin() as conn:
+            conn.execute(update(Job).where(Job.id == job_id).values(values))
+
+    def requeue_stale(self, started_before):
+        with db.engine.begin() as conn:
+            conn.execute(
+                update(Job)
+                .where(Job.status == "running", Job.started_at < _naive(started_before))
+                .values(status="queued")
+            )
+
+    def purge(self, finished_before):
+        with db.engine.begin() as conn:
+            conn.execute(delete(Job).where(Job.finished_at < _naive(finished_before)))
+
+    def get(self, job_id):
+        with db.engine.connect() as conn:
+            row = conn.execute(select(*Job.__table__.c).where(Job.id == job_id)).mappings().first()
+        return _row_to_job(row) if row else None
+
+    def depth(self):
+        with db.engine.connect() as conn:
+            return dict(conn.execute(select(Job.status, func.count(Job.id)).group_by(Job.status)).all())
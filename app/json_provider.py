@@ -0,0 +1,46 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: fall back to the stdlib encoder
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson when it is installed.
+
+    Output matches the default provider: keys are sorted, and dates and other
+    non-native types are still encoded by Flask's `default` hook (so datetimes
+    stay in HTTP date format). Pretty-printed debug output and calls with
+    stdlib-specific keyword arguments fall back to the default encoder.
+    """
+
+    def _orjson_options(self):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps_bytes(self, obj):
+        """Serialize `obj` straight to UTF-8 bytes."""
+        if orjson is None:
+            return self.dumps(obj, separators=(",", ":")).encode("utf-8")
+        return orjson.dumps(obj, default=self.default, option=self._orjson_options())
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs.keys() - {"separators"}:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._orjson_options()).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None or (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
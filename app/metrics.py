@@ -0,0 +1,519 @@
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from flask import Response, g, request
+
+from .sqlite_file import SQLiteFile
+
+# Seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Statements per request
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key):
+        return list(zip(self.labelnames, key))
+
+    def snapshot(self):
+        """This process's values, {label key: value}."""
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+
+    @staticmethod
+    def combine(a, b):
+        """Add up one series' values from two processes."""
+        return a + b
+
+    def samples(self, values=None):
+        """(suffix, labels, value) for every series, from `values` or this process's own."""
+        values = self.snapshot() if values is None else values
+        return [("", self._labels(key), value) for key, value in values.items()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, value, **labels):
+        """Mirror a running total kept elsewhere (e.g. the cache's hit counters)."""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {key: {**series, "buckets": list(series["buckets"])} for key, series in self._values.items()}
+
+    @staticmethod
+    def combine(a, b):
+        return {
+            "buckets": [x + y for x, y in zip(a["buckets"], b["buckets"])],
+            "sum": a["sum"] + b["sum"],
+            "count": a["count"] + b["count"],
+        }
+
+    def samples(self, values=None):
+        values = self.snapshot() if values is None else values
+        result = []
+        for key, series in values.items():
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets, series["buckets"]):
+                cumulative += count
+                result.append(("_bucket", labels + [("le", _format_value(float(bound)))], cumulative))
+            result.append(("_bucket", labels + [("le", "+Inf")], series["count"]))
+            result.append(("_sum", labels, series["sum"]))
+            result.append(("_count", labels, series["count"]))
+        return result
+
+
+def _process_alive(process_id):
+    """Whether the process behind a Metrics.process_id ("<pid>-<random>") still runs on this host."""
+    try:
+        os.kill(int(process_id.split("-", 1)[0]), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        pass
+    return True
+
+
+class SQLiteMetricsStore:
+    """
+    Counter and histogram values of every process on the host, in a SQLite
+    file. Each process periodically rewrites its own rows (its totals since it
+    started); a scrape adds up the rows of all processes. The rows of exited
+    processes are folded into one EXITED_PROCESS row set by `prune`, so totals
+    never go backwards when a worker is recycled and the table only grows with
+    the number of live workers.
+    """
+
+    # Process id of the rows holding the totals of every exited process
+    EXITED_PROCESS = "exited"
+
+    def __init__(self, path):
+        self.path = path
+        self.file = SQLiteFile(path)
+        self.file.connection().execute(
+            "CREATE TABLE IF NOT EXISTS series ("
+            " process TEXT NOT NULL,"
+            " metric TEXT NOT NULL,"
+            " labels TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " PRIMARY KEY (process, metric, labels))"
+        )
+
+    def write(self, process, rows):
+        """Replace `process`'s values: rows of (metric, label key, value)."""
+        with self.file.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO series (process, metric, labels, value) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(process, metric, labels) DO UPDATE SET value = excluded.value",
+                [(process, metric, json.dumps(key), json.dumps(value)) for metric, key, value in rows],
+            )
+
+    def prune(self, combiners):
+        """
+        Fold the rows of processes that are no longer running into the
+        EXITED_PROCESS rows and delete them. `combiners` maps each metric name
+        to the function adding up two of its values; rows of other (retired)
+        metrics are dropped.
+        """
+        conn = self.file.connection()
+        processes = [process for (process,) in conn.execute("SELECT DISTINCT process FROM series")]
+        exited = [p for p in processes if p != self.EXITED_PROCESS and not _process_alive(p)]
+        if not exited:
+            return
+
+        placeholders = ", ".join("?" * len(exited))
+        with self.file.transaction() as conn:
+            totals = {}
+            rows = conn.execute(
+                f"SELECT metric, labels, value FROM series WHERE process IN (?, {placeholders})",
+                [self.EXITED_PROCESS, *exited],
+            )
+            for metric, labels, value in rows:
+                combine = combiners.get(metric)
+                if combine is None:
+                    continue
+                value = json.loads(value)
+                key = (metric, labels)
+                totals[key] = combine(totals[key], value) if key in totals else value
+            conn.execute(f"DELETE FROM series WHERE process IN (?, {placeholders})", [self.EXITED_PROCESS, *exited])
+            conn.executemany(
+                "INSERT INTO series (process, metric, labels, value) VALUES (?, ?, ?, ?)",
+                [(self.EXITED_PROCESS, metric, labels, json.dumps(value)) for (metric, labels), value in totals.items()],
+            )
+
+    def read(self):
+        """Yield (metric, label key, value) for every process."""
+        for metric, labels, value in self.file.connection().execute("SELECT metric, labels, value FROM series"):
+            yield metric, tuple(json.loads(labels)), json.loads(value)
+
+
+class Metrics:
+    """
+    Metrics registry exposed at `/metrics` in the Prometheus text format.
+
+    Recorded as they happen:
+    - request latency per route;
+    - outbound call latency and status per upstream host (from http_client);
+    - SQL statements and time per request (counted by the query_budget middleware);
+    - job run times;
+    - NYT hydration time per stage.
+    Read from the owning extension at scrape time: cache hits/misses per
+    namespace, job queue depth, quota budget and circuit state.
+
+    Recording is a dict update under a lock, cheap enough to leave on in
+    production. Under gunicorn every worker shares one port and a scrape
+    reaches whichever worker accepts it, so with `METRICS_BACKEND = "sqlite"`
+    each process flushes its counters and histograms to a file shared by the
+    host's workers every `METRICS_FLUSH_INTERVAL` seconds, and `/metrics`
+    reports their sum. "memory" reports the answering process only.
+
+    Scrapes must send `Authorization: Bearer <METRICS_TOKEN>`. Without a
+    token, `/metrics` is only open in debug mode and tests.
+    """
+
+    def __init__(self, app=None):
+        self._metrics = []
+        self._collectors = []
+        self._process_collectors = []
+        self.store = None
+        self.flush_interval = 5.0
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+        self._new_process()
+
+        self.requests = self.counter(
+            "http_requests_total", "HTTP requests handled.", ["method", "route", "status"])
+        self.request_latency = self.histogram(
+            "http_request_duration_seconds", "HTTP request latency.", ["method", "route"])
+        self.request_queries = self.histogram(
+            "http_request_db_queries", "SQL statements executed per request.", ["route"],
+            buckets=QUERY_COUNT_BUCKETS)
+        self.request_db_time = self.histogram(
+            "http_request_db_seconds", "Time spent in SQL per request.", ["route"])
+        self.upstream_requests = self.counter(
+            "upstream_requests_total", "Outbound HTTP calls.", ["host", "status"])
+        self.upstream_latency = self.histogram(
+            "upstream_request_duration_seconds", "Outbound HTTP call latency.", ["host"])
+        self.job_runs = self.histogram(
+            "job_duration_seconds", "Job run time.", ["name", "outcome"])
+        self.hydration_stages = self.histogram(
+            "nyt_hydration_stage_seconds", "Time per stage of hydrating the NYT lists.", ["stage"])
+
+        if app is not None:
+            self.init_app(app)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        """Register `fn()` to be called on every scrape, to refresh gauges from other extensions."""
+        self._collectors.append(fn)
+        return fn
+
+    def process_collector(self, fn):
+        """Register `fn()` to be called before this process's values are flushed or rendered."""
+        self._process_collectors.append(fn)
+        return fn
+
+    def init_app(self, app):
+        self.enabled = app.config.get("METRICS_ENABLED", True)
+        self.token = app.config.get("METRICS_TOKEN")
+        # Without a token, only local runs and tests may scrape
+        self.open_without_token = app.testing or app.debug
+        self.flush_interval = app.config.get("METRICS_FLUSH_INTERVAL", 5.0)
+        self.store = self._build_store(app.config)
+        app.extensions["metrics"] = self
+        if not self.enabled:
+            return
+
+        app.before_request(self._start_request)
+        app.after_request(self._end_request)
+        app.add_url_rule("/metrics", "metrics", self._metrics_view)
+
+    @staticmethod
+    def _build_store(config):
+        backend = config.get("METRICS_BACKEND", "memory")
+        if backend == "memory":
+            return None
+        if backend == "sqlite":
+            return SQLiteMetricsStore(config["METRICS_SQLITE_PATH"])
+        raise ValueError(f"Unknown METRICS_BACKEND: {backend}")
+
+    def _new_process(self):
+        self.process_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def _after_fork(self):
+        # A forked worker starts from zero under its own id, or the parent's
+        # totals would be counted twice
+        self._new_process()
+        for metric in self._metrics:
+            if metric.kind != "gauge":
+                metric.reset()
+        self._flush_lock = threading.Lock()
+
+    # Requests
+
+    @staticmethod
+    def _start_request():
+        g.metrics_start = time.perf_counter()
+
+    def _end_request(self, response):
+        start = g.pop("metrics_start", None)
+        if start is None or request.endpoint == "metrics":
+            return response
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        self.requests.inc(method=request.method, route=route, status=response.status_code)
+        self.request_latency.observe(time.perf_counter() - start, method=request.method, route=route)
+        queries = g.get("queries")
+        if queries is not None:
+            self.request_queries.observe(queries.count, route=route)
+            self.request_db_time.observe(queries.time, route=route)
+        self.maybe_flush()
+        return response
+
+    # Outbound calls and jobs
+
+    def observe_upstream(self, host, status, elapsed):
+        self.upstream_requests.inc(host=host, status=status or "error")
+        self.upstream_latency.observe(elapsed, host=host)
+
+    def observe_hydration(self, timings):
+        for stage, elapsed in timings.items():
+            self.hydration_stages.observe(elapsed, stage=stage)
+
+    def observe_job(self, name, outcome, elapsed):
+        self.job_runs.observe(elapsed, name=name, outcome=outcome)
+        self.maybe_flush()
+
+    # Sharing between processes
+
+    def _run(self, collectors):
+        for collect in collectors:
+            try:
+                collect()
+            except Exception as e:
+                logger.exception("Metrics collector %s failed: %s", collect.__name__, e)
+
+    def maybe_flush(self):
+        """Flush this process's values if the last flush is older than `flush_interval`."""
+        if self.store is not None and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.store is None or not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._run(self._process_collectors)
+            rows = [
+                (metric.name, key, value)
+                for metric in self._metrics if metric.kind != "gauge"
+                for key, value in metric.snapshot().items()
+            ]
+            self.store.write(self.process_id, rows)
+            self._last_flush = time.monotonic()
+        except Exception as e:
+            logger.exception("Could not flush metrics: %s", e)
+        finally:
+            self._flush_lock.release()
+
+    def _aggregated(self):
+        """{metric name: {label key: value summed over every process}}."""
+        self.flush()
+        metrics = {metric.name: metric for metric in self._metrics}
+        try:
+            self.store.prune({name: metric.combine for name, metric in metrics.items() if metric.kind != "gauge"})
+        except Exception as e:
+            logger.exception("Could not prune exited processes' metrics: %s", e)
+        totals = {}
+        for name, key, value in self.store.read():
+            metric = metrics.get(name)
+            if metric is None:
+                continue
+            series = totals.setdefault(name, {})
+            series[key] = metric.combine(series[key], value) if key in series else value
+        return totals
+
+    # Exposition
+
+    def render(self):
+        self._run(self._collectors)
+        if self.store is None:
+            self._run(self._process_collectors)
+            totals = {}
+        else:
+            totals = self._aggregated()
+
+        lines = []
+        for metric in self._metrics:
+            values = totals.get(metric.name, {}) if self.store is not None and metric.kind != "gauge" else None
+            samples = metric.samples(values)
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _authorized(self):
+        if not self.token:
+            return self.open_without_token
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        return hmac.compare_digest(supplied.encode(), self.token.encode())
+
+    def _metrics_view(self):
+        if not self._authorized():
+            return Response("Unauthorized\n", status=401, mimetype="text/plain")
+        return Response(self.render(), content_type=CONTENT_TYPE)
+
+
+metrics = Metrics()
+os.register_at_fork(after_in_child=metrics._after_fork)
+
+
+# Collectors for the other extensions: totals kept per process are flushed with
+# this process's values, shared state (cache size, queue depth, quota) is read per scrape
+
+cache_requests = metrics.counter(
+    "cache_requests_total", "Cache lookups per namespace.", ["namespace", "outcome"])
+cache_entries = metrics.gauge("cache_entries", "Entries in the cache backend.")
+job_queue_jobs = metrics.gauge("job_queue_jobs", "Jobs in the queue per status.", ["status"])
+quota_tokens = metrics.gauge("upstream_quota_tokens", "Requests left in the upstream's bucket.", ["upstream"])
+quota_rate = metrics.gauge("upstream_quota_rate", "Current adaptive request rate (per second).", ["upstream"])
+quota_blocked = metrics.gauge(
+    "upstream_quota_blocked_seconds", "Time left in the upstream's 429 backoff.", ["upstream"])
+circuit_opened = metrics.counter(
+    "upstream_circuit_opened_total", "Times the upstream's circuit opened.", ["upstream"])
+circuit_open = metrics.gauge(
+    "upstream_circuit_open", "1 while the upstream's circuit is not closed (in the worker answering the scrape).",
+    ["upstream"])
+
+
+@metrics.process_collector
+def collect_process_counters():
+    """Totals kept by this process's cache and circuit breakers."""
+    from .cache import cache
+    from .circuit_breaker import circuits
+
+    for namespace, counts in cache.stats()["namespaces"].items():
+        for outcome, count in counts.items():
+            cache_requests.set_total(count, namespace=namespace, outcome=outcome)
+    for upstream, state in circuits.stats().items():
+        circuit_opened.set_total(state["times_opened"], upstream=upstream)
+
+
+@metrics.collector
+def collect_cache():
+    from .cache import cache
+
+    cache_entries.set(cache.backend.stats().get("entries", 0))
+
+
+@metrics.collector
+def collect_jobs():
+    from .jobs import jobs
+
+    depth = jobs.backend.depth()
+    for status in ("queued", "running", "succeeded", "failed"):
+        job_queue_jobs.set(depth.get(status, 0), status=status)
+
+
+@metrics.collector
+def collect_upstreams():
+    from .circuit_breaker import CLOSED, circuits
+    from .quota import quota
+
+    for upstream, budget in quota.stats().items():
+        quota_tokens.set(budget["tokens"], upstream=upstream)
+        quota_rate.set(budget["rate"], upstream=upstream)
+        quota_blocked.set(budget["blocked_for"], upstream=upstream)
+    for upstream, state in circuits.stats().items():
+        circuit_open.set(0 if state["state"] == CLOSED else 1, upstream=upstream)
@@ -1,5 +1,5 @@
 from flask import jsonify
-from flask_jwt_extended import verify_jwt_in_request, get_jwt
+from flask_jwt_extended import verify_jwt_in_request, get_jwt, get_jwt_identity
 from functools import wraps
 import datetime
 
@@ -21,3 +21,21 @@ def token_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+
+
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        from ..models import User, db
+
+        try:
+            verify_jwt_in_request()
+        except Exception:
+            return jsonify({"msg": "Token is missing or invalid"}), 401
+
+        user = db.session.get(User, get_jwt_identity())
+        if not user or not user.is_admin:
+            return jsonify({"msg": "Admin access required"}), 403
+
+        return f(*args, **kwargs)
+    return decorated_function
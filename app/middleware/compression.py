@@ -0,0 +1,112 @@
+import gzip
+from flask import request
+from ..cache.memory import MemoryBackend
+from .http_cache import CONTENT_ENCODINGS, encoded_etag
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+
+class Compress:
+    """
+    Compress JSON/text responses with brotli or gzip, as negotiated through
+    Accept-Encoding.
+
+    Bodies below COMPRESS_MIN_SIZE are sent as-is. When a response has an
+    ETag, the compressed body is kept in a small LRU keyed by ETag and
+    encoding, so repeat hits on a cached payload (featured lists, search
+    pages, details) skip recompression.
+    """
+
+    def __init__(self, app=None):
+        self.min_size = 1024
+        self.gzip_level = 6
+        self.brotli_quality = 5
+        self.mimetypes = {"application/json", "text/html", "text/plain"}
+        self.bodies = MemoryBackend(max_entries=256, max_bytes=16 * 1024 * 1024)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.min_size = app.config.get("COMPRESS_MIN_SIZE", 1024)
+        self.gzip_level = app.config.get("COMPRESS_GZIP_LEVEL", 6)
+        self.brotli_quality = app.config.get("COMPRESS_BROTLI_QUALITY", 5)
+        self.mimetypes = set(app.config.get("COMPRESS_MIMETYPES", self.mimetypes))
+        self.bodies = MemoryBackend(
+            max_entries=app.config.get("COMPRESS_CACHE_ENTRIES", 256),
+            max_bytes=app.config.get("COMPRESS_CACHE_BYTES", 16 * 1024 * 1024),
+        )
+        app.after_request(self.after_request)
+        app.extensions["compress"] = self
+
+    def _choose_encoding(self):
+        accepted = request.accept_encodings
+        if brotli is not None and accepted["br"]:
+            return "br"
+        if accepted["gzip"]:
+            return "gzip"
+        return None
+
+    def _compress(self, data, encoding):
+        if encoding == "br":
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level)
+
+    def _not_modified(self, response):
+        """
+        A 304 carries the ETag of the variant the client revalidated (the one
+        for the negotiated encoding when it holds that), not the identity ETag.
+        """
+        response.vary.add("Accept-Encoding")
+        etag, weak = response.get_etag()
+        if not etag or not request.if_none_match:
+            return response
+        encoding = self._choose_encoding()
+        candidates = [encoded_etag(etag, encoding)] if encoding else []
+        candidates += [etag, *(encoded_etag(etag, e) for e in CONTENT_ENCODINGS)]
+        for candidate in candidates:
+            if request.if_none_match.contains(candidate):
+                response.set_etag(candidate, weak=weak)
+                break
+        return response
+
+    def after_request(self, response):
+        if response.status_code == 304:
+            return self._not_modified(response)
+        if (
+            response.status_code < 200
+            or response.status_code == 204
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in self.mimetypes
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = self._choose_encoding()
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        etag, weak = response.get_etag()
+        key = f"{etag}:{encoding}" if etag else None
+        found, body = self.bodies.get(key) if key else (False, None)
+        if not found:
+            body = self._compress(data, encoding)
+            if key:
+                self.bodies.set(key, body)
+
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        if etag:
+            response.set_etag(encoded_etag(etag, encoding), weak=weak)
+        return response
+
+
+compress = Compress()
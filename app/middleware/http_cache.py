@@ -0,0 +1,65 @@
+import hashlib
+import json
+from datetime import timezone
+from flask import request, jsonify, make_response
+
+# Encodings the compression middleware may serve, each with its own ETag variant
+CONTENT_ENCODINGS = ("br", "gzip")
+
+
+def make_etag(*parts):
+    """Strong ETag value from any mix of JSON-serializable parts."""
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _apply_cache_headers(response, etag, max_age, last_modified, private):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    if private:
+        # Per-user data: browsers may keep it but must revalidate every time
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    return response
+
+
+def encoded_etag(etag, encoding):
+    """ETag for a content-encoded variant; a strong ETag must differ per encoding."""
+    return f"{etag}-{encoding}"
+
+
+def is_not_modified(etag, last_modified=None):
+    """True if the client's validators already match this representation."""
+    if request.if_none_match:
+        return any(
+            request.if_none_match.contains(candidate)
+            for candidate in (etag, *(encoded_etag(etag, e) for e in CONTENT_ENCODINGS))
+        )
+    if last_modified is not None and request.if_modified_since is not None:
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        # HTTP dates have one-second resolution
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def conditional_response(etag, build_response, max_age=0, last_modified=None, private=False):
+    """
+    Answer with 304 Not Modified when the client's If-None-Match (or
+    If-Modified-Since) matches; otherwise return `build_response()`.
+    `build_response` is never called for a 304, so the payload is not rebuilt.
+    """
+    if is_not_modified(etag, last_modified):
+        response = make_response("", 304)
+    else:
+        response = build_response()
+    return _apply_cache_headers(response, etag, max_age, last_modified, private)
+
+
+def conditional_json(etag, build, max_age=0, last_modified=None, private=False):
+    """`conditional_response` for a payload that `build()` returns as JSON-serializable data."""
+    return conditional_response(etag, lambda: jsonify(build()), max_age, last_modified, private)
@@ -0,0 +1,191 @@
+import cProfile
+import datetime
+import hashlib
+import hmac
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+
+from flask import g, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+PROFILE_HEADER = "X-Profile"
+_PROFILE_ID = re.compile(r"^[\w.-]+$")
+
+
+class RequestProfiler:
+    """
+    Opt-in cProfile run of a single request, to investigate a slow call in
+    production without profiling every request.
+
+    A request is profiled when it sends `X-Profile: <token>`, where the token
+    comes from `signed_token()` (POST /api/admin/profiles/token) and has not
+    expired, or `X-Profile: 1` together with an admin's JWT. The profile is
+    written to `PROFILER_DIR` as `<id>.prof` (pstats; open it with snakeviz,
+    or `python -m pstats`) next to `<id>.json` describing the request, and the
+    response carries `X-Profile-Id`. Only the newest `PROFILER_MAX_PROFILES`
+    are kept. cProfile allows one active profiler per process, so a request
+    arriving while another is being profiled runs unprofiled (`X-Profile-Id: busy`).
+    """
+
+    def __init__(self, app=None):
+        self.directory = None
+        self.secret = None
+        self.token_ttl = 15 * 60
+        self.token_max_ttl = 60 * 60
+        self.max_profiles = 200
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("PROFILER_ENABLED", True)
+        self.directory = app.config.get("PROFILER_DIR")
+        self.secret = app.config.get("PROFILER_SECRET") or app.config.get("SECRET_KEY")
+        self.token_ttl = app.config.get("PROFILER_TOKEN_TTL", 15 * 60)
+        self.token_max_ttl = app.config.get("PROFILER_TOKEN_MAX_TTL", 60 * 60)
+        self.max_profiles = app.config.get("PROFILER_MAX_PROFILES", 200)
+        app.extensions["profiler"] = self
+        if not self.enabled or not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self._start_request)
+        app.after_request(self._end_request)
+        app.teardown_request(self._teardown_request)
+
+    # Authorization
+
+    def _sign(self, expires):
+        return hmac.new(self.secret.encode(), f"profile:{expires}".encode(), hashlib.sha256).hexdigest()
+
+    def signed_token(self, ttl=None):
+        """A token for the X-Profile header, valid for `ttl` seconds. Raises ValueError past `token_max_ttl`."""
+        ttl = self.token_ttl if ttl is None else int(ttl)
+        if not 0 < ttl <= self.token_max_ttl:
+            raise ValueError(f"ttl must be between 1 and {self.token_max_ttl} seconds")
+        expires = int(time.time()) + ttl
+        return f"{expires}.{self._sign(expires)}", expires
+
+    def _valid_token(self, token):
+        expires, _, signature = token.partition(".")
+        if not expires.isdigit() or int(expires) < time.time() or not self.secret:
+            return False
+        return hmac.compare_digest(signature, self._sign(int(expires)))
+
+    @staticmethod
+    def _is_admin():
+        from ..models import User, db
+
+        try:
+            verify_jwt_in_request(optional=True)
+            identity = get_jwt_identity()
+        except Exception:
+            return False
+        user = db.session.get(User, identity) if identity else None
+        return bool(user and user.is_admin)
+
+    def _requested(self):
+        value = request.headers.get(PROFILE_HEADER)
+        if not value or request.endpoint is None or request.endpoint.startswith("admin_bp."):
+            return False
+        if value == "1":
+            return self._is_admin()
+        return self._valid_token(value)
+
+    # Profiling
+
+    def _start_request(self):
+        if not self._requested():
+            return
+        if not self._lock.acquire(blocking=False):
+            g.profile_id = "busy"
+            return
+        g.profiler = cProfile.Profile()
+        g.profile_started = time.perf_counter()
+        g.profiler.enable()
+
+    def _end_request(self, response):
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            elapsed = time.perf_counter() - g.pop("profile_started")
+            self._lock.release()
+            g.profile_id = self._save(profiler, response.status_code, elapsed)
+        if "profile_id" in g:
+            response.headers["X-Profile-Id"] = g.profile_id
+        return response
+
+    def _teardown_request(self, exc):
+        # The request failed before after_request ran: don't leave the profiler on
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            self._lock.release()
+
+    def _save(self, profiler, status, elapsed):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        profile_id = f"{now:%Y%m%dT%H%M%S}-{request.endpoint.replace('.', '-')}-{uuid.uuid4().hex[:8]}"
+        profiler.dump_stats(os.path.join(self.directory, f"{profile_id}.prof"))
+        meta = {
+            "id": profile_id,
+            "method": request.method,
+            "path": request.full_path.rstrip("?"),
+            "endpoint": request.endpoint,
+            "status": status,
+            "duration_ms": round(elapsed * 1000, 1),
+            "created_at": now.isoformat(),
+        }
+        with open(os.path.join(self.directory, f"{profile_id}.json"), "w") as f:
+            json.dump(meta, f)
+        self._prune()
+        return profile_id
+
+    def _prune(self):
+        ids = sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith(".json"))
+        for profile_id in ids[:-self.max_profiles]:
+            for ext in (".json", ".prof"):
+                try:
+                    os.remove(os.path.join(self.directory, profile_id + ext))
+                except FileNotFoundError:
+                    pass
+
+    # Admin access
+
+    def list_profiles(self):
+        """Saved profiles, newest first."""
+        profiles = []
+        if not self.directory or not os.path.isdir(self.directory):
+            return profiles
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                try:
+                    with open(os.path.join(self.directory, name)) as f:
+                        profiles.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return sorted(profiles, key=lambda p: p["created_at"], reverse=True)
+
+    def profile_path(self, profile_id):
+        """Path of a saved .prof file, or None."""
+        if not self.directory or not _PROFILE_ID.match(profile_id):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.prof")
+        return path if os.path.exists(path) else None
+
+    def summary(self, profile_id, sort="cumulative", limit=40):
+        """Text report of a saved profile's top functions, or None."""
+        path = self.profile_path(profile_id)
+        if path is None:
+            return None
+        out = io.StringIO()
+        stats = pstats.Stats(path, stream=out)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+profiler = RequestProfiler()
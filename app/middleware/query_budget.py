@@ -0,0 +1,130 @@
+import logging
+import re
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_IN_LIST = re.compile(r"\bIN\s*\((?:[^()]|\([^()]*\))*\)", re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"%\(\w+\)s|\?|:\w+|\$\d+")
+_SPACE = re.compile(r"\s+")
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request ran more SQL statements than its budget, or repeated one query shape too often."""
+
+
+def query_shape(statement):
+    """The statement with literals, parameters and IN lists stripped, so loop iterations compare equal."""
+    shape = _IN_LIST.sub("IN (?)", statement)
+    shape = _STRING.sub("?", shape)
+    shape = _PARAM.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+class RequestQueries:
+    """SQL statements run during one request: count, time and count per query shape."""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.time += elapsed
+        self.shapes[query_shape(statement)] += 1
+
+    def repeated(self, threshold):
+        """(shape, count) for query shapes run at least `threshold` times, worst first."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+class QueryBudget:
+    """
+    Count and time the SQL statements of each request (SQLAlchemy engine
+    events), and flag likely N+1 patterns: the same query shape run
+    `QUERY_REPEAT_THRESHOLD` times or more in one request.
+
+    With `QUERY_STATS_HEADERS` (or in debug mode) responses carry
+    X-Query-Count, X-Query-Time (ms) and X-Query-Repeats (runs of the most
+    repeated shape). `QUERY_BUDGETS` maps endpoints to their maximum number of
+    statements (`QUERY_BUDGET_DEFAULT` for the rest). Violations are logged;
+    with `QUERY_BUDGET_ENFORCE` (tests) they raise QueryBudgetExceeded, so a
+    new query in a loop fails the suite.
+    """
+
+    def __init__(self, app=None):
+        self.budgets = {}
+        self.default_budget = None
+        self.repeat_threshold = 10
+        self.headers = False
+        self.enforce = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.budgets = dict(app.config.get("QUERY_BUDGETS", {}))
+        self.default_budget = app.config.get("QUERY_BUDGET_DEFAULT")
+        self.repeat_threshold = app.config.get("QUERY_REPEAT_THRESHOLD", 10)
+        self.headers = app.config.get("QUERY_STATS_HEADERS", False) or app.debug
+        self.enforce = app.config.get("QUERY_BUDGET_ENFORCE", False)
+        app.before_request(self._start_request)
+        app.after_request(self._end_request)
+        if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        app.extensions["query_budget"] = self
+
+    @staticmethod
+    def _start_request():
+        g.queries = RequestQueries()
+
+    def violations(self, endpoint, queries):
+        problems = []
+        budget = self.budgets.get(endpoint, self.default_budget)
+        if budget is not None and queries.count > budget:
+            problems.append(f"{queries.count} statements (budget {budget})")
+        for shape, count in queries.repeated(self.repeat_threshold):
+            problems.append(f"{count}x {shape[:200]}")
+        return problems
+
+    def _end_request(self, response):
+        queries = g.get("queries")
+        if queries is None or request.endpoint is None:
+            return response
+
+        if self.headers:
+            response.headers["X-Query-Count"] = str(queries.count)
+            response.headers["X-Query-Time"] = f"{queries.time * 1000:.1f}"
+            most_repeated = queries.shapes.most_common(1)
+            response.headers["X-Query-Repeats"] = str(most_repeated[0][1] if most_repeated else 0)
+
+        problems = self.violations(request.endpoint, queries)
+        if problems:
+            message = f"Query budget exceeded on {request.endpoint}: " + "; ".join(problems)
+            if self.enforce:
+                raise QueryBudgetExceeded(message)
+            logger.warning("%s", message)
+        return response
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    queries = g.get("queries") if has_request_context() else None
+    if queries is not None:
+        queries.record(statement, elapsed)
+
+
+query_budget = QueryBudget()
@@ -1,6 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
+from sqlalchemy import DDL, event
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
 from datetime import datetime, timezone
+from functools import lru_cache
 
 db = SQLAlchemy()
 bcrypt = Bcrypt()
@@ -11,6 +15,24 @@ def connect_db(app):
     db.app = app
 
 
+@lru_cache(maxsize=8192)
+def split_names(value):
+    """
+    Split a comma-separated authors/categories string into a tuple of names.
+    Memoized: the same strings are serialized on every request.
+    """
+    return tuple(value.split(', ')) if value else ()
+
+
+# Placeholder values stored in place of real author/category names
+PLACEHOLDER_NAMES = {'Unknown Author', 'No categories available'}
+
+
+def name_key(name):
+    """Case- and whitespace-insensitive lookup key for an author or category name."""
+    return ' '.join(name.split()).lower()
+
+
 class User(db.Model):
     """User table..."""
 
@@ -26,6 +48,12 @@ class User(db.Model):
         db.DateTime, nullable=False, default=datetime.now)
     hashed_password = db.Column(db.Text, nullable=False)
 
+    # Incremented on every change to the user's shelves; keys /user-books ETags
+    library_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # Grants access to /api/admin
+    is_admin = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+
     books = db.relationship('UserBooks', backref='user', cascade='all, delete')
 
     @property
@@ -56,6 +84,14 @@ class Book(db.Model):
     """Books table..."""
 
     __tablename__ = 'books'
+    __table_args__ = (
+        # Canonical identity lookups (see book_identity.find_book)
+        db.Index('ix_books_volume_id', 'volume_id'),
+        db.Index('ix_books_isbn_13', 'isbn_13'),
+        db.Index('ix_books_isbn_10', 'isbn_10'),
+        db.Index('ix_books_identity_hash', 'identity_hash'),
+        db.Index('ix_books_search_vector', 'search_vector', postgresql_using='gin'),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     google_books_id = db.Column(db.Text, nullable=False, unique=True)
@@ -70,32 +106,132 @@ class Book(db.Model):
     categories = db.Column(db.Text, nullable=True)  # Stored as a comma-separated string
     retail_price = db.Column(db.Float, nullable=True, default=0.0)
     currency_code = db.Column(db.String(3), nullable=True, default="USD")
+    publisher = db.Column(db.Text, nullable=True)
+
+    # Canonical identity, filled in by book_identity.with_identity on every insert.
+    # google_books_id is either a Google volume id or "isbn_<isbn13>" (NYT rows),
+    # so the same book can arrive under both; these columns let either match.
+    volume_id = db.Column(db.Text, nullable=True)
+    isbn_10 = db.Column(db.String(10), nullable=True)
+    isbn_13 = db.Column(db.String(13), nullable=True)
+    identity_hash = db.Column(db.String(32), nullable=True)  # md5 of normalized title|authors
+
+    # When the full Google volume was last stored; NULL for partial rows
+    # (e.g. NYT-hydrated books). /detail re-fetches rows older than DETAIL_REFRESH_AFTER.
+    detail_fetched_at = db.Column(db.DateTime, nullable=True)
+
+    # Weighted full-text document over title, authors, categories and description.
+    # Maintained by the books_search_vector_update trigger; never set from Python.
+    search_vector = deferred(db.Column(TSVECTOR, nullable=True))
 
     users = db.relationship('UserBooks', backref='book', cascade='all, delete')
 
+    # Normalized views of `authors` / `categories` (kept in sync by book_helpers.sync_book_taxonomy)
+    author_list = db.relationship('Author', secondary='book_authors', order_by='book_authors.c.position',
+                                  back_populates='books', viewonly=True)
+    category_list = db.relationship('Category', secondary='book_categories',
+                                    back_populates='books', viewonly=True)
+
     def to_dict(self):
         """Serialize book instance to dictionary."""
         return {
             'google_books_id': self.google_books_id,
             'title': self.title,
-            'authors': self.authors.split(', ') if self.authors else [],
+            'authors': list(split_names(self.authors)),
             'thumbnail_url': self.thumbnail_url,
             'description': self.description,
             'published_date': self.published_date,
             'average_rating': self.average_rating,
             'ratings_count': self.ratings_count,
             'page_count': self.page_count,
-            'categories': self.categories.split(', ') if self.categories else [],
+            'categories': list(split_names(self.categories)),
             'retail_price': self.retail_price,
             'currency_code': self.currency_code,
         }
 
 
+# The search_vector trigger from migration f29b7c4d1e56, so schemas built with
+# db.create_all() (tests) index new rows the same way as migrated databases.
+BOOKS_SEARCH_VECTOR = """
+    setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(NEW.authors, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(NEW.categories, '')), 'C') ||
+    setweight(to_tsvector('english', coalesce(NEW.description, '')), 'D')
+"""
+
+event.listen(Book.__table__, 'after_create', DDL(f"""
+    CREATE OR REPLACE FUNCTION books_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {BOOKS_SEARCH_VECTOR};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+""").execute_if(dialect='postgresql'))
+event.listen(Book.__table__, 'after_create', DDL("""
+    CREATE TRIGGER books_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, authors, categories, description ON books
+    FOR EACH ROW EXECUTE FUNCTION books_search_vector_update()
+""").execute_if(dialect='postgresql'))
+
+
+book_authors = db.Table(
+    'book_authors',
+    db.Column('book_id', db.Integer, db.ForeignKey('books.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('author_id', db.Integer, db.ForeignKey('authors.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('position', db.Integer, nullable=False, default=0),
+    # "all books by author X"
+    db.Index('ix_book_authors_author_id_book_id', 'author_id', 'book_id'),
+)
+
+book_categories = db.Table(
+    'book_categories',
+    db.Column('book_id', db.Integer, db.ForeignKey('books.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('category_id', db.Integer, db.ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True),
+    # "all books in category X"
+    db.Index('ix_book_categories_category_id_book_id', 'category_id', 'book_id'),
+)
+
+
+class Author(db.Model):
+    """Authors, normalized out of Book.authors."""
+
+    __tablename__ = 'authors'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    name = db.Column(db.Text, nullable=False)
+    name_key = db.Column(db.Text, nullable=False, unique=True)  # see name_key()
+
+    books = db.relationship('Book', secondary='book_authors', back_populates='author_list', viewonly=True)
+
+    def __repr__(self):
+        return f"<Author #{self.id}: {self.name}>"
+
+
+class Category(db.Model):
+    """Categories, normalized out of Book.categories."""
+
+    __tablename__ = 'categories'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    name = db.Column(db.Text, nullable=False)
+    name_key = db.Column(db.Text, nullable=False, unique=True)  # see name_key()
+
+    books = db.relationship('Book', secondary='book_categories', back_populates='category_list', viewonly=True)
+
+    def __repr__(self):
+        return f"<Category #{self.id}: {self.name}>"
+
 
 class UserBooks(db.Model):
     """Link table for Users <-> Books with status and reading progress."""
     
     __tablename__ = 'user_books'
+    __table_args__ = (
+        # get_user_books filters by user and groups by status
+        db.Index('ix_user_books_user_id_status', 'user_id', 'status'),
+        # save_book / remove_user_book look up one user's link to one book
+        db.Index('uq_user_books_user_id_book_id', 'user_id', 'book_id', unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete='cascade'))
@@ -123,6 +259,12 @@ class BookRanking(db.Model):
       - list_name = 'GOOGLE'  with rank=3
     """
     __tablename__ = "book_rankings"
+    __table_args__ = (
+        # One rank per book per list; the NYT refresh upserts against this
+        db.UniqueConstraint('book_id', 'list_name', name='uq_book_rankings_book_id_list_name'),
+        # build_featured_lists_from_db orders by (list_name, rank)
+        db.Index('ix_book_rankings_list_name_rank', 'list_name', 'rank'),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     book_id = db.Column(db.Integer, db.ForeignKey('books.id', ondelete='CASCADE'))
@@ -153,5 +295,87 @@ class FeaturedMeta(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     last_updated = db.Column(db.DateTime, nullable=True)
 
+    # Dates of the NYT lists currently materialized in book_rankings
+    bestsellers_date = db.Column(db.Date, nullable=True)
+    published_date = db.Column(db.Date, nullable=True)
+
+    # Background refresh state: 'idle', 'running' or 'failed'
+    refresh_status = db.Column(db.String(20), nullable=False, default='idle', server_default='idle')
+    refresh_started_at = db.Column(db.DateTime, nullable=True)
+    refresh_error = db.Column(db.Text, nullable=True)
+
+    def __repr__(self):
+        return (f"<FeaturedMeta id={self.id} last_updated={self.last_updated} "
+                f"refresh_status={self.refresh_status}>")
+
+
+class FeaturedSnapshot(db.Model):
+    """
+    The serialized /featured payload for one NYT bestsellers week.
+
+    Written whenever a featured refresh commits, so /featured can return the
+    stored bytes directly. Older weeks are kept so they can still be served.
+    """
+    __tablename__ = 'featured_snapshots'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    bestsellers_date = db.Column(db.Date, nullable=False, unique=True)
+    published_date = db.Column(db.Date, nullable=True)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    etag = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+    def __repr__(self):
+        return f"<FeaturedSnapshot bestsellers_date={self.bestsellers_date} etag={self.etag}>"
+
+
+class Job(db.Model):
+    """
+    Outbound work (Google/NYT fetches) queued off the request path.
+
+    Used by the 'postgres' job queue backend (see app/jobs). Workers claim
+    due jobs with SELECT ... FOR UPDATE SKIP LOCKED, so any number of
+    processes can share the table.
+    """
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # Workers claim the oldest due queued job
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+        # At most one queued or running job per dedup key
+        db.Index('uq_jobs_dedup_key_active', 'dedup_key', unique=True,
+                 postgresql_where=db.text("status IN ('queued', 'running')")),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    name = db.Column(db.Text, nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    dedup_key = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(16), nullable=False, default='queued')  # queued, running, succeeded, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=1)
+    run_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+    # User who queued it; only they (and admins) can read it through /api/jobs
+    owner_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete='SET NULL'), nullable=True)
+
+    def __repr__(self):
+        return f"<Job #{self.id}: {self.name} {self.status}>"
+
+
+class AppSetting(db.Model):
+    """
+    Runtime settings changed by admins without a redeploy (e.g. Sentry trace
+    sampling), shared by every process through the database.
+    """
+    __tablename__ = 'app_settings'
+
+    key = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.JSON, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
+
     def __repr__(self):
-        return f"<FeaturedMeta id={self.id} last_updated={self.last_updated}>"
+        return f"<AppSetting {self.key}>"
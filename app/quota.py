@@ -0,0 +1,249 @@
+import email.utils
+import threading
+import time
+
+import requests
+from flask import has_request_context
+
+from .sqlite_file import SQLiteFile
+
+# Priorities: user-facing calls may drain a bucket; background calls leave
+# QUOTA_BACKGROUND_RESERVE of it for them
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+
+class QuotaExceeded(requests.exceptions.RequestException):
+    """No budget left for an upstream within the caller's wait limit."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - (now or time.time()))
+
+
+def _new_state(limits, now):
+    return {"tokens": limits["burst"], "updated": now, "rate": limits["rate"], "blocked_until": 0.0, "strikes": 0}
+
+
+def _refill(state, limits, now):
+    elapsed = max(0.0, now - state["updated"])
+    state["tokens"] = min(limits["burst"], state["tokens"] + elapsed * state["rate"])
+    state["updated"] = now
+
+
+class MemoryBucketStore:
+    """Bucket state for this process only."""
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def update(self, name, limits, fn, now):
+        """Run `fn(state)` atomically on the named bucket and return its result."""
+        with self._lock:
+            state = self._states.setdefault(name, _new_state(limits, now))
+            return fn(state)
+
+
+class SQLiteBucketStore:
+    """
+    Bucket state shared by every worker process on the host, in a SQLite file.
+    Each update is one BEGIN IMMEDIATE transaction, so concurrent processes
+    never spend the same tokens twice.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = SQLiteFile(path)
+        self.file.connection().execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " name TEXT PRIMARY KEY,"
+            " tokens REAL NOT NULL,"
+            " updated REAL NOT NULL,"
+            " rate REAL NOT NULL,"
+            " blocked_until REAL NOT NULL,"
+            " strikes INTEGER NOT NULL)"
+        )
+
+    def update(self, name, limits, fn, now):
+        with self.file.transaction() as conn:
+            row = conn.execute(
+                "SELECT tokens, updated, rate, blocked_until, strikes FROM buckets WHERE name = ?", (name,)
+            ).fetchone()
+            if row is None:
+                state = _new_state(limits, now)
+            else:
+                state = dict(zip(("tokens", "updated", "rate", "blocked_until", "strikes"), row))
+            result = fn(state)
+            conn.execute(
+                "INSERT INTO buckets (name, tokens, updated, rate, blocked_until, strikes) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated, "
+                "rate = excluded.rate, blocked_until = excluded.blocked_until, strikes = excluded.strikes",
+                (name, state["tokens"], state["updated"], state["rate"], state["blocked_until"], state["strikes"]),
+            )
+        return result
+
+
+class QuotaManager:
+    """
+    Outbound request budget per upstream (Google Books, NYT), shared by every
+    worker through `QUOTA_BACKEND`: "sqlite" (one file per host) or "memory".
+
+    Each upstream is a token bucket refilling at an adaptive rate (AIMD):
+    - a 429 halves the rate and blocks the upstream for its Retry-After, or
+      for an exponential backoff when there is no Retry-After;
+    - each success adds back `increase` requests/sec, up to the configured rate.
+    Interactive calls (made inside a request) wait at most
+    QUOTA_INTERACTIVE_TIMEOUT seconds and may use the whole bucket. Background
+    calls (jobs, hydration) wait longer but leave QUOTA_BACKGROUND_RESERVE of
+    the bucket untouched. A call that can't get budget in time raises QuotaExceeded.
+    """
+
+    def __init__(self, app=None):
+        self.store = MemoryBucketStore()
+        self.upstreams = {}
+        self.hosts = {}
+        self.background_reserve = 0.25
+        self.timeouts = {INTERACTIVE: 2.0, BACKGROUND: 60.0}
+        self._counters = {}
+        self._counter_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.store = self._build_store(app.config)
+        self.upstreams = {}
+        self.hosts = {}
+        for name, settings in app.config.get("QUOTA_UPSTREAMS", {}).items():
+            rate = float(settings["rate"])
+            self.upstreams[name] = {
+                "rate": rate,
+                "burst": float(settings.get("burst", rate)),
+                "min_rate": float(settings.get("min_rate", rate / 20)),
+                "increase": float(settings.get("increase", rate / 50)),
+                "max_backoff": float(settings.get("max_backoff", 300)),
+            }
+            for host in settings.get("hosts", []):
+                self.hosts[host] = name
+        self.background_reserve = app.config.get("QUOTA_BACKGROUND_RESERVE", 0.25)
+        self.timeouts = {
+            INTERACTIVE: app.config.get("QUOTA_INTERACTIVE_TIMEOUT", 2.0),
+            BACKGROUND: app.config.get("QUOTA_BACKGROUND_TIMEOUT", 60.0),
+        }
+        self._counters = {name: {"granted": 0, "throttled": 0, "rate_limited": 0} for name in self.upstreams}
+        app.extensions["quota"] = self
+
+    @staticmethod
+    def _build_store(config):
+        backend = config.get("QUOTA_BACKEND", "memory")
+        if backend == "memory":
+            return MemoryBucketStore()
+        if backend == "sqlite":
+            return SQLiteBucketStore(config["QUOTA_SQLITE_PATH"])
+        raise ValueError(f"Unknown QUOTA_BACKEND: {backend}")
+
+    def _count(self, name, outcome):
+        with self._counter_lock:
+            self._counters[name][outcome] += 1
+
+    def acquire(self, host, priority=None):
+        """
+        Spend one request of `host`'s budget, waiting for it if needed.
+        Hosts without a configured upstream are not limited.
+        """
+        name = self.hosts.get(host)
+        if name is None:
+            return
+        limits = self.upstreams[name]
+        priority = priority or (INTERACTIVE if has_request_context() else BACKGROUND)
+        floor = 0.0 if priority == INTERACTIVE else limits["burst"] * self.background_reserve
+        deadline = time.time() + self.timeouts.get(priority, self.timeouts[BACKGROUND])
+
+        def take(state):
+            now = time.time()
+            _refill(state, limits, now)
+            if state["blocked_until"] > now:
+                return state["blocked_until"] - now
+            if state["tokens"] - 1 >= floor:
+                state["tokens"] -= 1
+                return 0.0
+            return (floor + 1 - state["tokens"]) / state["rate"]
+
+        while True:
+            wait = self.store.update(name, limits, take, time.time())
+            if wait == 0.0:
+                self._count(name, "granted")
+                return
+            remaining = deadline - time.time()
+            if wait > remaining:
+                self._count(name, "throttled")
+                raise QuotaExceeded(f"{name} quota exhausted; retry in {wait:.1f}s", retry_after=wait)
+            time.sleep(wait)
+
+    def record(self, host, status, retry_after=None):
+        """Adapt `host`'s rate to a response status (and its Retry-After header)."""
+        name = self.hosts.get(host)
+        if name is None or status is None:
+            return
+        limits = self.upstreams[name]
+
+        if status == 429:
+            self._count(name, "rate_limited")
+            delay = parse_retry_after(retry_after)
+
+            def penalize(state):
+                now = time.time()
+                _refill(state, limits, now)
+                state["strikes"] += 1
+                state["rate"] = max(limits["min_rate"], state["rate"] / 2)
+                state["tokens"] = 0.0
+                backoff = delay if delay is not None else 2 ** state["strikes"]
+                state["blocked_until"] = max(state["blocked_until"], now + min(backoff, limits["max_backoff"]))
+
+            self.store.update(name, limits, penalize, time.time())
+        elif status < 500:
+            def reward(state):
+                _refill(state, limits, time.time())
+                state["strikes"] = 0
+                state["rate"] = min(limits["rate"], state["rate"] + limits["increase"])
+
+            self.store.update(name, limits, reward, time.time())
+
+    def stats(self):
+        """Current budget per upstream: adaptive rate, tokens left, backoff and counters."""
+        result = {}
+        for name, limits in self.upstreams.items():
+            def snapshot(state):
+                now = time.time()
+                _refill(state, limits, now)
+                return {
+                    "rate": round(state["rate"], 4),
+                    "configured_rate": limits["rate"],
+                    "tokens": round(state["tokens"], 2),
+                    "burst": limits["burst"],
+                    "blocked_for": round(max(0.0, state["blocked_until"] - now), 2),
+                    "strikes": state["strikes"],
+                }
+
+            result[name] = self.store.update(name, limits, snapshot, time.time())
+            with self._counter_lock:
+                result[name].update(self._counters.get(name, {}))
+        return result
+
+
+quota = QuotaManager()
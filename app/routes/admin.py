@@ -0,0 +1,87 @@
+from flask import Blueprint, Response, jsonify, request, send_file
+from ..middleware.auth_middleware import admin_required
+from ..middleware.profiler import PROFILE_HEADER, profiler
+from ..quota import quota
+from ..circuit_breaker import circuits
+from ..trace_sampling import trace_sampler
+
+admin_bp = Blueprint('admin_bp', __name__)
+
+PROFILE_SORT_KEYS = ('cumulative', 'tottime', 'calls')
+
+
+@admin_bp.route('/quota', methods=['GET'])
+@admin_required
+def get_quota():
+    """Current outbound budget per upstream (rate, tokens left, backoff, counters)."""
+    return jsonify(quota.stats())
+
+
+@admin_bp.route('/circuits', methods=['GET'])
+@admin_required
+def get_circuits():
+    """State of each upstream circuit breaker."""
+    return jsonify(circuits.stats())
+
+
+@admin_bp.route('/profiles', methods=['GET'])
+@admin_required
+def list_profiles():
+    """Saved request profiles, newest first."""
+    return jsonify({"profiles": profiler.list_profiles()})
+
+
+@admin_bp.route('/profiles/token', methods=['POST'])
+@admin_required
+def create_profile_token():
+    """Signed value for the X-Profile header: profiles any request that sends it until it expires."""
+    try:
+        token, expires = profiler.signed_token(request.args.get('ttl', type=int))
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    return jsonify({"header": PROFILE_HEADER, "token": token, "expires_at": expires}), 201
+
+
+@admin_bp.route('/profiles/<profile_id>', methods=['GET'])
+@admin_required
+def get_profile(profile_id):
+    """
+    A saved profile: the raw pstats file, or with `?format=text` its top
+    functions sorted by `sort` (cumulative, tottime or calls).
+    """
+    path = profiler.profile_path(profile_id)
+    if path is None:
+        return jsonify({"msg": "Profile not found"}), 404
+    if request.args.get('format') == 'text':
+        sort = request.args.get('sort', 'cumulative')
+        if sort not in PROFILE_SORT_KEYS:
+            return jsonify({"msg": f"sort must be one of {', '.join(PROFILE_SORT_KEYS)}"}), 400
+        return Response(profiler.summary(profile_id, sort=sort), mimetype='text/plain')
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True)
+
+
+@admin_bp.route('/tracing', methods=['GET'])
+@admin_required
+def get_tracing():
+    """Current Sentry trace sampling settings and this process's send/drop counters."""
+    return jsonify(trace_sampler.stats())
+
+
+@admin_bp.route('/tracing', methods=['PATCH'])
+@admin_required
+def update_tracing():
+    """
+    Change trace sampling at runtime: any of default_rate, route_rates
+    ({endpoint: rate}, merged into the current ones), tail_rate,
+    slow_threshold_ms and max_per_minute. `{"reset": true}` restores the config.
+    """
+    changes = request.get_json(silent=True)
+    if not isinstance(changes, dict):
+        return jsonify({"msg": "Expected a JSON object"}), 400
+    if changes.pop('reset', False):
+        trace_sampler.reset()
+    try:
+        settings = trace_sampler.update(changes) if changes else trace_sampler.current_settings()
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    return jsonify({"settings": settings})
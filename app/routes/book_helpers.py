@@ -1,83 +1,458 @@
+import datetime
+import logging
 import requests
 import os
 import time
 from collections import defaultdict
-from ..models import Book, BookRanking, db
-from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from ..models import (Author, Book, BookRanking, Category, PLACEHOLDER_NAMES, User, UserBooks,
+                      book_authors, book_categories, db, name_key, split_names)
+from ..http_client import http_client
+from ..cache import cache
+from ..singleflight import fetch_once, request_key
+from ..circuit_breaker import mark_degraded
+from ..jobs import jobs
+from ..metrics import metrics
+from ..book_identity import ISBN_ID_PREFIX, isbns_from_volume, with_identity
 
-# Caching API Responses
-CACHE = {}
-CACHE_EXPIRY = 60 * 60 * 24  # 24 hours
+logger = logging.getLogger(__name__)
 
-# Throttling for API Requests
-REQUEST_INTERVAL = 0.1  # 100ms between requests
+# Concurrent ISBN lookups while hydrating NYT lists
+HYDRATION_WORKERS = 8
 
-def cache_results(expiry=None):
+# Books per /search page (Google's maxResults)
+SEARCH_PAGE_SIZE = 40
+
+def cache_results(expiry=None, namespace=None):
     """
     Decorator to cache function results for a specified duration.
     """
-    if expiry is None:
-        expiry = 3600  # Default expiry if not provided
-
     def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            cache_key = f"{func.__name__}_{args}_{kwargs}"
-            if cache_key in CACHE:
-                cached_result, timestamp = CACHE[cache_key]
-                if time.time() - timestamp < expiry:
-                    print("Serving from cache:", func.__name__)
-                    return cached_result
-            result = func(*args, **kwargs)
-            CACHE[cache_key] = (result, time.time())
-            return result
-        return wrapper
+        return cache.cached(namespace or func.__name__, ttl=expiry)(func)
     return decorator
 
 
+def search_google_volumes(query, startIndex=0):
+    """
+    Search Google Books for `query`, returning the `/search` payload.
+    Identical concurrent searches share a single upstream request.
+    """
+    url = "https://www.googleapis.com/books/v1/volumes"
+    params = {
+        "q": query,
+        "key": os.environ.get('API_KEY'),
+        "startIndex": startIndex,
+        "printType": "books",
+        "maxResults": SEARCH_PAGE_SIZE,
+    }
+
+    def load():
+        response = http_client.get(url, params=params)
+        response.raise_for_status()
+        data = response.json()
+
+        books = []
+        for item in data.get("items", []):
+            book_info = item.get("volumeInfo", {})
+            sale_info = item.get("saleInfo", {})
+            retail_price = sale_info.get("listPrice", {})
+            books.append({
+                "google_books_id": item.get("id"),
+                "title": book_info.get("title", "Unknown Title"),
+                "authors": book_info.get("authors", ["Unknown Author"]),
+                "thumbnail_url": book_info.get("imageLinks", {}).get("thumbnail", ""),
+                "published_date": book_info.get("publishedDate", "Date not available"),
+                "page_count": book_info.get("pageCount", "Page count not available"),
+                "categories": book_info.get("categories", ["No categories available"]),
+                "retail_price": retail_price.get("amount", "Price not available"),
+                "currency_code": retail_price.get("currencyCode", "USD"),
+            })
+        return {"books": books, "query": query, "startIndex": startIndex}
+
+    return fetch_once("search", f"{query}_{startIndex}", load, flight_key=request_key(url, params))
+
+
+def book_search_dict(book):
+    """Shape a stored Book like a Google search result."""
+    return {
+        "google_books_id": book.google_books_id,
+        "title": book.title,
+        "authors": list(split_names(book.authors)) or ["Unknown Author"],
+        "thumbnail_url": book.thumbnail_url,
+        "published_date": book.published_date or "Date not available",
+        "page_count": book.page_count or "Page count not available",
+        "categories": list(split_names(book.categories)) or ["No categories available"],
+        "retail_price": book.retail_price if book.retail_price else "Price not available",
+        "currency_code": book.currency_code or "USD",
+    }
+
+
+def search_local_catalog(query, limit=SEARCH_PAGE_SIZE, offset=0):
+    """
+    Full-text search of the books table (title, authors, categories,
+    description) through the GIN-indexed search_vector. Returns search-result
+    dicts, best matches first, dropping matches below SEARCH_LOCAL_MIN_RANK.
+    """
+    tsquery = func.websearch_to_tsquery('english', query)
+    rank = func.ts_rank_cd(Book.search_vector, tsquery)
+    min_rank = current_app.config.get("SEARCH_LOCAL_MIN_RANK", 0.01)
+    books = (
+        Book.query
+        .filter(Book.search_vector.op('@@')(tsquery), rank >= min_rank)
+        .order_by(rank.desc(), Book.id)
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+    return [book_search_dict(book) for book in books]
+
+
+def search_books(query, startIndex=0, mode="hybrid", googleIndex=None):
+    """
+    Return the `/search` payload for `query` using the given mode:
+      google - Google Books only
+      local  - the local catalog only
+      hybrid - the local catalog, calling Google only to fill the page when
+               fewer than SEARCH_LOCAL_MIN_HITS local matches are found
+    `startIndex` is the offset into the local catalog (into Google's results
+    in google mode) and `googleIndex` the offset into Google's results for
+    hybrid pages, defaulting to `startIndex`. A hybrid page consumes the two
+    sources at different rates, so the payload carries `nextStartIndex` and
+    `nextGoogleIndex` to request the following page with.
+    When Google is unavailable (and no stale cached page exists), the local
+    results are returned alone and the response is marked degraded.
+    """
+    if googleIndex is None:
+        googleIndex = startIndex
+
+    def page(books, source, next_start, next_google):
+        return {
+            "books": books,
+            "query": query,
+            "startIndex": startIndex,
+            "googleIndex": googleIndex,
+            "nextStartIndex": next_start,
+            "nextGoogleIndex": next_google,
+            "source": source,
+        }
+
+    if mode == "google":
+        try:
+            google_books = search_google_volumes(query, startIndex)["books"]
+        except requests.exceptions.RequestException as e:
+            logger.warning("Google Books search unavailable, using local catalog: %s", e)
+            mark_degraded("local-catalog")
+            local_books = search_local_catalog(query, SEARCH_PAGE_SIZE, startIndex)
+            return page(local_books, "local", startIndex + len(local_books), googleIndex)
+        next_index = startIndex + len(google_books)
+        return page(google_books, "google", next_index, next_index)
+
+    local_books = search_local_catalog(query, SEARCH_PAGE_SIZE, startIndex)
+    next_start = startIndex + len(local_books)
+    min_hits = current_app.config.get("SEARCH_LOCAL_MIN_HITS", 20)
+    if mode == "local" or len(local_books) >= min_hits:
+        return page(local_books, "local", next_start, googleIndex)
+
+    try:
+        google_results = search_google_volumes(query, googleIndex)["books"]
+    except requests.exceptions.RequestException as e:
+        logger.warning("Google Books search unavailable, using local catalog: %s", e)
+        mark_degraded("local-catalog")
+        return page(local_books, "local", next_start, googleIndex)
+
+    # Only the Google results that fit on this page count as consumed (skipped
+    # duplicates included); the next page continues right after them
+    seen = {book["google_books_id"] for book in local_books}
+    google_books = []
+    consumed = 0
+    for book in google_results:
+        if len(local_books) + len(google_books) >= SEARCH_PAGE_SIZE:
+            break
+        consumed += 1
+        if book["google_books_id"] not in seen:
+            google_books.append(book)
+    return page(
+        local_books + google_books,
+        "hybrid" if local_books else "google",
+        next_start,
+        googleIndex + consumed,
+    )
+
+
+def fetch_volume_from_google(volume_id):
+    """
+    Fetch one Google Books volume by id, returning the `/detail` payload or
+    None if Google has no volume info for it.
+    """
+    response = http_client.get(
+        f"https://www.googleapis.com/books/v1/volumes/{volume_id}",
+        params={"key": os.environ.get('API_KEY')},
+    )
+    response.raise_for_status()
+    data = response.json()
+
+    if "volumeInfo" not in data:
+        return None
+
+    volume_info = data["volumeInfo"]
+    sale_info = data.get("saleInfo", {})
+
+    return {
+        "google_books_id": volume_id,
+        "title": volume_info.get("title", "Unknown Title"),
+        "authors": volume_info.get("authors", ["Unknown Author"]),
+        "description": volume_info.get("description", "Description not available"),
+        "publishedDate": volume_info.get("publishedDate", "Date not available"),
+        "pageCount": volume_info.get("pageCount", 0),
+        "categories": volume_info.get("categories", ["No categories available"]),
+        "imageLinks": volume_info.get("imageLinks", {}),
+        "industryIdentifiers": volume_info.get("industryIdentifiers", []),
+        "publisher": volume_info.get("publisher", "Publisher not available"),
+        "retailPrice": sale_info.get("retailPrice", {}).get("amount"),
+        "currencyCode": sale_info.get("retailPrice", {}).get("currencyCode"),
+    }
+
+
+def book_detail_dict(book):
+    """Build the `/detail` payload from a stored Book row."""
+    return {
+        "google_books_id": book.google_books_id,
+        "title": book.title,
+        "authors": list(split_names(book.authors)) or ["Unknown Author"],
+        "description": book.description or "Description not available",
+        "publishedDate": book.published_date or "Date not available",
+        "pageCount": book.page_count or 0,
+        "categories": list(split_names(book.categories)) or ["No categories available"],
+        "imageLinks": {"thumbnail": book.thumbnail_url} if book.thumbnail_url else {},
+        "industryIdentifiers": [
+            {"type": kind, "identifier": value}
+            for kind, value in (("ISBN_13", book.isbn_13), ("ISBN_10", book.isbn_10)) if value
+        ],
+        "publisher": book.publisher or "Publisher not available",
+        "retailPrice": book.retail_price,
+        "currencyCode": book.currency_code,
+    }
+
+
+def bump_shelving_library_versions(book_id):
+    """
+    Invalidate the cached /user-books responses (ETag) of every user shelving
+    a book whose row changed, e.g. when a job fills it in after save_book.
+    """
+    db.session.execute(
+        update(User)
+        .where(User.id.in_(select(UserBooks.user_id).where(UserBooks.book_id == book_id)))
+        .values(library_version=User.library_version + 1)
+    )
+
+
+def stored_volume(query, volume_id):
+    """
+    Narrow `query` to the row storing a Google volume: the one keyed by its
+    id, else an ISBN-keyed (NYT) row already resolved to it.
+    """
+    return (
+        query
+        .filter(or_(Book.google_books_id == volume_id, Book.volume_id == volume_id))
+        .order_by((Book.google_books_id == volume_id).desc(), Book.id)
+        .limit(1)
+    )
+
+
+def store_volume_detail(detail):
+    """Write a Google `/detail` payload back to the books table (insert or refresh)."""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    isbn_10, isbn_13 = isbns_from_volume(detail)
+    row = with_identity({
+        "google_books_id": detail["google_books_id"],
+        "title": detail["title"],
+        "authors": ", ".join(detail["authors"]),
+        "thumbnail_url": detail["imageLinks"].get("thumbnail", ""),
+        "description": detail["description"],
+        "published_date": detail["publishedDate"],
+        "page_count": detail["pageCount"],
+        "categories": ", ".join(detail["categories"]),
+        "publisher": detail["publisher"],
+        "retail_price": detail["retailPrice"],
+        "currency_code": detail["currencyCode"],
+        "detail_fetched_at": now,
+        "isbn_10": isbn_10,
+        "isbn_13": isbn_13,
+    })
+    book_id = stored_volume(db.session.query(Book.id), row["google_books_id"]).scalar()
+    if book_id is not None:
+        # Refresh the stored row in place, even an ISBN-keyed one, rather than
+        # adding a second row for the same volume; its own ISBNs win
+        values = {column: value for column, value in row.items() if column != "google_books_id"}
+        values.update(isbn_10=func.coalesce(Book.isbn_10, isbn_10), isbn_13=func.coalesce(Book.isbn_13, isbn_13))
+        db.session.execute(update(Book).where(Book.id == book_id).values(values))
+    else:
+        stmt = pg_insert(Book).values(row)
+        book_id = db.session.execute(stmt.on_conflict_do_update(
+            index_elements=["google_books_id"],
+            set_={column: stmt.excluded[column] for column in row if column != "google_books_id"},
+        ).returning(Book.id)).scalar_one()
+    sync_book_taxonomy({book_id: (row["authors"], row["categories"])})
+    bump_shelving_library_versions(book_id)
+    db.session.commit()
+
+
+@jobs.task("refresh_volume_detail")
+def refresh_volume_detail(volume_id):
+    """Re-fetch a stored volume from Google and update its row and cache entry."""
+    detail = fetch_volume_from_google(volume_id)
+    if detail:
+        store_volume_detail(detail)
+        cache.set("detail", volume_id, detail)
+
+
+@jobs.task("enrich_book")
+def enrich_book(google_books_id):
+    """
+    Fill in a book that save_book stored from client data with Google's record
+    of it. Runs as a job; volume-keyed rows get the full detail, ISBN-keyed
+    rows their volume id and missing fields.
+    """
+    if not google_books_id.startswith(ISBN_ID_PREFIX):
+        refresh_volume_detail(google_books_id)
+        return
+
+    info = fetch_google_books_by_isbn(google_books_id[len(ISBN_ID_PREFIX):])
+    book = Book.query.filter_by(google_books_id=google_books_id).first()
+    if not info or book is None:
+        return
+    book.volume_id = book.volume_id or info["google_books_id"]
+    book.isbn_10 = book.isbn_10 or info.get("isbn_10")
+    book.thumbnail_url = book.thumbnail_url or info["thumbnail_url"]
+    book.page_count = book.page_count or info["page_count"]
+    if info["description"] and book.description in (None, "No description available."):
+        book.description = info["description"]
+    bump_shelving_library_versions(book.id)
+    db.session.commit()
+
+
+def stored_detail_version(volume_id):
+    """When a volume's stored detail was last fetched from Google (its version), or None if not stored."""
+    return stored_volume(db.session.query(Book.detail_fetched_at), volume_id).scalar()
+
+
+def get_volume_detail(volume_id):
+    """
+    Return the `/detail` payload for a Google volume id, or None if not found.
+
+    Reads through three layers: the "detail" cache, then the books table, then
+    Google. A stored row is served whether it is keyed by the volume id or is
+    an NYT row resolved to it; rows never filled in from Google, or older than
+    DETAIL_REFRESH_AFTER, are served too, and a background re-fetch updates
+    them. Anything fetched from Google is written back to the books table.
+    Concurrent misses share one load.
+    """
+    def load():
+        book = stored_volume(Book.query, volume_id).first()
+        if book:
+            refresh_after = current_app.config.get("DETAIL_REFRESH_AFTER", datetime.timedelta(days=7))
+            fetched_at = book.detail_fetched_at
+            if fetched_at is not None and fetched_at.tzinfo is None:
+                fetched_at = fetched_at.replace(tzinfo=datetime.timezone.utc)
+            stale = fetched_at is None or fetched_at <= datetime.datetime.now(datetime.timezone.utc) - refresh_after
+            # The lock expires on its own, limiting refreshes to one per volume per minute
+            if stale and cache.acquire_lock(f"detail-refresh:{volume_id}", 60):
+                jobs.enqueue("refresh_volume_detail", volume_id, dedup_key=f"detail-refresh:{volume_id}")
+            return book_detail_dict(book)
+
+        detail = fetch_volume_from_google(volume_id)
+        if detail:
+            store_volume_detail(detail)
+        return detail
+
+    url = f"https://www.googleapis.com/books/v1/volumes/{volume_id}"
+    return fetch_once("detail", volume_id, load, flight_key=request_key(url))
+
+
 def fetch_google_books_by_isbn(isbn13):
     """
     Fetch a single book's data from Google Books using the ISBN13 number.
-    Returns a dictionary with relevant Google Books fields or None if not found.
+    Returns a dictionary with relevant Google Books fields or None if not found;
+    raises the requests exception when Google is unavailable.
+    Concurrent lookups of the same ISBN share a single upstream request.
     """
     google_books_api_key = os.environ.get('API_KEY', '')
     if not google_books_api_key:
-        print("Warning: No Google Books API key found (API_KEY).")
+        logger.warning("No Google Books API key found (API_KEY).")
         return None
 
-    url = f"https://www.googleapis.com/books/v1/volumes?q=isbn:{isbn13}&key={google_books_api_key}"
+    url = "https://www.googleapis.com/books/v1/volumes"
+    params = {"q": f"isbn:{isbn13}", "key": google_books_api_key}
 
-    try:
-        response = requests.get(url)
+    def load():
+        response = http_client.get(url, params=params)
         response.raise_for_status()
         data = response.json()
-    except requests.exceptions.RequestException as e:
-        print("Error fetching Google Books data:", e)
-        return None
 
-    items = data.get("items", [])
-    if not items:
-        return None
+        items = data.get("items", [])
+        if not items:
+            return None
 
-    volume_info = items[0].get("volumeInfo", {})
-    google_book_id = items[0].get("id")
+        volume_info = items[0].get("volumeInfo", {})
+        google_book_id = items[0].get("id")
+        isbn_10, _ = isbns_from_volume(volume_info)
 
+        return {
+            "google_books_id": google_book_id,
+            "title": volume_info.get("title"),
+            "authors": ", ".join(volume_info.get("authors", [])),
+            "published_date": volume_info.get("publishedDate", "Unknown"),
+            "description": volume_info.get("description", "No description available."),
+            "thumbnail_url": volume_info.get("imageLinks", {}).get("thumbnail", ""),
+            "page_count": volume_info.get("pageCount"),
+            "isbn_10": isbn_10,
+        }
+
+    return fetch_once("isbn", isbn13, load, flight_key=request_key(url, params))
+
+
+def local_isbn_detail(isbn13):
+    """The `/detail` payload for a stored book with this ISBN-13, or None."""
+    book = (
+        Book.query
+        .filter(or_(Book.google_books_id == f"{ISBN_ID_PREFIX}{isbn13}", Book.isbn_13 == isbn13))
+        .order_by(Book.id)
+        .first()
+    )
+    if book is None:
+        return None
+    # Same shape as fetch_google_books_by_isbn, so clients see one schema either way
     return {
-        "google_books_id": google_book_id,
-        "title": volume_info.get("title"),
-        "authors": ", ".join(volume_info.get("authors", [])),
-        "published_date": volume_info.get("publishedDate", "Unknown"),
-        "description": volume_info.get("description", "No description available."),
-        "thumbnail_url": volume_info.get("imageLinks", {}).get("thumbnail", ""),
-        "page_count": volume_info.get("pageCount"),
+        "google_books_id": book.volume_id or book.google_books_id,
+        "title": book.title,
+        "authors": book.authors,
+        "published_date": book.published_date or "Unknown",
+        "description": book.description or "No description available.",
+        "thumbnail_url": book.thumbnail_url or "",
+        "page_count": book.page_count,
+        "isbn_10": book.isbn_10,
     }
 
+def _featured_entry(rank_entry, book):
+    return {
+        "rank": rank_entry.rank,
+        "google_books_id": book.google_books_id,
+        "title": book.title,
+        "author": book.authors,
+        "thumbnail_url": book.thumbnail_url,
+        "description": book.description,
+    }
+
+
 def build_featured_lists_from_db():
     """
     Read from BookRanking (and its related Book) to reconstruct a `featured_lists` structure.
     """
     all_rankings = (
-        db.session.query(BookRanking)
+        db.session.query(BookRanking, Book)
         .join(Book, BookRanking.book_id == Book.id)
         .order_by(BookRanking.list_name, BookRanking.rank)  # Order by list name and rank
         .all()
@@ -85,15 +460,8 @@ def build_featured_lists_from_db():
 
     lists_dict = defaultdict(list)
 
-    for rank_entry in all_rankings:
-        lists_dict[rank_entry.list_name].append({
-            "rank": rank_entry.rank,
-            "google_books_id": rank_entry.book.google_books_id,
-            "title": rank_entry.book.title,
-            "author": rank_entry.book.authors,
-            "thumbnail_url": rank_entry.book.thumbnail_url,
-            "description": rank_entry.book.description,
-        })
+    for rank_entry, book in all_rankings:
+        lists_dict[rank_entry.list_name].append(_featured_entry(rank_entry, book))
 
     # Convert the dictionary to a list of lists
     return [
@@ -102,68 +470,304 @@ def build_featured_lists_from_db():
     ]
 
 
+def build_featured_lists_page(list_names=None, limit=None, cursor=None):
+    """
+    Like build_featured_lists_from_db, but only for `list_names` (all lists if
+    empty), only books ranked after `cursor`, and at most `limit` books per list.
+    The per-list top-N runs in SQL (row_number() over each list's ranks), so
+    rankings and books past the page are never loaded. Each list gets a
+    `next_cursor` (the last rank returned) when more books follow.
+    """
+    ranked = db.session.query(
+        BookRanking.id.label("ranking_id"),
+        func.row_number().over(partition_by=BookRanking.list_name, order_by=BookRanking.rank).label("position"),
+    )
+    if list_names:
+        ranked = ranked.filter(BookRanking.list_name.in_(list_names))
+    if cursor is not None:
+        ranked = ranked.filter(BookRanking.rank > cursor)
+    ranked = ranked.subquery()
+
+    query = (
+        db.session.query(BookRanking, Book)
+        .join(ranked, ranked.c.ranking_id == BookRanking.id)
+        .join(Book, BookRanking.book_id == Book.id)
+        .order_by(BookRanking.list_name, BookRanking.rank)
+    )
+    if limit is not None:
+        # One extra row per list tells us whether there is a next page
+        query = query.filter(ranked.c.position <= limit + 1)
+
+    lists_dict = defaultdict(list)
+    next_cursor = {}
+    for rank_entry, book in query.all():
+        books = lists_dict[rank_entry.list_name]
+        if limit is not None and len(books) == limit:
+            next_cursor[rank_entry.list_name] = books[-1]["rank"]
+            continue
+        books.append(_featured_entry(rank_entry, book))
+
+    return [
+        {
+            "list_name": list_name,
+            "display_name": list_name,
+            "books": books,
+            "next_cursor": next_cursor.get(list_name),
+        }
+        for list_name, books in lists_dict.items()
+    ]
+
+
+def build_featured_list_index():
+    """One row per stored list: its name, how many books it ranks and its latest week."""
+    rows = (
+        db.session.query(
+            BookRanking.list_name,
+            func.count(BookRanking.id),
+            func.max(BookRanking.bestsellers_date),
+        )
+        .group_by(BookRanking.list_name)
+        .order_by(BookRanking.list_name)
+        .all()
+    )
+    return [
+        {
+            "list_name": list_name,
+            "display_name": list_name,
+            "book_count": book_count,
+            "bestsellers_date": bestsellers_date.isoformat() if bestsellers_date else None,
+        }
+        for list_name, book_count, bestsellers_date in rows
+    ]
+
+
+def books_by_name(model, link_table, link_column, name, limit, cursor=None):
+    """
+    One page of stored books linked to the author/category called `name`, as
+    `/search`-shaped dicts ordered by book id. Returns None if the name is not
+    known. Both steps are index lookups (name_key, then (link_column, book_id)).
+    """
+    entity = model.query.filter_by(name_key=name_key(name)).first()
+    if entity is None:
+        return None
+
+    query = (
+        db.session.query(Book)
+        .join(link_table, link_table.c.book_id == Book.id)
+        .filter(link_column == entity.id)
+    )
+    if cursor is not None:
+        query = query.filter(Book.id > cursor)
+    books = query.order_by(Book.id).limit(limit + 1).all()
+
+    return {
+        "name": entity.name,
+        "books": [book_search_dict(book) for book in books[:limit]],
+        "next_cursor": books[limit - 1].id if len(books) > limit else None,
+    }
+
+
+def books_by_author(name, limit, cursor=None):
+    """Stored books by author `name` (see books_by_name)."""
+    return books_by_name(Author, book_authors, book_authors.c.author_id, name, limit, cursor)
+
 
-def throttle_api_request(api_call, *args, **kwargs):
-    """Throttle API requests by introducing a delay."""
-    time.sleep(REQUEST_INTERVAL)  # Pause before making the request
-    return api_call(*args, **kwargs)
+def books_by_category(name, limit, cursor=None):
+    """Stored books in category `name` (see books_by_name)."""
+    return books_by_name(Category, book_categories, book_categories.c.category_id, name, limit, cursor)
 
 
 def get_cached_book_data(google_books_id):
     """Retrieve cached book data if it exists and is not expired."""
-    cached_book = CACHE.get(google_books_id)
-    if cached_book and time.time() - cached_book["timestamp"] < CACHE_EXPIRY:
-        return cached_book["data"]
-    return None
+    return cache.get("detail", google_books_id)
 
 def cache_book_data(google_books_id, data):
     """Cache book data for a given Google Books ID."""
-    CACHE[google_books_id] = {"data": data, "timestamp": time.time()}
+    cache.set("detail", google_books_id, data)
+
+
+def _upsert_names(model, names):
+    """Insert any missing author/category names and return {name_key: id}."""
+    by_key = {}
+    for name in names:
+        by_key.setdefault(name_key(name), name.strip())
+    if not by_key:
+        return {}
+    db.session.execute(
+        pg_insert(model)
+        .values([{"name": name, "name_key": key} for key, name in by_key.items()])
+        .on_conflict_do_nothing(index_elements=["name_key"])
+    )
+    return dict(db.session.execute(
+        select(model.name_key, model.id).where(model.name_key.in_(by_key.keys()))
+    ).all())
+
+
+def sync_book_taxonomy(books):
+    """
+    Rebuild the book_authors/book_categories links for `books`, a dict of
+    {book_id: (authors, categories)} holding the comma-separated strings
+    stored on Book. A fixed number of statements, however many books.
+    """
+    if not books:
+        return
+
+    def parse(value):
+        return [name for name in split_names(value) if name.strip() and name not in PLACEHOLDER_NAMES]
+
+    authors = {book_id: parse(value[0]) for book_id, value in books.items()}
+    categories = {book_id: parse(value[1]) for book_id, value in books.items()}
+    author_ids = _upsert_names(Author, [n for names in authors.values() for n in names])
+    category_ids = _upsert_names(Category, [n for names in categories.values() for n in names])
+
+    book_ids = list(books.keys())
+    db.session.execute(book_authors.delete().where(book_authors.c.book_id.in_(book_ids)))
+    db.session.execute(book_categories.delete().where(book_categories.c.book_id.in_(book_ids)))
+
+    author_links = {}
+    for book_id, names in authors.items():
+        for position, name in enumerate(names):
+            author_links.setdefault((book_id, author_ids[name_key(name)]), position)
+    if author_links:
+        db.session.execute(book_authors.insert(), [
+            {"book_id": book_id, "author_id": author_id, "position": position}
+            for (book_id, author_id), position in author_links.items()
+        ])
+
+    category_links = {
+        (book_id, category_ids[name_key(name)]) for book_id, names in categories.items() for name in names
+    }
+    if category_links:
+        db.session.execute(book_categories.insert(), [
+            {"book_id": book_id, "category_id": category_id} for book_id, category_id in category_links
+        ])
+
+
+def upsert_books(rows):
+    """
+    Insert the books that aren't stored yet (matched on google_books_id) and
+    return {google_books_id: id} for every row. Existing rows are left as they
+    are. Always two statements, however many rows are passed.
+    """
+    unique_rows = {}
+    for row in rows:
+        unique_rows.setdefault(row["google_books_id"], row)
+    if not unique_rows:
+        return {}
+
+    inserted = db.session.execute(
+        pg_insert(Book)
+        .values([with_identity(row) for row in unique_rows.values()])
+        .on_conflict_do_nothing(index_elements=["google_books_id"])
+        .returning(Book.id, Book.authors, Book.categories)
+    ).all()
+    sync_book_taxonomy({book_id: (authors, categories) for book_id, authors, categories in inserted})
+    return dict(db.session.execute(
+        select(Book.google_books_id, Book.id).where(Book.google_books_id.in_(unique_rows.keys()))
+    ).all())
 
 
 def hydrate_nyt_books(book_data_list):
     """
     Hydrate NYT books with data from the database or Google Books API.
+
+    Runs in three stages: one query for every book already stored, rate-limited
+    concurrent Google ISBN lookups for the rest, and a single bulk insert for
+    the new rows. Stage timings go to the nyt_hydration_stage_seconds metric.
     """
+    timings = {}
+    started = time.perf_counter()
+
+    # Stage 1: load every known book in one query, matching NYT ISBNs against
+    # books stored under their Google volume id as well
+    google_books_ids = {book["google_books_id"] for book in book_data_list}
+    isbns = {
+        gid: gid[len(ISBN_ID_PREFIX):] for gid in google_books_ids if gid.startswith(ISBN_ID_PREFIX)
+    }
+    existing_books = {}
+    if google_books_ids:
+        rows = Book.query.filter(or_(
+            Book.google_books_id.in_(google_books_ids), Book.isbn_13.in_(set(isbns.values()))
+        )).order_by(Book.id).all()
+        by_id = {b.google_books_id: b for b in rows}
+        by_isbn = {}
+        for b in rows:
+            by_isbn.setdefault(b.isbn_13, b)
+        for gid in google_books_ids:
+            book = by_id.get(gid) or by_isbn.get(isbns.get(gid))
+            if book:
+                existing_books[gid] = book
+    timings["db_lookup"] = time.perf_counter() - started
+
+    # Stage 2: fetch the unknown ones from Google on a bounded pool
+    stage_started = time.perf_counter()
+    missing_ids = sorted(google_books_ids - existing_books.keys())
+    fetched = {}
+
+    def lookup(gid):
+        # Each lookup waits on the shared Google quota at background priority
+        try:
+            return fetch_google_books_by_isbn(gid[len(ISBN_ID_PREFIX):])
+        except requests.exceptions.RequestException as e:
+            # Kept with the NYT data alone; a later refresh tries again
+            logger.warning("Error fetching Google Books data for %s: %s", gid, e)
+            return None
+
+    if missing_ids:
+        with ThreadPoolExecutor(max_workers=min(HYDRATION_WORKERS, len(missing_ids))) as pool:
+            results = pool.map(lookup, missing_ids)
+            fetched = dict(zip(missing_ids, results))
+
+        # ISBNs Google resolved to a volume we already store under its volume id
+        volume_ids = {info["google_books_id"]: gid for gid, info in fetched.items() if info}
+        if volume_ids:
+            for b in Book.query.filter(Book.google_books_id.in_(volume_ids.keys())).all():
+                existing_books[volume_ids[b.google_books_id]] = b
+    timings["google_fetch"] = time.perf_counter() - stage_started
+
+    # Stage 3: merge and write all new books in one transaction
+    stage_started = time.perf_counter()
+    new_books = {}
     hydrated_books = []
     for book in book_data_list:
-        # Check if the book is already in the database
-        existing_book = Book.query.filter_by(google_books_id=book["google_books_id"]).first()
+        google_books_id = book["google_books_id"]
+        existing_book = existing_books.get(google_books_id)
         if existing_book:
             book.update({
+                # Report (and rank) the stored row, whatever id it is keyed by
+                "google_books_id": existing_book.google_books_id,
                 "title": existing_book.title,
-                "authors": existing_book.authors.split(", "),
+                "authors": list(split_names(existing_book.authors)),
                 "thumbnail_url": existing_book.thumbnail_url,
                 "description": existing_book.description,
             })
-            
-            
-        else:
-            # Fetch data from the API
-            isbn = book["google_books_id"].replace("isbn_", "")
-            response = requests.get(
-                f"https://www.googleapis.com/books/v1/volumes?q=isbn:{isbn}&key={os.environ.get('API_KEY')}"
-            )
-            if response.status_code == 200:
-                data = response.json()
-                book_info = data.get("items", [{}])[0].get("volumeInfo", {})
-                book.update({
-                    "title": book_info.get("title", "Unknown Title"),
-                    "authors": book_info.get("authors", ["Unknown Author"]),
-                    "thumbnail_url": book_info.get("imageLinks", {}).get("thumbnail", ""),
-                    "description": book_info.get("description", "No description available."),
-                })
-                # Save the book to the database
-                new_book = Book(
-                    google_books_id=book["google_books_id"],
-                    title=book["title"],
-                    authors=", ".join(book["authors"]),
-                    thumbnail_url=book["thumbnail_url"],
-                    description=book["description"],
-                )
-                db.session.add(new_book)
-                db.session.commit()
+        elif fetched.get(google_books_id):
+            book_info = fetched[google_books_id]
+            book.update({
+                "title": book_info["title"] or "Unknown Title",
+                "authors": list(split_names(book_info["authors"])) or ["Unknown Author"],
+                "thumbnail_url": book_info["thumbnail_url"],
+                "description": book_info["description"],
+            })
+            new_books.setdefault(google_books_id, {
+                "google_books_id": google_books_id,
+                "title": book["title"],
+                "authors": ", ".join(book["authors"]),
+                "thumbnail_url": book["thumbnail_url"],
+                "description": book["description"],
+                "volume_id": book_info["google_books_id"],
+                "isbn_10": book_info.get("isbn_10"),
+            })
         hydrated_books.append(book)
-    return hydrated_books
 
+    if new_books:
+        upsert_books(new_books.values())
+        db.session.commit()
+    timings["db_write"] = time.perf_counter() - stage_started
+    timings["total"] = time.perf_counter() - started
 
+    metrics.observe_hydration(timings)
+    # Once per featured refresh, so cheap enough to log at INFO
+    logger.info("Hydrated %d NYT books (%d looked up on Google, %d new) in %.2fs",
+                len(book_data_list), len(missing_ids), len(new_books), timings["total"])
+    return hydrated_books
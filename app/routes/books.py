@@ -1,10 +1,18 @@
 import datetime
-import time
-from datetime import timedelta
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify, make_response
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from ..models import Book, UserBooks, BookRanking, FeaturedMeta, db
-from .book_helpers import CACHE, CACHE_EXPIRY, cache_results, fetch_google_books_by_isbn, build_featured_lists_from_db, hydrate_nyt_books
+from sqlalchemy import func, or_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from ..models import Book, User, UserBooks, db
+from ..cache import cache
+from .book_helpers import search_books, get_volume_detail, fetch_google_books_by_isbn, build_featured_lists_page, build_featured_list_index
+from .book_helpers import books_by_author, books_by_category, sync_book_taxonomy, local_isbn_detail, stored_detail_version
+from ..book_identity import book_identity, book_matches, find_book
+from ..jobs import jobs
+from ..circuit_breaker import circuits, mark_degraded
+from .featured_helpers import get_featured_meta, get_featured_snapshot, page_featured_lists, featured_is_stale, trigger_featured_refresh
+from ..http_client import http_client
+from ..middleware.http_cache import conditional_json, conditional_response, make_etag
 import requests
 import os
 import sentry_sdk
@@ -12,61 +20,87 @@ import sentry_sdk
 
 books_bp = Blueprint('books_bp', __name__)
 
-@cache_results()
-@books_bp.route('/search', methods=['GET'])
-def search_google_books():
-    startIndex = request.args.get('startIndex', 0, type=int)
-    query = request.args.get('query', '').lower()
+# Reading statuses a user can shelve a book under
+SHELVES = ('currently_reading', 'previously_read', 'want_to_read')
 
-    # Check cache
-    cache_key = f"{query}_{startIndex}"
-    if cache_key in CACHE:
-        cached_result, timestamp = CACHE[cache_key]
-        if time.time() - timestamp < CACHE_EXPIRY:
-            print("Serving from cache.")
-            return jsonify(cached_result)
+# /search modes: see book_helpers.search_books
+SEARCH_MODES = ('google', 'local', 'hybrid')
 
-    books = []
+USER_BOOKS_PAGE_SIZE = 50
+USER_BOOKS_MAX_PAGE_SIZE = 200
 
-    if query:
-        response = requests.get(
-            f"https://www.googleapis.com/books/v1/volumes?q={query}&key={os.environ.get('API_KEY')}&startIndex={startIndex}&printType=books&maxResults=40"
-        )
-        data = response.json()
+# Cache-Control max-age (seconds) for public responses; clients revalidate with ETags after
+SEARCH_MAX_AGE = 60 * 10
+DETAIL_MAX_AGE = 60 * 60
+FEATURED_MAX_AGE = 60 * 5
+FEATURED_ARCHIVE_MAX_AGE = 60 * 60 * 24
 
-        if "items" in data:
-            for item in data["items"]:
-                book_info = item.get("volumeInfo", {})
-                sale_info = item.get("saleInfo", {})
-                retail_price = sale_info.get("listPrice", {})
-                books.append({
-                    "google_books_id": item.get("id"),
-                    "title": book_info.get("title", "Unknown Title"),
-                    "authors": book_info.get("authors", ["Unknown Author"]),
-                    "thumbnail_url": book_info.get("imageLinks", {}).get("thumbnail", ""),
-                    "published_date": book_info.get("publishedDate", "Date not available"),
-                    "page_count": book_info.get("pageCount", "Page count not available"),
-                    "categories": book_info.get("categories", ["No categories available"]),
-                    "retail_price": retail_price.get("amount", "Price not available"),
-                    "currency_code": retail_price.get("currencyCode", "USD"),
-                })
+# Largest per-list page /featured will return
+FEATURED_MAX_PAGE_SIZE = 50
 
+# Page size for /authors/<name> and /categories/<name>
+CATALOG_PAGE_SIZE = 40
+CATALOG_MAX_PAGE_SIZE = 100
+CATALOG_MAX_AGE = 60 * 10
 
-    # Cache the result
-    CACHE[cache_key] = ({"books": books, "query": query, "startIndex": startIndex}, time.time())
 
-    return jsonify(books=books, query=query, startIndex=startIndex)
+def bump_library_version(user_id):
+    """Invalidate the user's cached /user-books responses (ETag) on any shelf change."""
+    db.session.execute(
+        update(User).where(User.id == user_id).values(library_version=User.library_version + 1)
+    )
+
+@books_bp.route('/search', methods=['GET'])
+def search_google_books():
+    startIndex = request.args.get('startIndex', 0, type=int)
+    googleIndex = request.args.get('googleIndex', type=int)
+    query = " ".join(request.args.get('query', '').lower().split())
+
+    if not query:
+        return jsonify(books=[], query=query, startIndex=startIndex)
+
+    mode = request.args.get('mode', current_app.config.get("SEARCH_DEFAULT_MODE", "hybrid"))
+    if mode not in SEARCH_MODES:
+        return jsonify({"msg": "Invalid search mode provided."}), 400
+
+    # Google results are served from cache, or fetched once even when many
+    # clients miss at the same time
+    result = search_books(query, startIndex, mode, googleIndex)
+    return conditional_json(make_etag(result), lambda: result, max_age=SEARCH_MAX_AGE)
 
 
 
 @books_bp.route('/search-genre/<genre>', methods=["GET"])
 def search_genre(genre):
     startIndex = request.args.get('startIndex', 0, type=int)
+
+    cache_key = f"{genre.lower()}_{startIndex}"
+    cached_result = cache.get("genre", cache_key)
+    if cached_result is not None:
+        return jsonify(cached_result)
+
     genre_books = []
-    response = requests.get(
-        f"https://www.googleapis.com/books/v1/volumes?q=subject:{genre}&startIndex={startIndex}&printType=books&maxResults=40"
-    )
-    data = response.json()
+    try:
+        response = http_client.get(
+            "https://www.googleapis.com/books/v1/volumes",
+            params={
+                "q": f"subject:{genre}",
+                "startIndex": startIndex,
+                "printType": "books",
+                "maxResults": 40,
+            },
+        )
+        response.raise_for_status()
+        data = response.json()
+    except requests.exceptions.RequestException as e:
+        # Google is unavailable: serve an expired cached page, else our own books in the category
+        stale_result = cache.get("genre", cache_key, allow_stale=True)
+        if stale_result is not None:
+            mark_degraded("stale-cache")
+            return jsonify(stale_result)
+        mark_degraded("local-catalog")
+        local = books_by_category(genre, 40) if startIndex == 0 else None
+        return jsonify(books=local["books"] if local else [], query=genre, startIndex=startIndex)
 
     if "items" in data:
         for item in data["items"]:
@@ -85,7 +119,8 @@ def search_genre(genre):
                 "currency_code": retail_price.get("currencyCode", ""),
             })
 
-    
+    cache.set("genre", cache_key, {"books": genre_books, "query": genre, "startIndex": startIndex})
+
     return jsonify(books=genre_books, query=genre, startIndex=startIndex)
 
 @books_bp.route('/detail/<volume_id>', methods=['GET'])
@@ -94,48 +129,56 @@ def detail(volume_id):
     try:
         if volume_id.startswith("isbn_"):
             isbn = volume_id.replace("isbn_", "")
-            # Use the helper function to fetch by ISBN
-            book_data = fetch_google_books_by_isbn(isbn)
-            if not book_data:
-                return jsonify({"error": "Book details not found"}), 404
+            # The stored row (an NYT or saved book) first; Google only for ISBNs not stored yet
+            book_data = local_isbn_detail(isbn) or fetch_google_books_by_isbn(isbn)
+        else:
+            # A stored volume is validated against its row's fetch time, so a 304
+            # is answered without loading the payload (or calling Google)
+            fetched_at = stored_detail_version(volume_id)
+            if fetched_at is not None:
+                return conditional_json(
+                    make_etag("detail", volume_id, fetched_at),
+                    lambda: {"book": get_volume_detail(volume_id)},
+                    max_age=DETAIL_MAX_AGE,
+                )
+            # For non-ISBN volume IDs, read through the cache and the books table
+            book_data = get_volume_detail(volume_id)
 
-            return jsonify({"book": book_data}), 200
+        if not book_data:
+            return jsonify({"error": "Book details not found"}), 404
 
-        # For non-ISBN volume IDs, fetch directly
-        response = requests.get(
-            f"https://www.googleapis.com/books/v1/volumes/{volume_id}?key={os.environ.get('API_KEY')}"
-        )
-        response.raise_for_status()
-        data = response.json()
+        return conditional_json(make_etag(book_data), lambda: {"book": book_data}, max_age=DETAIL_MAX_AGE)
 
-        if "volumeInfo" not in data:
-            return jsonify({"error": "Book details not found"}), 404
+    except requests.exceptions.RequestException as e:
+        # Not stored locally and Google is unavailable
+        sentry_sdk.capture_exception(e)
+        mark_degraded("unavailable")
+        return jsonify({"error": "Book details are temporarily unavailable"}), 503
 
-        volume_info = data["volumeInfo"]
-        sale_info = data.get("saleInfo", {})
-
-        result = {
-            "google_books_id": volume_id,
-            "title": volume_info.get("title", "Unknown Title"),
-            "authors": volume_info.get("authors", ["Unknown Author"]),
-            "description": volume_info.get("description", "Description not available"),
-            "publishedDate": volume_info.get("publishedDate", "Date not available"),
-            "pageCount": volume_info.get("pageCount", 0),
-            "categories": volume_info.get("categories", ["No categories available"]),
-            "imageLinks": volume_info.get("imageLinks", {}),
-            "publisher": volume_info.get("publisher", "Publisher not available"),
-            "retailPrice": sale_info.get("retailPrice", {}).get("amount"),
-            "currencyCode": sale_info.get("retailPrice", {}).get("currencyCode"),
-        }
 
 
-        return jsonify({"book": result}), 200
 
-    except requests.exceptions.RequestException as e:
-        sentry_sdk.capture_exception(e)
-        return jsonify({"error": "Failed to fetch book details"}), 500
+@books_bp.route('/authors/<name>', methods=['GET'])
+def get_author_books(name):
+    """Stored books by an author (case-insensitive). Query params: limit, cursor."""
+    return catalog_page(books_by_author, name, "Author not found")
+
+
+@books_bp.route('/categories/<name>', methods=['GET'])
+def get_category_books(name):
+    """Stored books in a category (case-insensitive). Query params: limit, cursor."""
+    return catalog_page(books_by_category, name, "Category not found")
+
 
+def catalog_page(lookup, name, not_found):
+    """Shared body of the author/category lookups: page through `lookup(name, ...)`."""
+    limit = max(1, min(request.args.get('limit', CATALOG_PAGE_SIZE, type=int), CATALOG_MAX_PAGE_SIZE))
+    cursor = request.args.get('cursor', type=int)
 
+    result = lookup(name, limit, cursor)
+    if result is None:
+        return jsonify({"error": not_found}), 404
+    return conditional_json(make_etag(result), lambda: result, max_age=CATALOG_MAX_AGE)
 
 
 @books_bp.route('/save-book', methods=['POST'])
@@ -151,195 +194,243 @@ def save_book():
         status = status.lower().replace(" ", "_")
 
     # Validate status
-    allowed_statuses = {'currently_reading', 'want_to_read', 'previously_read'}
-    if status not in allowed_statuses:
+    if status not in SHELVES:
         return jsonify({"msg": "Invalid status provided."}), 400
 
-    # Check if the book already exists by title and author
-    book = Book.query.filter_by(title=data.get('title'), authors=", ".join(data.get('authors', []))).first()
-
-    if not book:
-        # Fetch the book data from Google Books if it doesn't exist
-        response = requests.get(f"https://www.googleapis.com/books/v1/volumes/{google_books_id}?key={os.environ.get('API_KEY')}")
-        book_data = response.json()["volumeInfo"]
-
-        new_book = Book(
-            google_books_id=google_books_id,
-            title=book_data.get("title", "Unknown Title"),
-            authors=", ".join(book_data.get("authors", ["Unknown Author"])),
-            thumbnail_url=book_data.get("imageLinks", {}).get("thumbnail", ""),
-            description=book_data.get("description", "No description available."),
-            published_date=book_data.get("publishedDate", "Date not available"),
-            average_rating=book_data.get("averageRating", None),
-            ratings_count=book_data.get("ratingsCount", 0),
-            page_count=book_data.get("pageCount"),
-            categories=", ".join(book_data.get("categories", ["No categories available"])),
-            retail_price=book_data.get("saleInfo", {}).get("listPrice", {}).get("amount", 0.0),
-            currency_code=book_data.get("saleInfo", {}).get("listPrice", {}).get("currencyCode", "USD"),
-        )
-
-
-        db.session.add(new_book)
-        db.session.flush()
-
-        user_book_link = UserBooks(user_id=user_id, book_id=new_book.id, status=status)
-        db.session.add(user_book_link)
+    # Resolve the book through its canonical identity (one indexed query); the
+    # client already sent its search result, so a new book is stored from that
+    # and enriched from Google after the response.
+    authors = ", ".join(data.get('authors') or ["Unknown Author"])
+    identity = book_identity(google_books_id, data.get('title'), authors, data.get('isbn_10'), data.get('isbn_13'))
+    book = find_book(google_books_id, identity)
 
+    if book:
+        book_id = book.id
     else:
-        # If the book already exists, just link it to the user
-        user_book_link = UserBooks.query.filter_by(user_id=user_id, book_id=book.id).first()
-
-        if user_book_link:
-            user_book_link.status = status
-        else:
-            user_book_link = UserBooks(user_id=user_id, book_id=book.id, status=status)
-            db.session.add(user_book_link)
-
+        row = {
+            "google_books_id": google_books_id,
+            "title": data.get('title') or "Unknown Title",
+            "authors": authors,
+            "thumbnail_url": data.get('thumbnail_url') or "",
+            "description": data.get('description') or "No description available.",
+            "published_date": data.get('published_date') or "Date not available",
+            "page_count": data.get('page_count') if isinstance(data.get('page_count'), int) else None,
+            "categories": ", ".join(data.get('categories') or ["No categories available"]),
+            "retail_price": data.get('retail_price') if isinstance(data.get('retail_price'), (int, float)) else None,
+            "currency_code": (data.get('currency_code') or "USD")[:3],
+            **identity,
+        }
+        # Single-statement upsert; a concurrent save of the same id just returns the existing row
+        stmt = pg_insert(Book).values(row)
+        book_id = db.session.execute(stmt.on_conflict_do_update(
+            index_elements=["google_books_id"],
+            set_={"google_books_id": stmt.excluded.google_books_id},
+        ).returning(Book.id)).scalar_one()
+        sync_book_taxonomy({book_id: (row["authors"], row["categories"])})
+
+    stmt = pg_insert(UserBooks).values(user_id=user_id, book_id=book_id, status=status)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=["user_id", "book_id"],
+        set_={"status": stmt.excluded.status},
+    ))
+
+    bump_library_version(user_id)
     db.session.commit()
 
-    return jsonify({"msg": "Book saved successfully"}), 201
+    if book:
+        return jsonify({"msg": "Book saved successfully"}), 201
+
+    # Fill in the rest from Google off the request path; clients can poll /api/jobs/<job_id>
+    job_id = jobs.enqueue("enrich_book", google_books_id, dedup_key=f"enrich:{google_books_id}", owner_id=int(user_id))
+    return jsonify({"msg": "Book saved successfully", "job_id": job_id}), 201
 
 @books_bp.route('/<volume_id>/remove', methods=["POST"])
 @jwt_required()
 def remove_user_book(volume_id):
     user_id = get_jwt_identity()
-    book_to_remove = Book.query.filter_by(google_books_id=volume_id).first()
-
-    if not book_to_remove:
-        return jsonify({"msg": "Book not found"}), 404
-
-    user_book = UserBooks.query.filter_by(
-        user_id=user_id, book_id=book_to_remove.id).first()
+    # Match the book the way save_book resolved it: the shelved row may be an
+    # NYT (ISBN-keyed) row or one keyed by another id for the same volume
+    matches = book_matches(volume_id, book_identity(volume_id, None, None))
+    user_books = (
+        UserBooks.query
+        .join(Book, Book.id == UserBooks.book_id)
+        .filter(UserBooks.user_id == user_id, or_(*matches))
+        .all()
+    )
 
-    if user_book:
-        db.session.delete(user_book)
+    if user_books:
+        for user_book in user_books:
+            db.session.delete(user_book)
+        bump_library_version(user_id)
         db.session.commit()
         return jsonify({"msg": "Book removed successfully"}), 200
+    elif find_book(volume_id, book_identity(volume_id, None, None)) is None:
+        return jsonify({"msg": "Book not found"}), 404
     else:
         return jsonify({"msg": "Book not found in your lists"}), 404
 
 @books_bp.route('/user-books', methods=['GET'])
 @jwt_required()
 def get_user_books():
+    """
+    Return the user's books grouped by shelf (status), one page per shelf.
+
+    Query params:
+      shelf  - comma-separated shelves to return (default: all three)
+      limit  - books per shelf (default 50, max 200)
+      cursor - `next_cursor` from a previous response; requires a single shelf
+    """
     user_id = get_jwt_identity()
+    limit = max(1, min(request.args.get('limit', USER_BOOKS_PAGE_SIZE, type=int), USER_BOOKS_MAX_PAGE_SIZE))
+    cursor = request.args.get('cursor', type=int)
+
+    shelf_arg = request.args.get('shelf')
+    shelves = [s.strip() for s in shelf_arg.split(',')] if shelf_arg else list(SHELVES)
+    if any(shelf not in SHELVES for shelf in shelves):
+        return jsonify({"msg": "Invalid shelf provided."}), 400
+    if cursor is not None and len(shelves) != 1:
+        return jsonify({"msg": "cursor requires a single shelf."}), 400
+
+    # The ETag changes whenever the user's library does (see bump_library_version, and
+    # bump_shelving_library_versions when a job rewrites a shelved book), so an
+    # unchanged library revalidates with a 304 and no shelf queries.
+    library_version = db.session.query(User.library_version).filter_by(id=user_id).scalar()
+    etag = make_etag("user-books", user_id, library_version, request.query_string.decode())
+
+    def build():
+        # Number each shelf's rows in user_books order, then keep the first limit + 1
+        # per shelf (the extra row tells us whether there is a next page).
+        ranked = (
+            db.session.query(
+                UserBooks.id.label('user_book_id'),
+                UserBooks.book_id.label('book_id'),
+                UserBooks.status.label('status'),
+                func.row_number().over(partition_by=UserBooks.status, order_by=UserBooks.id).label('position'),
+            )
+            .filter(UserBooks.user_id == user_id, UserBooks.status.in_(shelves))
+        )
+        if cursor is not None:
+            ranked = ranked.filter(UserBooks.id > cursor)
+        ranked = ranked.subquery()
+
+        rows = (
+            db.session.query(ranked.c.status, ranked.c.user_book_id, Book)
+            .join(Book, Book.id == ranked.c.book_id)
+            .filter(ranked.c.position <= limit + 1)
+            .order_by(ranked.c.status, ranked.c.user_book_id)
+            .all()
+        )
+
+        counts = dict(
+            db.session.query(UserBooks.status, func.count(UserBooks.id))
+            .filter(UserBooks.user_id == user_id)
+            .group_by(UserBooks.status)
+            .all()
+        )
+
+        result = {shelf: [] for shelf in shelves}
+        next_cursor = {shelf: None for shelf in shelves}
+        last_seen = {}
+        for status, user_book_id, book in rows:
+            if len(result[status]) == limit:
+                next_cursor[status] = last_seen[status]
+                continue
+            result[status].append(book.to_dict())
+            last_seen[status] = user_book_id
+
+        return {
+            **result,
+            'counts': {shelf: counts.get(shelf, 0) for shelf in SHELVES},
+            'next_cursor': next_cursor,
+        }
+
+    return conditional_json(etag, build, private=True)
+
 
-    # Fetch UserBooks based on their status
-    user_books = UserBooks.query.filter_by(user_id=user_id).all()
-    
-    print("================+++++++>",user_books)
-
-    # Organize the books by status
-    currently_reading = [ub.book.to_dict() for ub in user_books if ub.status == 'currently_reading']
-    previously_read = [ub.book.to_dict() for ub in user_books if ub.status == 'previously_read']
-    want_to_read = [ub.book.to_dict() for ub in user_books if ub.status == 'want_to_read']
-
-    # Debugging: Print serialized data
-    print("Currently Reading:", currently_reading)
-    print("Previously Read:", previously_read)
-    print("Want to Read:", want_to_read)
-
-    # Return the books as JSON
-    return jsonify({
-        'currently_reading': currently_reading,
-        'previously_read': previously_read,
-        'want_to_read': want_to_read,
-    })
-   
 @books_bp.route('/featured', methods=['GET'])
 def get_featured_books():
     nyt_api_key = os.environ.get('NYT_API_KEY', '')
     if not nyt_api_key:
         return jsonify({"error": "NYT_API_KEY not configured."}), 500
 
-   # Check if data is less than 24 hours old
-    meta = FeaturedMeta.query.first()
-    now = datetime.datetime.now(datetime.timezone.utc)
-    twenty_four_hours_ago = now - timedelta(hours=24)
-
-    if meta and meta.last_updated:
-        # Ensure meta.last_updated is timezone-aware
-        if meta.last_updated.tzinfo is None:
-            meta.last_updated = meta.last_updated.replace(tzinfo=datetime.timezone.utc)
-
-        # Check if the data is still fresh
-        if meta.last_updated > twenty_four_hours_ago:
-            featured_lists = build_featured_lists_from_db()
-            return jsonify({
-                "bestsellers_date": None,
-                "published_date": None,
-                "featured_lists": featured_lists
-            })
-
-    # Fetch new data from NYTimes API
-    try:
-        response = requests.get(f"https://api.nytimes.com/svc/books/v3/lists/full-overview.json?api-key={nyt_api_key}")
-        response.raise_for_status()
-        data = response.json()
-    except requests.exceptions.RequestException as e:
-        return jsonify({"error": f"Failed to fetch NYTimes data: {str(e)}"}), 500
-
-    # Process and save data to the database
-    results = data.get("results", {})
-    bestsellers_date = results.get("bestsellers_date")  # Extract the bestsellers date
-
-    for list_obj in results.get("lists", []):
-        list_name = list_obj.get("list_name")
-        books = hydrate_nyt_books([
-            {
-                "rank": book.get("rank"),
-                "title": book.get("title"),
-                "author": book.get("author"),
-                "book_image": book.get("book_image"),
-                "google_books_id": f"isbn_{book.get('primary_isbn13')}",
-                "categories": book.get("categories", []),
-            } for book in list_obj.get("books", [])
-        ])
-
-
-        # Save or update books and rankings
-        for book in books:
-            existing_book = Book.query.filter_by(google_books_id=book["google_books_id"]).first()
-
-            if not existing_book:
-                new_book = Book(
-                    google_books_id=book["google_books_id"],
-                    title=book["title"],
-                    authors=book["author"],
-                    thumbnail_url=book["book_image"],
-                    description=book.get("description", "No description available."),
-                )
-                db.session.add(new_book)
-                db.session.flush()  # Flush to get the new book ID
-                book_id = new_book.id
-            else:
-                book_id = existing_book.id
-
-            # Save or update the ranking for this book in BookRanking
-            ranking = BookRanking.query.filter_by(book_id=book_id, list_name=list_name).first()
-
-            if ranking:
-                ranking.rank = book["rank"]
-                ranking.bestsellers_date = bestsellers_date  # Update bestsellers_date
-            else:
-                ranking = BookRanking(
-                    book_id=book_id,
-                    list_name=list_name,
-                    rank=book["rank"],
-                    bestsellers_date=bestsellers_date,  # Set bestsellers_date
-                )
-                db.session.add(ranking)
-
-    # Update the last_updated timestamp in FeaturedMeta
-    if not meta:
-        meta = FeaturedMeta(last_updated=now)
-        db.session.add(meta)
-    else:
-        meta.last_updated = now
-
-    db.session.commit()
-
-    return jsonify({
-        "bestsellers_date": bestsellers_date,
-        "published_date": results.get("published_date"),
-        "featured_lists": build_featured_lists_from_db()  # Fetch updated data from the database
-    })
\ No newline at end of file
+    # Always serve the lists we already have; refresh them in the background
+    # when they are older than FEATURED_REFRESH_INTERVAL.
+    meta = get_featured_meta()
+    if featured_is_stale(meta):
+        trigger_featured_refresh(meta)
+        if meta.last_updated and (meta.refresh_status == 'failed' or circuits.is_open("nyt")):
+            # NYT is failing: the stored lists are all we can serve
+            mark_degraded("featured-snapshot")
+
+    bestsellers_date = request.args.get('date') or None
+    if bestsellers_date:
+        try:
+            bestsellers_date = datetime.date.fromisoformat(bestsellers_date)
+        except ValueError:
+            return jsonify({"error": "date must be YYYY-MM-DD."}), 400
+
+    # list_name (repeatable or comma-separated), limit (books per list) and
+    # cursor (rank to continue after) select a page instead of the full snapshot
+    list_names = [name.strip() for arg in request.args.getlist('list_name') for name in arg.split(',') if name.strip()]
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor', type=int)
+    if list_names or limit is not None or cursor is not None:
+        if limit is not None:
+            limit = max(1, min(limit, FEATURED_MAX_PAGE_SIZE))
+        response = featured_page(meta, bestsellers_date, list_names, limit, cursor)
+        response.headers["X-Featured-Refresh-Status"] = meta.refresh_status
+        return response
+
+    # Serve the stored, pre-serialized snapshot for the week as-is
+    snapshot = get_featured_snapshot(meta, bestsellers_date)
+    if snapshot is None:
+        return jsonify({"error": "No featured lists for that date."}), 404
+    payload, etag = snapshot
+
+    current = bestsellers_date is None or bestsellers_date == meta.bestsellers_date
+    response = conditional_response(
+        etag,
+        lambda: current_app.response_class(payload, mimetype="application/json"),
+        max_age=FEATURED_MAX_AGE if current else FEATURED_ARCHIVE_MAX_AGE,
+        last_modified=meta.last_updated if current else None,
+    )
+    response.headers["X-Featured-Refresh-Status"] = meta.refresh_status
+    return response
+
+
+def featured_page(meta, bestsellers_date, list_names, limit, cursor):
+    """Filtered/paginated /featured response."""
+    params = {"list_names": sorted(list_names), "limit": limit, "cursor": cursor}
+
+    if bestsellers_date is None or bestsellers_date == meta.bestsellers_date:
+        # Current week: filtering and top-N per list run in SQL
+        etag = make_etag("featured-page", meta.last_updated, params)
+        return conditional_json(etag, lambda: {
+            "bestsellers_date": meta.bestsellers_date.isoformat() if meta.bestsellers_date else None,
+            "published_date": meta.published_date.isoformat() if meta.published_date else None,
+            "featured_lists": build_featured_lists_page(list_names, limit, cursor),
+        }, max_age=FEATURED_MAX_AGE, last_modified=meta.last_updated)
+
+    # Past weeks only exist as snapshots; filter the stored payload
+    snapshot = get_featured_snapshot(meta, bestsellers_date)
+    if snapshot is None:
+        return make_response(jsonify({"error": "No featured lists for that date."}), 404)
+    payload, snapshot_etag = snapshot
+
+    def build():
+        data = current_app.json.loads(payload)
+        data["featured_lists"] = page_featured_lists(data["featured_lists"], list_names, limit, cursor)
+        return data
+
+    return conditional_json(make_etag(snapshot_etag, params), build, max_age=FEATURED_ARCHIVE_MAX_AGE)
+
+
+@books_bp.route('/featured/lists', methods=['GET'])
+def get_featured_list_index():
+    """Lightweight index of the stored NYT lists, for clients that load lists one at a time."""
+    meta = get_featured_meta()
+    etag = make_etag("featured-lists", meta.last_updated)
+    return conditional_json(etag, lambda: {
+        "bestsellers_date": meta.bestsellers_date.isoformat() if meta.bestsellers_date else None,
+        "lists": build_featured_list_index(),
+    }, max_age=FEATURED_MAX_AGE, last_modified=meta.last_updated)
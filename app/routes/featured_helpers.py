@@ -0,0 +1,277 @@
+import datetime
+import hashlib
+import os
+from flask import current_app
+from sqlalchemy import and_, delete, or_, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from ..models import BookRanking, FeaturedMeta, FeaturedSnapshot, db
+from ..cache.memory import MemoryBackend
+from ..http_client import http_client
+from ..jobs import jobs
+from .book_helpers import build_featured_lists_from_db, hydrate_nyt_books, upsert_books
+
+# Serialized snapshots (payload bytes, etag) this process has already loaded
+_snapshots = MemoryBackend(max_entries=16, max_bytes=32 * 1024 * 1024)
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _as_utc(value):
+    """DateTime columns come back naive; treat them as UTC."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+def _parse_date(value):
+    """NYT dates arrive as 'YYYY-MM-DD' strings."""
+    return datetime.date.fromisoformat(value) if value else None
+
+
+def get_featured_meta():
+    """Return the single FeaturedMeta row, creating it on first use."""
+    meta = FeaturedMeta.query.order_by(FeaturedMeta.id).first()
+    if not meta:
+        meta = FeaturedMeta(refresh_status='idle')
+        db.session.add(meta)
+        db.session.commit()
+    return meta
+
+
+def featured_is_stale(meta):
+    """True when the lists were never fetched or are older than FEATURED_REFRESH_INTERVAL."""
+    if not meta.last_updated:
+        return True
+    interval = current_app.config.get("FEATURED_REFRESH_INTERVAL", datetime.timedelta(hours=24))
+    return _as_utc(meta.last_updated) <= _utcnow() - interval
+
+
+def claim_featured_refresh(meta):
+    """
+    Atomically mark the refresh as running. Only one worker can win the claim;
+    a 'running' claim older than FEATURED_REFRESH_LOCK_TIMEOUT is considered
+    abandoned, and a failed refresh is retried after FEATURED_REFRESH_RETRY_AFTER.
+
+    `meta` is the row as just read, so while another claim still holds every
+    stale GET stops at that read instead of an UPDATE and COMMIT.
+    """
+    now = _utcnow()
+    lock_timeout = current_app.config.get("FEATURED_REFRESH_LOCK_TIMEOUT", datetime.timedelta(minutes=15))
+    retry_after = current_app.config.get("FEATURED_REFRESH_RETRY_AFTER", datetime.timedelta(minutes=5))
+
+    started_at = _as_utc(meta.refresh_started_at)
+    if not (
+        started_at is None
+        or (meta.refresh_status != 'running' and started_at < now - retry_after)
+        or started_at < now - lock_timeout
+    ):
+        return False
+
+    # The same test again, in the UPDATE, so two workers that both read an
+    # expired claim cannot both win it
+    result = db.session.execute(
+        update(FeaturedMeta)
+        .where(FeaturedMeta.id == meta.id)
+        .where(or_(
+            FeaturedMeta.refresh_started_at.is_(None),
+            and_(FeaturedMeta.refresh_status != 'running', FeaturedMeta.refresh_started_at < now - retry_after),
+            FeaturedMeta.refresh_started_at < now - lock_timeout,
+        ))
+        .values(refresh_status='running', refresh_started_at=now, refresh_error=None)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def trigger_featured_refresh(meta):
+    """
+    Queue at most one refresh of the featured lists. Returns the job id if
+    this call queued one, else None.
+    """
+    if not claim_featured_refresh(meta):
+        return None
+    # refresh_featured_lists records its own failures and claim_featured_refresh
+    # decides when to retry, so the job itself is never retried
+    return jobs.enqueue("refresh_featured_lists", meta.id, dedup_key="featured-refresh", max_attempts=1)
+
+
+@jobs.task("refresh_featured_lists")
+def refresh_featured_lists(meta_id):
+    """
+    Fetch the NYT full overview, hydrate its books and store the rankings.
+    Records the outcome in FeaturedMeta.refresh_status.
+    """
+    try:
+        response = http_client.get(
+            "https://api.nytimes.com/svc/books/v3/lists/full-overview.json",
+            params={"api-key": os.environ.get('NYT_API_KEY', '')},
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        results = data.get("results", {})
+        bestsellers_date = _parse_date(results.get("bestsellers_date"))
+        save_featured_rankings(results.get("lists", []), bestsellers_date)
+
+        meta = db.session.get(FeaturedMeta, meta_id)
+        meta.last_updated = _utcnow()
+        meta.bestsellers_date = bestsellers_date
+        meta.published_date = _parse_date(results.get("published_date"))
+        meta.refresh_status = 'idle'
+        if bestsellers_date:
+            save_featured_snapshot(bestsellers_date, meta.published_date)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        meta = db.session.get(FeaturedMeta, meta_id)
+        meta.refresh_status = 'failed'
+        meta.refresh_error = f"Failed to refresh NYTimes data: {str(e)}"
+        db.session.commit()
+
+
+def save_featured_rankings(nyt_lists, bestsellers_date):
+    """Save or update books and their rankings for each NYT list, replacing the previous week's."""
+    # Hydrate every list in one pass so books on several lists are looked up once
+    books = hydrate_nyt_books([
+        {
+            "list_name": list_obj.get("list_name"),
+            "rank": book.get("rank"),
+            "title": book.get("title"),
+            "author": book.get("author"),
+            "book_image": book.get("book_image"),
+            "google_books_id": f"isbn_{book.get('primary_isbn13')}",
+            "categories": book.get("categories", []),
+        }
+        for list_obj in nyt_lists
+        for book in list_obj.get("books", [])
+    ])
+
+    # Insert any book hydration couldn't find on Google, then resolve all ids at once
+    book_ids = upsert_books(
+        {
+            "google_books_id": book["google_books_id"],
+            "title": book["title"],
+            "authors": book["author"],
+            "thumbnail_url": book["book_image"],
+            "description": book.get("description", "No description available."),
+        }
+        for book in books
+    )
+
+    # Save or update every ranking in one INSERT ... ON CONFLICT statement
+    rankings = {}
+    for book in books:
+        book_id = book_ids[book["google_books_id"]]
+        rankings.setdefault((book_id, book["list_name"]), {
+            "book_id": book_id,
+            "list_name": book["list_name"],
+            "rank": book["rank"],
+            "bestsellers_date": bestsellers_date,
+            "updated_at": datetime.datetime.now(),
+        })
+    if not rankings:
+        return
+
+    stmt = pg_insert(BookRanking).values(list(rankings.values()))
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=["book_id", "list_name"],
+        set_={
+            "rank": stmt.excluded.rank,
+            "bestsellers_date": stmt.excluded.bestsellers_date,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ))
+    # The rankings table holds this week only: books that dropped off a list
+    # (and lists NYT no longer publishes) would otherwise linger in the
+    # snapshot and the list counts, with ranks that collide with this week's
+    db.session.execute(
+        delete(BookRanking).where(tuple_(BookRanking.book_id, BookRanking.list_name).not_in(list(rankings)))
+    )
+
+
+def _serialize_featured(bestsellers_date, published_date):
+    """Build the /featured payload from book_rankings and serialize it once."""
+    payload = current_app.json.dumps_bytes({
+        "bestsellers_date": bestsellers_date.isoformat() if bestsellers_date else None,
+        "published_date": published_date.isoformat() if published_date else None,
+        "featured_lists": build_featured_lists_from_db(),
+    })
+    return payload, hashlib.sha1(payload).hexdigest()
+
+
+def save_featured_snapshot(bestsellers_date, published_date):
+    """Store (or replace) the serialized payload for this bestsellers week. Caller commits."""
+    payload, etag = _serialize_featured(bestsellers_date, published_date)
+    stmt = pg_insert(FeaturedSnapshot).values(
+        bestsellers_date=bestsellers_date,
+        published_date=published_date,
+        payload=payload,
+        etag=etag,
+        created_at=datetime.datetime.now(),
+    )
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=["bestsellers_date"],
+        set_={
+            "published_date": stmt.excluded.published_date,
+            "payload": stmt.excluded.payload,
+            "etag": stmt.excluded.etag,
+            "created_at": stmt.excluded.created_at,
+        },
+    ))
+    return payload, etag
+
+
+def get_featured_snapshot(meta, bestsellers_date=None):
+    """
+    Return (payload bytes, etag) for the given week, the current one by
+    default, or None if that week was never stored.
+
+    Snapshots are read from memory first, then from featured_snapshots. The
+    current week is keyed by meta.last_updated, so a refresh committed by any
+    worker is picked up on the next request. A current week stored before
+    snapshots existed is built and saved on first use.
+    """
+    current = bestsellers_date is None or bestsellers_date == meta.bestsellers_date
+    date = meta.bestsellers_date if current else bestsellers_date
+
+    if date is None:
+        # Nothing fetched from NYT yet: serve whatever is stored, unsaved
+        return _serialize_featured(None, None)
+
+    version = meta.last_updated.isoformat() if current and meta.last_updated else "archived"
+    key = f"{date.isoformat()}:{version}"
+    found, snapshot = _snapshots.get(key)
+    if found:
+        return snapshot
+
+    row = FeaturedSnapshot.query.filter_by(bestsellers_date=date).first()
+    if row:
+        snapshot = (bytes(row.payload), row.etag)
+    elif current:
+        snapshot = save_featured_snapshot(date, meta.published_date)
+        db.session.commit()
+    else:
+        return None
+
+    _snapshots.set(key, snapshot)
+    return snapshot
+
+
+def page_featured_lists(featured_lists, list_names=None, limit=None, cursor=None):
+    """
+    Apply build_featured_lists_page's filtering to an already-built
+    `featured_lists` structure (used for stored snapshots of past weeks).
+    """
+    page = []
+    for featured_list in featured_lists:
+        if list_names and featured_list["list_name"] not in list_names:
+            continue
+        books = [b for b in featured_list["books"] if cursor is None or (b["rank"] or 0) > cursor]
+        next_cursor = None
+        if limit is not None and len(books) > limit:
+            books = books[:limit]
+            next_cursor = books[-1]["rank"]
+        page.append({**featured_list, "books": books, "next_cursor": next_cursor})
+    return page
@@ -0,0 +1,31 @@
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from ..models import User, db
+from ..jobs import jobs, job_status
+
+jobs_bp = Blueprint('jobs_bp', __name__)
+
+
+@jobs_bp.route('/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    """
+    Status of a queued job, e.g. the `job_id` returned by /api/books/save-book.
+    Users only see the jobs they queued; admins see every job.
+    """
+    user_id = get_jwt_identity()
+    job = jobs.get(job_id)
+    if job is not None and str(job["owner_id"]) != str(user_id):
+        user = db.session.get(User, user_id)
+        if not (user and user.is_admin):
+            job = None
+    if job is None:
+        return jsonify({"msg": "Job not found"}), 404
+    return jsonify(job_status(job))
+
+
+@jobs_bp.route('', methods=['GET'])
+@jwt_required()
+def get_queue_stats():
+    """Number of jobs per status."""
+    return jsonify(jobs.stats())
@@ -0,0 +1,136 @@
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+import requests
+
+from .cache import cache
+from .circuit_breaker import mark_degraded
+
+# Query parameters that identify the caller rather than the request
+CREDENTIAL_PARAMS = {"key", "api-key"}
+
+# How long a cross-worker fetch lock is held, and how long other workers wait on it
+LOCK_TTL = 15
+WAIT_TIMEOUT = 10
+POLL_INTERVAL = 0.05
+
+_MISSING = object()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    in flight block until it finishes and receive the same result (or error).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+group = SingleFlight()
+
+
+def request_key(url, params=None):
+    """Normalize an upstream GET into a stable key, ignoring credentials and param order."""
+    parts = urlsplit(url)
+    items = sorted(
+        (k, str(v).strip().lower())
+        for k, v in (params or {}).items()
+        if k not in CREDENTIAL_PARAMS and v is not None
+    )
+    return f"{parts.netloc.lower()}{parts.path}?{urlencode(items)}"
+
+
+def fetch_once(namespace, key, loader, flight_key=None):
+    """
+    Return the cached value for `key`, or load it exactly once.
+
+    Concurrent misses in this process share one call to `loader` through
+    `group`. Across workers, a lock in the shared cache backend lets one
+    worker fetch while the others poll the cache for its result; a poller
+    fetches itself once the lock is released without a cached result, or after
+    WAIT_TIMEOUT. `None` results are not cached.
+
+    If the upstream call fails (including an open circuit or exhausted quota),
+    an expired entry still in its stale window is returned instead, and the
+    response is marked degraded.
+    """
+    value = cache.get(namespace, key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    flight_key = flight_key or f"{namespace}:{key}"
+
+    def load():
+        # A previous leader may have filled the cache while we queued
+        value = cache.get(namespace, key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        locked = cache.acquire_lock(flight_key, LOCK_TTL)
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while not locked and time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            value = cache.get(namespace, key, _MISSING)
+            if value is not _MISSING:
+                return value
+            # A lock released with nothing cached means the other worker got
+            # None or an error: take over now instead of waiting out the timeout
+            locked = cache.acquire_lock(flight_key, LOCK_TTL)
+
+        try:
+            value = loader()
+            if value is not None:
+                cache.set(namespace, key, value)
+            return value
+        finally:
+            if locked:
+                cache.release_lock(flight_key)
+
+    try:
+        return group.do(flight_key, load)
+    except requests.exceptions.RequestException:
+        value = cache.get(namespace, key, _MISSING, allow_stale=True)
+        if value is _MISSING:
+            raise
+        mark_degraded("stale-cache")
+        return value
@@ -0,0 +1,151 @@
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+
+from flask import g, has_request_context, request
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the current request's id, method and path, before they are queued."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get("request_id")
+            record.method = request.method
+            record.path = request.path
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keep only `rate` of DEBUG records; INFO and above always pass."""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or self.rate >= 1 or random.random() < self.rate
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, request fields and any `extra`."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class StructuredLogging:
+    """
+    Logging that never writes on the request thread.
+
+    Loggers hand records to an in-memory queue; a QueueListener thread formats
+    them (JSON lines by default, `LOG_FORMAT = "text"` for local runs) and
+    writes them to stderr, plus `LOG_FILE` when set. `LOG_LEVEL` sets the
+    level per environment, `LOG_DEBUG_SAMPLE_RATE` keeps only a fraction of
+    DEBUG records. Each request gets an id (taken from `X-Request-ID` when the
+    client sends one) that is added to every record logged during it and
+    echoed in the response, and with `LOG_REQUESTS` one line per request
+    records its status and duration.
+    """
+
+    def __init__(self, app=None):
+        self.listener = None
+        self.handler = None
+        self.log_requests = True
+        self.logger = logging.getLogger("app.requests")
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._stop()
+        level = logging.getLevelName(app.config.get("LOG_LEVEL", "INFO").upper())
+        if app.config.get("LOG_FORMAT", "json") == "json":
+            formatter = JSONFormatter()
+        else:
+            formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+
+        outputs = [logging.StreamHandler(sys.stderr)]
+        if app.config.get("LOG_FILE"):
+            outputs.append(logging.handlers.WatchedFileHandler(app.config["LOG_FILE"]))
+        for output in outputs:
+            output.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        self.handler = logging.handlers.QueueHandler(log_queue)
+        self.handler.addFilter(DebugSamplingFilter(app.config.get("LOG_DEBUG_SAMPLE_RATE", 1.0)))
+        self.handler.addFilter(RequestContextFilter())
+        self.listener = logging.handlers.QueueListener(log_queue, *outputs, respect_handler_level=True)
+
+        root = logging.getLogger()
+        root.addHandler(self.handler)
+        root.setLevel(level)
+        for name in app.config.get("LOG_QUIET_LOGGERS", ()):
+            logging.getLogger(name).setLevel(max(level, logging.WARNING))
+        self.listener.start()
+
+        self.log_requests = app.config.get("LOG_REQUESTS", True)
+        app.before_request(self._start_request)
+        app.after_request(self._end_request)
+        app.extensions["structured_logging"] = self
+
+    def _stop(self):
+        """Flush and detach a pipeline from an earlier init_app (e.g. a second app in tests)."""
+        if self.listener is not None:
+            self.listener.stop()
+            logging.getLogger().removeHandler(self.handler)
+            self.listener = self.handler = None
+
+    def _restart_after_fork(self):
+        # The listener thread does not survive fork(); start one in the child
+        if self.listener is not None:
+            self.listener = logging.handlers.QueueListener(
+                self.listener.queue, *self.listener.handlers, respect_handler_level=True)
+            self.listener.start()
+
+    @staticmethod
+    def _start_request():
+        g.request_id = request.headers.get(REQUEST_ID_HEADER, "")[:64] or uuid.uuid4().hex
+        g.request_started = time.perf_counter()
+
+    def _end_request(self, response):
+        response.headers[REQUEST_ID_HEADER] = g.get("request_id", "")
+        started = g.get("request_started")
+        if self.log_requests and started is not None:
+            self.logger.info(
+                "%s %s %s", request.method, request.path, response.status_code,
+                extra={
+                    "status": response.status_code,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                    "endpoint": request.endpoint,
+                },
+            )
+        return response
+
+
+structured_logging = StructuredLogging()
+atexit.register(structured_logging._stop)
+os.register_at_fork(after_in_child=structured_logging._restart_after_fork)
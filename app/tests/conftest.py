@@ -0,0 +1,195 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from app.http_client import http_client
+from app.models import User, db
+
+# Most of the app is Postgres-only (ON CONFLICT, SKIP LOCKED, full-text search),
+# so database tests run against TEST_DATABASE_URI and are skipped without one
+HAS_POSTGRES = (os.getenv("TEST_DATABASE_URI") or "").startswith("postgresql")
+requires_postgres = pytest.mark.skipif(not HAS_POSTGRES, reason="TEST_DATABASE_URI is not a PostgreSQL database")
+
+
+def pytest_collection_modifyitems(config, items):
+    # Skipping is for local runs: in CI (CI is set) the endpoint tests, and the
+    # query budgets they enforce, must not quietly drop out of the run
+    if os.getenv("CI") and not HAS_POSTGRES and any(item.get_closest_marker("skipif") for item in items):
+        raise pytest.UsageError("CI is set but TEST_DATABASE_URI is not a PostgreSQL database")
+
+
+class FakeClock:
+    """Stand-in for a module's `time`: `time()`/`monotonic()` return `now`, `sleep()` advances it."""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+class FakeResponse:
+    def __init__(self, data, status_code=200):
+        self.data = data
+        self.status_code = status_code
+        self.headers = {}
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeUpstreams:
+    """
+    Canned Google Books and NYT answers in place of `http_client.get`.
+    `calls` records every (url, params); `search_results` sets how many
+    volumes a Google search returns, `bestsellers_date` and `nyt_lists` the
+    NYT week served.
+    """
+
+    NYT_LISTS = [
+        ("Hardcover Fiction", ["9780000000011", "9780000000028", "9780000000035"]),
+        ("Hardcover Nonfiction", ["9780000000042", "9780000000011"]),
+    ]
+
+    def __init__(self):
+        self.calls = []
+        self.search_results = 60
+        self.bestsellers_date = "2026-10-10"
+        self.nyt_lists = self.NYT_LISTS
+
+    def get(self, url, params=None, **kwargs):
+        self.calls.append((url, params))
+        params = params or {}
+        if "nytimes.com" in url:
+            return FakeResponse(self.nyt_overview())
+        if "/volumes/" in url:
+            return FakeResponse(self.volume(url.rsplit("/", 1)[1]))
+        query = str(params.get("q", ""))
+        if query.startswith("isbn:"):
+            isbn = query[len("isbn:"):]
+            return FakeResponse({"items": [self.volume(f"vol{isbn}", isbn)]})
+        start = int(params.get("startIndex", 0))
+        end = min(start + int(params.get("maxResults", 40)), self.search_results)
+        return FakeResponse({"items": [self.volume(f"search{i}") for i in range(start, end)]})
+
+    @staticmethod
+    def volume(volume_id, isbn13=None):
+        return {
+            "id": volume_id,
+            "volumeInfo": {
+                "title": f"Title {volume_id}",
+                "authors": ["Ann Author"],
+                "description": "A description.",
+                "publishedDate": "2020",
+                "pageCount": 320,
+                "categories": ["Fiction"],
+                "publisher": "Publisher",
+                "imageLinks": {"thumbnail": f"https://img.example/{volume_id}"},
+                "industryIdentifiers": [{"type": "ISBN_13", "identifier": isbn13}] if isbn13 else [],
+            },
+            "saleInfo": {},
+        }
+
+    def nyt_overview(self):
+        return {"results": {
+            "bestsellers_date": self.bestsellers_date,
+            "published_date": "2026-10-25",
+            "lists": [
+                {"list_name": name, "books": [
+                    {"rank": rank, "title": f"Book {isbn}", "author": "Ann Author",
+                     "book_image": f"https://img.example/{isbn}", "primary_isbn13": isbn}
+                    for rank, isbn in enumerate(isbns, start=1)
+                ]}
+                for name, isbns in self.nyt_lists
+            ],
+        }}
+
+    def count(self, fragment):
+        return sum(1 for url, params in self.calls if fragment in url or fragment in str(params))
+
+
+@pytest.fixture
+def upstreams(monkeypatch):
+    """Fake Google Books/NYT behind `http_client.get`, with API keys set."""
+    fake = FakeUpstreams()
+    monkeypatch.setenv("API_KEY", "test-google-key")
+    monkeypatch.setenv("NYT_API_KEY", "test-nyt-key")
+    monkeypatch.setattr(http_client, "get", fake.get)
+    return fake
+
+
+@pytest.fixture
+def app():
+    """The Testing app with a fresh schema, inside an app context."""
+    app = create_app("Testing")
+    # Tokens need a signing key even where SECRET_KEY isn't set
+    app.config["JWT_SECRET_KEY"] = app.config["JWT_SECRET_KEY"] or "testing-jwt-secret-key-not-for-production"
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def make_user(username, is_admin=False):
+    user = User(username=username, email=f"{username}@example.com", password="password", is_admin=is_admin)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def auth_headers(user):
+    return {"Authorization": f"Bearer {create_access_token(identity=str(user.id))}"}
+
+
+@pytest.fixture
+def user(app):
+    return make_user("reader")
+
+
+@pytest.fixture
+def headers(user):
+    return auth_headers(user)
+
+
+def bare_app(**config):
+    """A Flask app with just `config`, for testing one extension on its own."""
+    from flask import Flask
+
+    app = Flask("test")
+    app.config.update(TESTING=True, **config)
+    return app
+
+
+def patch_time(monkeypatch, module, clock):
+    """Make `module`'s `time.time()` / `time.monotonic()` / `time.sleep()` follow `clock`."""
+    monkeypatch.setattr(module, "time", SimpleNamespace(
+        time=clock.time, monotonic=clock.monotonic, sleep=clock.sleep, perf_counter=clock.perf_counter))
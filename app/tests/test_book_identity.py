@@ -0,0 +1,99 @@
+from app.book_identity import (book_identity, clean_isbn, find_book, identity_hash, isbn10_to_13, isbns_from_volume,
+                               normalize_text, with_identity)
+from app.models import Book, db
+
+from .conftest import requires_postgres
+
+
+def test_normalize_text():
+    assert normalize_text("  The Hobbit: Or, There & Back Again! ") == "the hobbit or there back again"
+    assert normalize_text(None) == ""
+
+
+def test_identity_hash_ignores_case_and_punctuation():
+    assert identity_hash("Dune", "Frank Herbert") == identity_hash("DUNE!", "frank  herbert")
+    assert identity_hash("Dune", "Frank Herbert") != identity_hash("Dune Messiah", "Frank Herbert")
+
+
+def test_identity_hash_skips_placeholders():
+    assert identity_hash("Unknown Title", "Frank Herbert") is None
+    assert identity_hash("Dune", "Unknown Author") is None
+    assert identity_hash("", "Frank Herbert") is None
+
+
+def test_clean_isbn():
+    assert clean_isbn("978-0-306-40615-7") == "9780306406157"
+    assert clean_isbn("0-8044-2957-x") == "080442957X"
+    assert clean_isbn("12345") is None
+    assert clean_isbn(None) is None
+
+
+def test_isbn10_to_13():
+    assert isbn10_to_13("0306406152") == "9780306406157"
+    assert isbn10_to_13("080442957X") == "9780804429573"
+
+
+def test_isbns_from_volume():
+    volume = {"industryIdentifiers": [
+        {"type": "ISBN_10", "identifier": "0306406152"},
+        {"type": "ISBN_13", "identifier": "978-0306406157"},
+        {"type": "OTHER", "identifier": "OCLC:123"},
+    ]}
+    assert isbns_from_volume(volume) == ("0306406152", "9780306406157")
+    assert isbns_from_volume({}) == (None, None)
+
+
+def test_book_identity_for_a_google_volume():
+    identity = book_identity("zyTCAlFPjgYC", "Dune", "Frank Herbert", isbn_10="0306406152")
+    assert identity == {
+        "volume_id": "zyTCAlFPjgYC",
+        "isbn_10": "0306406152",
+        "isbn_13": "9780306406157",
+        "identity_hash": identity_hash("Dune", "Frank Herbert"),
+    }
+
+
+def test_book_identity_for_an_isbn_keyed_row():
+    identity = book_identity("isbn_9780306406157", "Dune", "Frank Herbert")
+    assert identity["volume_id"] is None
+    assert identity["isbn_13"] == "9780306406157"
+    assert book_identity("isbn_0306406152", "Dune", "Frank Herbert")["isbn_13"] == "9780306406157"
+
+
+def test_book_identity_drops_malformed_isbns():
+    identity = book_identity("vol", "Dune", "Frank Herbert", isbn_10="9780306406157", isbn_13="0306406152")
+    assert identity["isbn_10"] is None
+    assert identity["isbn_13"] is None
+
+
+def test_with_identity_fills_a_row():
+    row = with_identity({"google_books_id": "isbn_9780306406157", "title": "Dune", "authors": "Frank Herbert"})
+    assert row["google_books_id"] == "isbn_9780306406157"
+    assert row["isbn_13"] == "9780306406157"
+    assert row["identity_hash"] == identity_hash("Dune", "Frank Herbert")
+
+
+def add_book(google_books_id, title="Dune", authors="Frank Herbert", **columns):
+    book = Book(**with_identity({
+        "google_books_id": google_books_id, "title": title, "authors": authors, "thumbnail_url": "", **columns,
+    }))
+    db.session.add(book)
+    db.session.commit()
+    return book
+
+
+@requires_postgres
+def test_find_book_prefers_the_strongest_match(app):
+    # Many rows sharing the title/author hash must not hide an exact id or ISBN match
+    for i in range(12):
+        add_book(f"hash-match-{i}")
+    by_isbn = add_book("isbn_9780306406157", title="Dune (NYT)", authors="Herbert")
+    by_id = add_book("exact-volume", title="Something Else", authors="Someone")
+
+    identity = book_identity("exact-volume", "Dune", "Frank Herbert", isbn_13="9780306406157")
+    assert find_book("exact-volume", identity).id == by_id.id
+    identity = book_identity("new-volume", "Dune", "Frank Herbert", isbn_13="9780306406157")
+    assert find_book("new-volume", identity).id == by_isbn.id
+    identity = book_identity("new-volume", "Dune", "Frank Herbert")
+    assert find_book("new-volume", identity).google_books_id == "hash-match-0"
+    assert find_book("other", book_identity("other", "Emma", "Jane Austen")) is None
@@ -0,0 +1,364 @@
+"""
+Endpoint tests for /api/books. The Testing config enforces QUERY_BUDGETS and
+the N+1 check (QUERY_BUDGET_ENFORCE), so a request that runs too many
+statements, or the same statement in a loop, raises QueryBudgetExceeded here.
+"""
+import datetime
+
+import pytest
+import requests
+
+from app.http_client import http_client
+from app.metrics import metrics
+from app.models import Book, User, UserBooks, db
+
+from .conftest import auth_headers, make_user, requires_postgres
+
+pytestmark = requires_postgres
+
+
+def query_count(response):
+    return int(response.headers["X-Query-Count"])
+
+
+def shelve(user, count, status="want_to_read", start=0):
+    books = [
+        Book(google_books_id=f"vol{i}", title=f"Book {i}", authors="Ann Author, Bo Writer",
+             thumbnail_url="", categories="Fiction")
+        for i in range(start, start + count)
+    ]
+    db.session.add_all(books)
+    db.session.flush()
+    db.session.add_all(UserBooks(user_id=user.id, book_id=book.id, status=status) for book in books)
+    db.session.commit()
+    return books
+
+
+# /user-books
+
+def test_user_books_groups_shelves_with_counts(client, user, headers):
+    shelve(user, 2)
+    shelve(user, 1, status="currently_reading", start=2)
+
+    response = client.get("/api/books/user-books", headers=headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [book["title"] for book in data["want_to_read"]] == ["Book 0", "Book 1"]
+    assert [book["title"] for book in data["currently_reading"]] == ["Book 2"]
+    assert data["counts"] == {"currently_reading": 1, "previously_read": 0, "want_to_read": 2}
+
+
+def test_user_books_query_count_does_not_grow_with_the_library(client, user, headers):
+    shelve(user, 1)
+    small = query_count(client.get("/api/books/user-books", headers=headers))
+    shelve(user, 60, start=1)
+    large = client.get("/api/books/user-books", headers=headers)
+    assert large.status_code == 200
+    assert query_count(large) == small
+
+
+def test_user_books_pages_one_shelf_with_a_cursor(client, user, headers):
+    shelve(user, 5)
+    first = client.get("/api/books/user-books?shelf=want_to_read&limit=2", headers=headers).get_json()
+    assert [book["title"] for book in first["want_to_read"]] == ["Book 0", "Book 1"]
+    cursor = first["next_cursor"]["want_to_read"]
+
+    second = client.get(f"/api/books/user-books?shelf=want_to_read&limit=2&cursor={cursor}", headers=headers)
+    assert [book["title"] for book in second.get_json()["want_to_read"]] == ["Book 2", "Book 3"]
+    assert client.get("/api/books/user-books?cursor=1", headers=headers).status_code == 400
+    assert client.get("/api/books/user-books?shelf=unread", headers=headers).status_code == 400
+
+
+def test_user_books_revalidates_until_the_library_changes(client, user, headers, upstreams):
+    shelve(user, 1)
+    etag = client.get("/api/books/user-books", headers=headers).headers["ETag"]
+    not_modified = client.get("/api/books/user-books", headers={**headers, "If-None-Match": etag})
+    assert not_modified.status_code == 304
+    # Only the library version is read for a 304
+    assert query_count(not_modified) == 1
+
+    client.post("/api/books/save-book", headers=headers, json={
+        "google_books_id": "newvol", "title": "New Book", "authors": ["Cy Novelist"], "status": "want_to_read",
+    })
+    assert client.get("/api/books/user-books", headers={**headers, "If-None-Match": etag}).status_code == 200
+
+
+def test_user_books_requires_a_token(client):
+    assert client.get("/api/books/user-books").status_code == 401
+
+
+# /save-book
+
+def test_save_book_stores_and_enriches_a_new_book(client, user, headers, upstreams):
+    response = client.post("/api/books/save-book", headers=headers, json={
+        "google_books_id": "newvol", "title": "New Book", "authors": ["Cy Novelist"],
+        "categories": ["Fiction"], "status": "Want to Read",
+    })
+    assert response.status_code == 201
+    job = client.get(f"/api/jobs/{response.get_json()['job_id']}", headers=headers).get_json()
+    assert job["status"] == "succeeded"
+
+    # The enrich_book job (run inline in tests) filled the row from Google
+    book = Book.query.filter_by(google_books_id="newvol").one()
+    assert book.title == "Title newvol"
+    assert book.detail_fetched_at is not None
+    assert UserBooks.query.filter_by(user_id=user.id, book_id=book.id).one().status == "want_to_read"
+    # Bumped by the save and again when the job rewrote a shelved book
+    assert db.session.get(User, user.id).library_version == 2
+
+
+def test_save_book_reuses_a_stored_book_with_the_same_identity(client, user, headers, upstreams):
+    book = Book(google_books_id="isbn_9780000000011", title="Dune", authors="Frank Herbert", thumbnail_url="",
+                isbn_13="9780000000011")
+    db.session.add(book)
+    db.session.commit()
+
+    response = client.post("/api/books/save-book", headers=headers, json={
+        "google_books_id": "somevolume", "title": "Dune", "authors": ["Frank Herbert"],
+        "isbn_13": "978-0-00-000001-1", "status": "previously_read",
+    })
+    assert response.status_code == 201
+    assert "job_id" not in response.get_json()
+    assert Book.query.count() == 1
+    assert UserBooks.query.filter_by(user_id=user.id).one().book_id == book.id
+    assert upstreams.calls == []
+
+
+def test_save_book_rejects_unknown_shelves(client, headers):
+    response = client.post("/api/books/save-book", headers=headers, json={"google_books_id": "x", "status": "later"})
+    assert response.status_code == 400
+
+
+def test_removing_a_book_only_touches_the_users_shelf(client, user, headers):
+    other = make_user("other")
+    shelve(user, 1)
+    book = Book.query.one()
+    db.session.add(UserBooks(user_id=other.id, book_id=book.id, status="want_to_read"))
+    db.session.commit()
+
+    assert client.post("/api/books/vol0/remove", headers=headers).status_code == 200
+    assert UserBooks.query.filter_by(user_id=user.id).count() == 0
+    assert UserBooks.query.filter_by(user_id=other.id).count() == 1
+
+
+def test_removing_a_book_resolves_it_like_save_book(client, user, headers):
+    nyt = Book(google_books_id="isbn_9780000000011", title="Dune", authors="Frank Herbert", thumbnail_url="",
+               isbn_13="9780000000011", volume_id="duneVol")
+    emma = Book(google_books_id="emmaVol", title="Emma", authors="Jane Austen", thumbnail_url="",
+                volume_id="emmaVol", isbn_13="9780000000028")
+    db.session.add_all([nyt, emma])
+    db.session.flush()
+    db.session.add_all(UserBooks(user_id=user.id, book_id=book.id, status="want_to_read") for book in (nyt, emma))
+    db.session.commit()
+
+    # By the volume id of an NYT row, and by the ISBN of a volume-keyed row
+    assert client.post("/api/books/duneVol/remove", headers=headers).status_code == 200
+    assert client.post("/api/books/isbn_9780000000028/remove", headers=headers).status_code == 200
+    assert UserBooks.query.count() == 0
+    assert client.post("/api/books/duneVol/remove", headers=headers).status_code == 404
+    assert client.post("/api/books/unknown/remove", headers=headers).get_json()["msg"] == "Book not found"
+
+
+# /featured
+
+def test_featured_serves_the_stored_snapshot(client, upstreams):
+    response = client.get("/api/books/featured")
+    assert response.status_code == 200
+    lists = {entry["list_name"]: entry["books"] for entry in response.get_json()["featured_lists"]}
+    assert set(lists) == {"Hardcover Fiction", "Hardcover Nonfiction"}
+    assert len(lists["Hardcover Fiction"]) == 3
+
+    # The refresh (run inline) recorded how long each hydration stage took
+    assert 'nyt_hydration_stage_seconds_count{stage="google_fetch"}' in metrics.render()
+
+    nyt_calls = upstreams.count("nytimes.com")
+    again = client.get("/api/books/featured", headers={"If-None-Match": response.headers["ETag"]})
+    assert again.status_code == 304
+    assert upstreams.count("nytimes.com") == nyt_calls
+
+
+def test_featured_pages_lists_in_sql(client, upstreams):
+    client.get("/api/books/featured")
+    response = client.get("/api/books/featured?list_name=Hardcover Fiction&limit=2")
+    assert response.status_code == 200
+    lists = response.get_json()["featured_lists"]
+    assert [entry["list_name"] for entry in lists] == ["Hardcover Fiction"]
+    assert len(lists[0]["books"]) == 2
+
+    index = client.get("/api/books/featured/lists").get_json()
+    assert {entry["list_name"] for entry in index["lists"]} == {"Hardcover Fiction", "Hardcover Nonfiction"}
+
+
+def test_a_new_week_replaces_the_previous_rankings(client, upstreams):
+    from app.routes.featured_helpers import get_featured_meta, refresh_featured_lists
+
+    client.get("/api/books/featured")
+    upstreams.bestsellers_date = "2026-10-17"
+    upstreams.nyt_lists = [("Hardcover Fiction", ["9780000000059", "9780000000011"])]
+    refresh_featured_lists(get_featured_meta().id)
+
+    lists = client.get("/api/books/featured").get_json()["featured_lists"]
+    assert [entry["list_name"] for entry in lists] == ["Hardcover Fiction"]
+    assert [book["rank"] for book in lists[0]["books"]] == [1, 2]
+    index = client.get("/api/books/featured/lists").get_json()["lists"]
+    assert [(entry["book_count"], entry["bestsellers_date"]) for entry in index] == [(2, "2026-10-17")]
+
+
+def test_stale_featured_gets_do_not_write_while_a_refresh_is_claimed(app, client, upstreams):
+    from sqlalchemy import event
+
+    from app.routes.featured_helpers import get_featured_meta
+
+    client.get("/api/books/featured")
+    meta = get_featured_meta()
+    meta.last_updated = meta.last_updated - app.config["FEATURED_REFRESH_INTERVAL"]
+    meta.refresh_status = "running"
+    meta.refresh_started_at = datetime.datetime.now(datetime.timezone.utc)
+    db.session.commit()
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        for _ in range(3):
+            assert client.get("/api/books/featured").status_code == 200
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    assert not [sql for sql in statements if sql.startswith("UPDATE featured_meta")]
+
+
+# /search
+
+def test_search_pages_google_results_past_the_local_matches(app, client, upstreams):
+    app.config["SEARCH_LOCAL_MIN_HITS"] = 20
+    db.session.add_all(
+        Book(google_books_id=f"local{i}", title=f"Dune volume {i}", authors="Frank Herbert", thumbnail_url="")
+        for i in range(5)
+    )
+    db.session.commit()
+
+    seen = []
+    params = "query=dune"
+    for _ in range(3):
+        data = client.get(f"/api/books/search?{params}").get_json()
+        seen += [book["google_books_id"] for book in data["books"]]
+        params = f"query=dune&startIndex={data['nextStartIndex']}&googleIndex={data['nextGoogleIndex']}"
+
+    # Local matches first, then every Google result exactly once
+    google_ids = [f"search{i}" for i in range(upstreams.search_results)]
+    assert seen == [f"local{i}" for i in range(5)] + google_ids
+
+
+def test_local_search_matches_titles_authors_and_categories(client):
+    db.session.add_all([
+        Book(google_books_id="dune", title="Dune", authors="Frank Herbert", thumbnail_url="", categories="Fiction"),
+        Book(google_books_id="emma", title="Emma", authors="Jane Austen", thumbnail_url="", categories="Romance"),
+    ])
+    db.session.commit()
+
+    def local(query):
+        data = client.get(f"/api/books/search?query={query}&mode=local").get_json()
+        return [book["google_books_id"] for book in data["books"]]
+
+    assert local("dune") == ["dune"]
+    assert local("austen") == ["emma"]
+    assert local("romance") == ["emma"]
+    assert local("tolkien") == []
+
+
+def test_search_modes(client, upstreams):
+    google = client.get("/api/books/search?query=dune&mode=google").get_json()
+    assert google["source"] == "google"
+    assert len(google["books"]) == 40
+    local = client.get("/api/books/search?query=dune&mode=local").get_json()
+    assert local["source"] == "local"
+    assert client.get("/api/books/search?query=dune&mode=everything").status_code == 400
+
+
+def test_search_is_fetched_once_and_revalidated(client, upstreams):
+    response = client.get("/api/books/search?query=dune&mode=google")
+    again = client.get("/api/books/search?query=Dune&mode=google", headers={"If-None-Match": response.headers["ETag"]})
+    assert again.status_code == 304
+    assert upstreams.count("'q': 'dune'") == 1
+
+
+# /detail
+
+def test_detail_stores_the_volume_and_revalidates_without_google(client, upstreams):
+    response = client.get("/api/books/detail/abc123")
+    assert response.status_code == 200
+    assert response.get_json()["book"]["title"] == "Title abc123"
+    assert Book.query.filter_by(google_books_id="abc123").one().detail_fetched_at is not None
+
+    stored = client.get("/api/books/detail/abc123")
+    not_modified = client.get("/api/books/detail/abc123", headers={"If-None-Match": stored.headers["ETag"]})
+    assert not_modified.status_code == 304
+    assert query_count(not_modified) == 1
+    assert upstreams.count("/volumes/abc123") == 1
+
+
+def test_detail_by_isbn(client, upstreams):
+    response = client.get("/api/books/detail/isbn_9780000000011")
+    assert response.status_code == 200
+    assert response.get_json()["book"]["google_books_id"] == "vol9780000000011"
+
+
+def test_detail_serves_a_stored_isbn_row_without_google(client, upstreams):
+    db.session.add(Book(google_books_id="isbn_9780000000011", title="Dune", authors="Frank Herbert",
+                        thumbnail_url="", isbn_13="9780000000011"))
+    db.session.commit()
+
+    response = client.get("/api/books/detail/isbn_9780000000011")
+    assert response.status_code == 200
+    assert response.get_json()["book"]["title"] == "Dune"
+    assert "X-Degraded" not in response.headers
+    assert upstreams.calls == []
+
+
+def test_detail_by_volume_id_reads_the_isbn_row_resolved_to_it(client, upstreams):
+    db.session.add(Book(google_books_id="isbn_9780000000011", title="Dune", authors="Frank Herbert",
+                        thumbnail_url="", isbn_13="9780000000011", volume_id="duneVol"))
+    db.session.commit()
+
+    response = client.get("/api/books/detail/duneVol")
+    assert response.status_code == 200
+    assert response.get_json()["book"]["google_books_id"] == "isbn_9780000000011"
+
+    # The background refresh (run inline in tests) filled in that row, not a new one
+    book = Book.query.one()
+    assert book.google_books_id == "isbn_9780000000011"
+    assert book.title == "Title duneVol"
+    assert book.isbn_13 == "9780000000011"
+    assert book.detail_fetched_at is not None
+    assert upstreams.count("/volumes/duneVol") == 1
+
+
+def test_detail_is_unavailable_when_google_is_down(client, upstreams, monkeypatch):
+    def outage(url, params=None, **kwargs):
+        raise requests.exceptions.ConnectionError("Google is down")
+
+    monkeypatch.setattr(http_client, "get", outage)
+    assert client.get("/api/books/detail/isbn_9780000000011").status_code == 503
+    assert client.get("/api/books/detail/abc123").status_code == 503
+
+
+@pytest.mark.parametrize("path", ["/api/books/authors/Ann Author", "/api/books/categories/Fiction"])
+def test_catalog_lookups_stay_within_budget(client, user, path):
+    shelve(user, 30)
+    from app.routes.book_helpers import sync_book_taxonomy
+
+    sync_book_taxonomy({book.id: (book.authors, book.categories) for book in Book.query.all()})
+    db.session.commit()
+    response = client.get(f"{path}?limit=20")
+    assert response.status_code == 200
+    assert len(response.get_json()["books"]) == 20
+
+
+def test_other_users_cannot_read_a_users_shelves(client, user, headers):
+    shelve(user, 1)
+    other = make_user("other")
+    data = client.get("/api/books/user-books", headers=auth_headers(other)).get_json()
+    assert data["counts"] == {"currently_reading": 0, "previously_read": 0, "want_to_read": 0}
@@ -0,0 +1,110 @@
+import pytest
+
+from app.cache import Cache, memory, sqlite
+from app.cache.memory import MemoryBackend
+from app.cache.sqlite import SQLiteBackend
+
+from .conftest import bare_app, patch_time
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path, monkeypatch, clock):
+    if request.param == "memory":
+        patch_time(monkeypatch, memory, clock)
+        return MemoryBackend()
+    patch_time(monkeypatch, sqlite, clock)
+    return SQLiteBackend(str(tmp_path / "cache.sqlite3"))
+
+
+def test_get_set_delete(backend):
+    assert backend.get("missing") == (False, None)
+    backend.set("k", {"books": [1, 2]}, ttl=60)
+    assert backend.get("k") == (True, {"books": [1, 2]})
+    backend.delete("k")
+    assert backend.get("k") == (False, None)
+
+
+def test_entries_expire_after_ttl(backend, clock):
+    backend.set("k", "v", ttl=60)
+    clock.advance(59)
+    assert backend.get("k") == (True, "v")
+    clock.advance(2)
+    assert backend.get("k") == (False, None)
+
+
+def test_expired_entries_are_served_stale_only_on_request(backend, clock):
+    backend.set("k", "v", ttl=60, stale_ttl=600)
+    clock.advance(120)
+    assert backend.get("k") == (False, None)
+    assert backend.get("k", allow_stale=True) == (True, "v")
+    clock.advance(600)
+    assert backend.get("k", allow_stale=True) == (False, None)
+
+
+def test_add_only_sets_missing_keys(backend, clock):
+    assert backend.add("lock", True, ttl=10)
+    assert not backend.add("lock", True, ttl=10)
+    clock.advance(11)
+    assert backend.add("lock", True, ttl=10)
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", 1)
+    backend.set("b", 2)
+    backend.get("a")
+    backend.set("c", 3)
+    assert backend.get("b") == (False, None)
+    assert backend.get("a") == (True, 1)
+    assert backend.stats()["evictions"] == 1
+
+
+def test_memory_backend_is_bounded_by_size():
+    backend = MemoryBackend(max_bytes=2000)
+    backend.set("too-big", "x" * 5000)
+    assert backend.get("too-big") == (False, None)
+    for i in range(10):
+        backend.set(i, "x" * 500)
+    assert backend.stats()["bytes"] <= 2000
+
+
+def test_sqlite_backend_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    SQLiteBackend(path).set("k", [1, 2, 3], ttl=60)
+    assert SQLiteBackend(path).get("k") == (True, [1, 2, 3])
+
+
+def test_cache_namespaces_ttls_and_counters(monkeypatch, clock):
+    patch_time(monkeypatch, memory, clock)
+    cache = Cache(bare_app(CACHE_BACKEND="memory", CACHE_TTLS={"search": 10}, CACHE_DEFAULT_TTL=100))
+    cache.set("search", "dune", "search result")
+    cache.set("detail", "dune", "detail result")
+    assert cache.get("search", "dune") == "search result"
+    assert cache.get("detail", "dune") == "detail result"
+
+    clock.advance(11)
+    assert cache.get("search", "dune") is None
+    assert cache.get("detail", "dune") == "detail result"
+    assert cache.stats()["namespaces"] == {
+        "search": {"hits": 1, "misses": 1, "stale_hits": 0},
+        "detail": {"hits": 2, "misses": 0, "stale_hits": 0},
+    }
+
+
+def test_cached_decorator_calls_through_once_per_arguments():
+    cache = Cache(bare_app(CACHE_BACKEND="memory"))
+    calls = []
+
+    @cache.cached("isbn")
+    def lookup(isbn):
+        calls.append(isbn)
+        return {"isbn": isbn}
+
+    assert lookup("1") == lookup("1") == {"isbn": "1"}
+    lookup("2")
+    assert calls == ["1", "2"]
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        Cache(bare_app(CACHE_BACKEND="redis"))
@@ -0,0 +1,104 @@
+import pytest
+
+from app import circuit_breaker as circuit_module
+from app.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakers, CircuitOpenError, mark_degraded
+
+from .conftest import bare_app, patch_time
+
+
+@pytest.fixture
+def breaker(monkeypatch, clock):
+    patch_time(monkeypatch, circuit_module, clock)
+    return CircuitBreaker("google", failure_threshold=3, recovery_timeout=30)
+
+
+def test_opens_after_consecutive_failures(breaker):
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.before_call()
+    assert excinfo.value.retry_after == 30
+    assert breaker.stats() == {"state": OPEN, "failures": 3, "times_opened": 1, "rejected": 1}
+
+
+def test_success_resets_the_failure_count(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_success_closes(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock.advance(30)
+
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_half_open_probe_failure_reopens(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock.advance(30)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_cancelled_probe_frees_the_slot(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock.advance(30)
+    breaker.before_call()
+    breaker.cancel_call()
+    breaker.before_call()
+
+
+def test_registry_maps_hosts_to_breakers():
+    circuits = CircuitBreakers(bare_app(CIRCUIT_BREAKERS={
+        "google": {"hosts": ["www.googleapis.com"], "failure_threshold": 1},
+    }))
+    breaker = circuits.for_host("www.googleapis.com")
+    assert breaker.name == "google"
+    assert circuits.for_host("example.com") is None
+    assert not circuits.is_open("google")
+    breaker.record_failure()
+    assert circuits.is_open("google")
+
+
+def test_degraded_responses_are_flagged_and_not_cached():
+    app = bare_app(CIRCUIT_BREAKERS={})
+    CircuitBreakers(app)
+
+    @app.route("/fallback")
+    def fallback():
+        mark_degraded("local-catalog")
+        mark_degraded("stale-cache")
+        return "ok"
+
+    @app.route("/fresh")
+    def fresh():
+        return "ok"
+
+    client = app.test_client()
+    response = client.get("/fallback")
+    assert response.headers["X-Degraded"] == "local-catalog, stale-cache"
+    assert response.headers["Cache-Control"] == "no-store"
+    assert "X-Degraded" not in client.get("/fresh").headers
@@ -0,0 +1,8 @@
+from .conftest import requires_postgres
+
+
+@requires_postgres
+def test_hot_queries_use_their_indexes(app):
+    result = app.test_cli_runner().invoke(args=["check-query-plans"])
+    assert "FAIL" not in result.output, result.output
+    assert result.exit_code == 0
@@ -0,0 +1,84 @@
+import pytest
+
+from app.jobs import JobQueue, job_status
+from app.models import db
+
+from .conftest import auth_headers, bare_app, make_user, requires_postgres
+
+
+@pytest.fixture
+def queue():
+    """An eager, memory-backed queue on a minimal app (failures roll back its session)."""
+    app = bare_app(
+        JOB_QUEUE_BACKEND="memory", JOB_QUEUE_EAGER=True, JOB_QUEUE_MAX_ATTEMPTS=3,
+        SQLALCHEMY_DATABASE_URI="sqlite://",
+    )
+    db.init_app(app)
+    queue = JobQueue(app)
+    with app.app_context():
+        yield queue
+
+
+def test_eager_jobs_run_inline_and_keep_their_result(queue):
+    @queue.task("add")
+    def add(a, b, scale=1):
+        return (a + b) * scale
+
+    job_id = queue.enqueue("add", 2, 3, scale=10, owner_id=7)
+    job = queue.get(job_id)
+    assert job["status"] == "succeeded"
+    assert job["result"] == 50
+    assert job["attempts"] == 1
+    assert job["owner_id"] == 7
+    assert job_status(job)["result"] == 50
+
+
+def test_unknown_job_names_are_rejected(queue):
+    with pytest.raises(ValueError):
+        queue.enqueue("missing")
+
+
+def test_active_jobs_are_deduplicated(queue):
+    queue.task("noop")(lambda: None)
+    # Not yet due, so it stays queued
+    first = queue.enqueue("noop", dedup_key="refresh", delay=60)
+    assert queue.enqueue("noop", dedup_key="refresh", delay=60) == first
+    assert queue.enqueue("noop", dedup_key="other", delay=60) != first
+    assert queue.stats()["depth"] == {"queued": 2}
+
+
+def test_failed_jobs_are_retried_with_backoff(queue):
+    @queue.task("flaky")
+    def flaky():
+        raise RuntimeError("upstream down")
+
+    job = queue.get(queue.enqueue("flaky"))
+    assert job["status"] == "queued"
+    assert job["attempts"] == 1
+    assert job["last_error"] == "RuntimeError: upstream down"
+    assert job["run_at"] > job["created_at"]
+
+
+def test_jobs_fail_once_attempts_are_exhausted(queue):
+    @queue.task("broken")
+    def broken():
+        raise RuntimeError("bad payload")
+
+    job = queue.get(queue.enqueue("broken", max_attempts=1))
+    assert job["status"] == "failed"
+    assert job["finished_at"] is not None
+    assert queue.stats()["depth"] == {"failed": 1}
+
+
+@requires_postgres
+def test_jobs_are_only_visible_to_their_owner_and_admins(app, client):
+    owner, other, admin = make_user("owner"), make_user("other"), make_user("admin", is_admin=True)
+    jobs = app.extensions["jobs"]
+    jobs.task("noop")(lambda: None)
+    job_id = jobs.enqueue("noop", owner_id=owner.id)
+
+    assert client.get(f"/api/jobs/{job_id}", headers=auth_headers(owner)).status_code == 200
+    assert client.get(f"/api/jobs/{job_id}", headers=auth_headers(admin)).status_code == 200
+    response = client.get(f"/api/jobs/{job_id}", headers=auth_headers(other))
+    assert response.status_code == 404
+    assert "result" not in response.get_json()
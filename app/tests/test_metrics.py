@@ -0,0 +1,127 @@
+import subprocess
+import sys
+
+from app.metrics import Metrics, SQLiteMetricsStore
+
+from .conftest import bare_app
+
+
+def metrics_app(**config):
+    app = bare_app(**config)
+
+    @app.route("/books/<int:book_id>")
+    def book(book_id):
+        return "ok", 200 if book_id else 500
+
+    metrics = Metrics(app)
+    return app, metrics
+
+
+def test_counters_and_gauges_render_in_prometheus_text_format():
+    metrics = Metrics()
+    hits = metrics.counter("cache_hits_total", "Cache hits.", ["namespace"])
+    depth = metrics.gauge("queue_depth", "Queued jobs.")
+    hits.inc(namespace="search")
+    hits.inc(2, namespace="search")
+    hits.inc(namespace='de"tail')
+    depth.set(4)
+
+    text = metrics.render()
+    assert "# HELP cache_hits_total Cache hits.\n# TYPE cache_hits_total counter\n" in text
+    assert 'cache_hits_total{namespace="search"} 3\n' in text
+    assert 'cache_hits_total{namespace="de\\"tail"} 1\n' in text
+    assert "# TYPE queue_depth gauge\nqueue_depth 4\n" in text
+    # Metrics without samples are left out
+    assert "http_requests_total" not in text
+
+
+def test_histograms_render_cumulative_buckets():
+    metrics = Metrics()
+    latency = metrics.histogram("latency_seconds", "Latency.", ["route"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        latency.observe(value, route="/search")
+
+    text = metrics.render()
+    assert 'latency_seconds_bucket{route="/search",le="0.1"} 1\n' in text
+    assert 'latency_seconds_bucket{route="/search",le="1.0"} 3\n' in text
+    assert 'latency_seconds_bucket{route="/search",le="+Inf"} 4\n' in text
+    assert 'latency_seconds_sum{route="/search"} 4.25\n' in text
+    assert 'latency_seconds_count{route="/search"} 4\n' in text
+
+
+def test_requests_are_counted_per_route_and_status():
+    app, _ = metrics_app()
+    client = app.test_client()
+    client.get("/books/1")
+    client.get("/books/2")
+    client.get("/books/0")
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'http_requests_total{method="GET",route="/books/<int:book_id>",status="200"} 2\n' in text
+    assert 'http_requests_total{method="GET",route="/books/<int:book_id>",status="500"} 1\n' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/books/<int:book_id>"} 3\n' in text
+    # Scrapes are not counted
+    assert 'route="/metrics"' not in text
+
+
+def test_scrapes_need_the_token_outside_debug_and_tests():
+    app, metrics = metrics_app(METRICS_TOKEN="s3cret")
+    client = app.test_client()
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+    metrics.token = None
+    metrics.open_without_token = False
+    assert client.get("/metrics").status_code == 401
+
+
+def test_sqlite_store_sums_every_process(tmp_path):
+    path = str(tmp_path / "metrics.sqlite3")
+    config = {"METRICS_BACKEND": "sqlite", "METRICS_SQLITE_PATH": path, "METRICS_FLUSH_INTERVAL": 0}
+    first_app, first = metrics_app(**config)
+    second_app, second = metrics_app(**config)
+    first_app.test_client().get("/books/1")
+    second_app.test_client().get("/books/1")
+    second_app.test_client().get("/books/0")
+
+    text = first.render()
+    assert 'http_requests_total{method="GET",route="/books/<int:book_id>",status="200"} 2\n' in text
+    assert 'http_requests_total{method="GET",route="/books/<int:book_id>",status="500"} 1\n' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/books/<int:book_id>"} 3\n' in text
+    assert len({process for process, *_ in SQLiteMetricsStore(path).file.connection().execute("SELECT * FROM series")}) == 2
+
+
+def test_sqlite_store_folds_exited_processes_into_one_row_set(tmp_path):
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    path = str(tmp_path / "metrics.sqlite3")
+    config = {"METRICS_BACKEND": "sqlite", "METRICS_SQLITE_PATH": path, "METRICS_FLUSH_INTERVAL": 0}
+    app, metrics = metrics_app(**config)
+    store = metrics.store
+    # Two recycled workers, one of them already folded once
+    key = ["GET", "/books/<int:book_id>", "200"]
+    store.write(f"{exited.pid}-aaaa", [("http_requests_total", key, 4), ("retired_total", [], 1)])
+    store.write(store.EXITED_PROCESS, [("http_requests_total", key, 10)])
+    app.test_client().get("/books/1")
+
+    text = metrics.render()
+    assert 'http_requests_total{method="GET",route="/books/<int:book_id>",status="200"} 15\n' in text
+    processes = {process for process, *_ in store.file.connection().execute("SELECT * FROM series")}
+    assert processes == {store.EXITED_PROCESS, metrics.process_id}
+    # Folding again changes nothing
+    assert metrics.render() == text
+
+
+def test_forked_workers_start_from_zero_under_a_new_id():
+    metrics = Metrics()
+    requests = metrics.counter("requests_total", "Requests.")
+    queued = metrics.gauge("queued", "Queued.")
+    requests.inc(5)
+    queued.set(3)
+    process_id = metrics.process_id
+
+    metrics._after_fork()
+    assert metrics.process_id != process_id
+    assert requests.snapshot() == {}
+    assert queued.snapshot() == {(): 3}
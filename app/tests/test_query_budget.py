@@ -0,0 +1,100 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from app import create_app
+from app.config import Testing
+from app.middleware.query_budget import QueryBudget, QueryBudgetExceeded, RequestQueries, query_shape
+
+from .conftest import bare_app
+
+
+def test_query_shape_strips_literals_and_parameters():
+    assert query_shape("SELECT * FROM books WHERE id = 42") == "SELECT * FROM books WHERE id = ?"
+    assert query_shape("SELECT * FROM books WHERE title = 'It''s'") == "SELECT * FROM books WHERE title = ?"
+    assert query_shape("SELECT * FROM books WHERE id = %(id_1)s") == "SELECT * FROM books WHERE id = ?"
+    assert query_shape("SELECT * FROM books WHERE id = :id") == "SELECT * FROM books WHERE id = ?"
+    assert query_shape("SELECT * FROM books WHERE id = $1") == "SELECT * FROM books WHERE id = ?"
+
+
+def test_query_shape_collapses_in_lists_and_whitespace():
+    short = query_shape("SELECT * FROM books WHERE id IN (1, 2)")
+    long = query_shape("SELECT *\n  FROM books\n  WHERE id IN (%(a)s, %(b)s, %(c)s, lower('x'))")
+    assert short == long == "SELECT * FROM books WHERE id IN (?)"
+
+
+def test_request_queries_repeated_lists_shapes_over_threshold_worst_first():
+    queries = RequestQueries()
+    for i in range(12):
+        queries.record(f"SELECT * FROM books WHERE id = {i}", 0.001)
+    for i in range(3):
+        queries.record(f"SELECT * FROM users WHERE id = {i}", 0.001)
+    queries.record("SELECT count(*) FROM jobs", 0.002)
+
+    assert queries.count == 16
+    assert queries.time == pytest.approx(0.017)
+    assert queries.repeated(10) == [("SELECT * FROM books WHERE id = ?", 12)]
+    assert queries.repeated(3) == [("SELECT * FROM books WHERE id = ?", 12), ("SELECT * FROM users WHERE id = ?", 3)]
+    assert queries.repeated(20) == []
+
+
+def budget_app(**config):
+    app = bare_app(QUERY_STATS_HEADERS=True, QUERY_REPEAT_THRESHOLD=5, **config)
+    engine = create_engine("sqlite://")
+
+    @app.route("/loop/<int:n>")
+    def loop(n):
+        with engine.connect() as conn:
+            for i in range(n):
+                conn.execute(text(f"SELECT {i}"))
+        return "ok"
+
+    @app.route("/distinct/<int:n>")
+    def distinct(n):
+        with engine.connect() as conn:
+            for i in range(n):
+                conn.execute(text(f"SELECT {i} AS c{i}"))
+        return "ok"
+
+    QueryBudget(app)
+    return app
+
+
+def test_headers_report_statement_count_and_repeats():
+    client = budget_app().test_client()
+    response = client.get("/loop/3")
+    assert response.headers["X-Query-Count"] == "3"
+    assert response.headers["X-Query-Repeats"] == "3"
+    assert float(response.headers["X-Query-Time"]) >= 0
+
+
+def test_repeated_query_shape_fails_when_enforced():
+    client = budget_app(QUERY_BUDGET_ENFORCE=True).test_client()
+    assert client.get("/loop/4").status_code == 200
+    with pytest.raises(QueryBudgetExceeded, match="5x SELECT"):
+        client.get("/loop/5")
+
+
+def test_statement_budget_per_endpoint_fails_when_enforced():
+    client = budget_app(QUERY_BUDGET_ENFORCE=True, QUERY_BUDGETS={"distinct": 3}).test_client()
+    assert client.get("/distinct/3").status_code == 200
+    with pytest.raises(QueryBudgetExceeded, match=r"4 statements \(budget 3\)"):
+        client.get("/distinct/4")
+
+
+def test_violations_are_only_logged_when_not_enforced(caplog):
+    client = budget_app(QUERY_BUDGETS={"distinct": 1}).test_client()
+    assert client.get("/distinct/2").status_code == 200
+    assert "Query budget exceeded on distinct" in caplog.text
+
+
+def test_every_books_endpoint_has_an_enforced_budget(monkeypatch):
+    # Only builds the app, so it runs without TEST_DATABASE_URI; a renamed
+    # endpoint would otherwise fall back to QUERY_BUDGET_DEFAULT unnoticed
+    monkeypatch.setattr(Testing, "SQLALCHEMY_DATABASE_URI", "sqlite://")
+    app = create_app("Testing")
+    budgets = app.config["QUERY_BUDGETS"]
+    books_endpoints = {endpoint for endpoint in app.view_functions if endpoint.startswith("books_bp.")}
+
+    assert set(budgets) <= set(app.view_functions)
+    assert books_endpoints <= set(budgets)
+    assert app.config["QUERY_BUDGET_ENFORCE"]
@@ -0,0 +1,105 @@
+import importlib
+
+import pytest
+
+from app.quota import BACKGROUND, INTERACTIVE, QuotaExceeded, QuotaManager, parse_retry_after
+
+from .conftest import bare_app, patch_time
+
+# A power-of-two rate keeps the token arithmetic exact on the fake clock
+UPSTREAMS = {"google": {"rate": 8, "burst": 4, "hosts": ["www.googleapis.com"]}}
+HOST = "www.googleapis.com"
+
+# `app.quota` is also the name of the QuotaManager instance the package exports
+quota_module = importlib.import_module("app.quota")
+
+
+@pytest.fixture
+def manager(monkeypatch, clock):
+    patch_time(monkeypatch, quota_module, clock)
+    return QuotaManager(bare_app(
+        QUOTA_BACKEND="memory", QUOTA_UPSTREAMS=UPSTREAMS,
+        QUOTA_INTERACTIVE_TIMEOUT=0, QUOTA_BACKGROUND_TIMEOUT=0, QUOTA_BACKGROUND_RESERVE=0.5,
+    ))
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after("-5") == 0.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:30 GMT", now=1445412480.0) == 30.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_unconfigured_hosts_are_not_limited(manager):
+    for _ in range(100):
+        manager.acquire("example.com", INTERACTIVE)
+
+
+def test_bucket_allows_a_burst_then_throttles(manager, clock):
+    for _ in range(4):
+        manager.acquire(HOST, INTERACTIVE)
+    with pytest.raises(QuotaExceeded) as excinfo:
+        manager.acquire(HOST, INTERACTIVE)
+    assert excinfo.value.retry_after == 0.125
+
+    clock.advance(0.125)
+    manager.acquire(HOST, INTERACTIVE)
+    stats = manager.stats()["google"]
+    assert (stats["granted"], stats["throttled"]) == (5, 1)
+
+
+def test_interactive_callers_wait_within_their_timeout(manager, clock):
+    manager.timeouts[INTERACTIVE] = 1.0
+    for _ in range(4):
+        manager.acquire(HOST, INTERACTIVE)
+    manager.acquire(HOST, INTERACTIVE)  # sleeps on the fake clock for the next token
+    assert clock.now == 1_000_000.125
+
+
+def test_background_calls_leave_a_reserve_for_interactive_ones(manager):
+    manager.acquire(HOST, BACKGROUND)
+    manager.acquire(HOST, BACKGROUND)
+    with pytest.raises(QuotaExceeded):
+        manager.acquire(HOST, BACKGROUND)
+    manager.acquire(HOST, INTERACTIVE)
+    manager.acquire(HOST, INTERACTIVE)
+
+
+def test_429_halves_the_rate_and_blocks_for_retry_after(manager, clock):
+    manager.record(HOST, 429, retry_after="30")
+    stats = manager.stats()["google"]
+    assert stats["rate"] == 4.0
+    assert stats["blocked_for"] == 30.0
+    with pytest.raises(QuotaExceeded):
+        manager.acquire(HOST, INTERACTIVE)
+
+    clock.advance(31)
+    manager.acquire(HOST, INTERACTIVE)
+    # Successes win the rate back additively, up to the configured rate
+    for _ in range(100):
+        manager.record(HOST, 200)
+    assert manager.stats()["google"]["rate"] == 8.0
+
+
+def test_429_without_retry_after_backs_off_exponentially(manager):
+    manager.record(HOST, 429)
+    assert manager.stats()["google"]["blocked_for"] == 2.0
+    manager.record(HOST, 429)
+    assert manager.stats()["google"]["blocked_for"] == 4.0
+    assert manager.stats()["google"]["strikes"] == 2
+
+
+def test_sqlite_buckets_are_shared_between_managers(tmp_path, monkeypatch, clock):
+    patch_time(monkeypatch, quota_module, clock)
+    config = {
+        "QUOTA_BACKEND": "sqlite", "QUOTA_SQLITE_PATH": str(tmp_path / "quota.sqlite3"),
+        "QUOTA_UPSTREAMS": UPSTREAMS, "QUOTA_INTERACTIVE_TIMEOUT": 0,
+    }
+    first, second = QuotaManager(bare_app(**config)), QuotaManager(bare_app(**config))
+    first.acquire(HOST, INTERACTIVE)
+    first.acquire(HOST, INTERACTIVE)
+    second.acquire(HOST, INTERACTIVE)
+    second.acquire(HOST, INTERACTIVE)
+    with pytest.raises(QuotaExceeded):
+        first.acquire(HOST, INTERACTIVE)
@@ -0,0 +1,162 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from app import singleflight
+from app.cache import cache, memory
+from app.circuit_breaker import CircuitBreakers
+from app.singleflight import SingleFlight, fetch_once, request_key
+
+from .conftest import bare_app, patch_time
+
+
+def test_concurrent_calls_share_one_execution():
+    group = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def fn():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    def call():
+        results.append(group.do("key", fn))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=call) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    time.sleep(0.1)  # let the followers reach the in-flight call
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ["value"] * 5
+    assert group.in_flight() == 0
+
+
+def test_errors_reach_the_waiting_callers():
+    group = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    errors = []
+
+    def fn():
+        started.set()
+        release.wait(5)
+        raise ZeroDivisionError
+
+    def call():
+        try:
+            group.do("key", fn)
+        except ZeroDivisionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    started.wait(5)
+    threads.append(threading.Thread(target=call))
+    threads[1].start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(errors) == 2
+    # The failed call is forgotten; the next one runs again
+    assert group.do("key", lambda: "ok") == "ok"
+
+
+def test_request_key_ignores_credentials_order_and_case():
+    a = request_key("https://www.googleapis.com/books/v1/volumes", {"q": "Dune", "key": "secret", "startIndex": 0})
+    b = request_key("https://WWW.googleapis.com/books/v1/volumes", {"startIndex": 0, "q": "dune ", "key": "other"})
+    assert a == b
+    assert "secret" not in a
+    assert a != request_key("https://www.googleapis.com/books/v1/volumes", {"q": "dune", "startIndex": 40})
+
+
+@pytest.fixture
+def shared_cache(monkeypatch, clock):
+    patch_time(monkeypatch, memory, clock)
+    app = bare_app(CACHE_BACKEND="memory", CACHE_DEFAULT_TTL=60, CACHE_STALE_TTL=600)
+    cache.init_app(app)
+    CircuitBreakers(app)
+    return app
+
+
+def test_fetch_once_loads_then_serves_from_cache(shared_cache):
+    calls = []
+
+    def load():
+        calls.append(1)
+        return {"books": []}
+
+    assert fetch_once("search", "dune_0", load) == {"books": []}
+    assert fetch_once("search", "dune_0", load) == {"books": []}
+    assert calls == [1]
+
+
+def test_fetch_once_does_not_cache_none(shared_cache):
+    calls = []
+
+    def load():
+        calls.append(1)
+
+    fetch_once("isbn", "123", load)
+    fetch_once("isbn", "123", load)
+    assert calls == [1, 1]
+
+
+def test_fetch_once_falls_back_to_stale_entry_and_marks_degraded(shared_cache, clock):
+    fetch_once("search", "dune_0", lambda: "fresh")
+    clock.advance(120)
+
+    def failing():
+        raise requests.exceptions.ConnectionError("down")
+
+    with shared_cache.test_request_context():
+        assert fetch_once("search", "dune_0", failing) == "fresh"
+        response = shared_cache.process_response(shared_cache.response_class("ok"))
+    assert response.headers["X-Degraded"] == "stale-cache"
+
+
+def test_fetch_once_raises_without_a_stale_entry(shared_cache):
+    def failing():
+        raise requests.exceptions.ConnectionError("down")
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        fetch_once("search", "never-loaded", failing)
+
+
+def test_fetch_once_waits_for_another_workers_lock(shared_cache, monkeypatch, clock):
+    # Another worker holds the fetch lock and fills the cache while we poll
+    cache.acquire_lock("search:dune_0", singleflight.LOCK_TTL)
+    patch_time(monkeypatch, singleflight, clock)
+
+    def sleep(seconds):
+        clock.advance(seconds)
+        cache.set("search", "dune_0", "from the other worker")
+
+    monkeypatch.setattr(singleflight.time, "sleep", sleep)
+    assert fetch_once("search", "dune_0", lambda: "ours") == "from the other worker"
+
+
+def test_fetch_once_takes_over_when_the_other_worker_caches_nothing(shared_cache, monkeypatch, clock):
+    # The other worker's fetch returns None (or fails): it releases the lock without caching
+    cache.acquire_lock("isbn:123", singleflight.LOCK_TTL)
+    patch_time(monkeypatch, singleflight, clock)
+    started = clock.now
+
+    def sleep(seconds):
+        clock.advance(seconds)
+        cache.release_lock("isbn:123")
+
+    monkeypatch.setattr(singleflight.time, "sleep", sleep)
+    assert fetch_once("isbn", "123", lambda: "ours") == "ours"
+    assert clock.now - started == pytest.approx(singleflight.POLL_INTERVAL)
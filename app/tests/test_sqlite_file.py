@@ -0,0 +1,37 @@
+import os
+import threading
+
+import pytest
+
+from app import sqlite_file
+from app.sqlite_file import SQLiteFile
+
+
+def test_each_thread_and_forked_process_gets_its_own_connection(tmp_path, monkeypatch):
+    file = SQLiteFile(str(tmp_path / "shared" / "store.sqlite3"))
+    conn = file.connection()
+    assert file.connection() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(file.connection()))
+    thread.start()
+    thread.join(5)
+    assert other[0] is not conn
+
+    # After a fork the child's thread-local still holds the parent's connection
+    child_pid = os.getpid() + 1
+    monkeypatch.setattr(sqlite_file.os, "getpid", lambda: child_pid)
+    assert file.connection() is not conn
+
+
+def test_transaction_rolls_back_on_error(tmp_path):
+    file = SQLiteFile(str(tmp_path / "store.sqlite3"))
+    file.connection().execute("CREATE TABLE t (x INTEGER)")
+    with file.transaction() as conn:
+        conn.execute("INSERT INTO t VALUES (1)")
+    with pytest.raises(ZeroDivisionError):
+        with file.transaction() as conn:
+            conn.execute("INSERT INTO t VALUES (2)")
+            1 / 0
+    assert file.connection().execute("SELECT x FROM t").fetchall() == [(1,)]
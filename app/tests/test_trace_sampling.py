@@ -0,0 +1,112 @@
+import pytest
+from werkzeug.test import EnvironBuilder
+
+from app import trace_sampling
+from app.trace_sampling import TraceSampler
+
+from .conftest import bare_app, requires_postgres
+
+
+@pytest.fixture
+def sampler(monkeypatch):
+    app = bare_app(
+        SENTRY_TRACES_DEFAULT_RATE=0.05,
+        SENTRY_TRACES_ROUTE_RATES={"index": 0.0, "save": 0.5},
+        SENTRY_TRACES_TAIL_RATE=0.1,
+        SENTRY_TRACES_MAX_TAIL_RATE=0.2,
+        SENTRY_TRACES_SLOW_THRESHOLD_MS=1000,
+        SENTRY_TRACES_MAX_PER_MINUTE=100,
+    )
+    app.add_url_rule("/", "index", lambda: "ok")
+    app.add_url_rule("/save", "save", lambda: "ok", methods=["POST"])
+    app.add_url_rule("/search", "search", lambda: "ok")
+    sampler = TraceSampler(app)
+    # No database here: run on the config defaults
+    monkeypatch.setattr(sampler, "_load_overrides", lambda: {})
+    return sampler
+
+
+def head_rate(sampler, path, method="GET", parent_sampled=None):
+    environ = EnvironBuilder(path=path, method=method).get_environ()
+    return sampler.traces_sampler({"wsgi_environ": environ, "parent_sampled": parent_sampled})
+
+
+def transaction(endpoint, duration=0.1, status="ok"):
+    return {
+        "transaction": endpoint,
+        "start_timestamp": 100.0,
+        "timestamp": 100.0 + duration,
+        "contexts": {"trace": {"status": status}},
+    }
+
+
+def test_head_rate_is_the_route_rate_plus_a_bounded_tail(sampler):
+    assert head_rate(sampler, "/save", "POST") == pytest.approx(0.5 + 0.5 * 0.1)
+    assert head_rate(sampler, "/search") == pytest.approx(0.05 + 0.95 * 0.1)
+    assert head_rate(sampler, "/missing") == pytest.approx(0.05 + 0.95 * 0.1)
+
+
+def test_zero_rate_routes_are_never_traced(sampler):
+    assert head_rate(sampler, "/") == 0.0
+
+
+def test_upstream_decision_is_honoured(sampler):
+    assert head_rate(sampler, "/", parent_sampled=True) == 1.0
+    assert head_rate(sampler, "/save", "POST", parent_sampled=False) == 0.0
+
+
+def test_tail_rate_is_capped_by_config():
+    app = bare_app(SENTRY_TRACES_TAIL_RATE=1.0, SENTRY_TRACES_MAX_TAIL_RATE=0.2)
+    assert TraceSampler(app).defaults["tail_rate"] == 0.2
+
+
+def test_traced_errors_and_slow_requests_are_kept(sampler, monkeypatch):
+    monkeypatch.setattr(trace_sampling.random, "random", lambda: 0.99)
+    assert sampler.before_send_transaction(transaction("search", status="internal_error"), {}) is not None
+    assert sampler.before_send_transaction(transaction("search", duration=1.5), {}) is not None
+    assert sampler.before_send_transaction(transaction("search"), {}) is None
+    assert sampler.stats()["counters"] == {
+        "sent_sampled": 0, "sent_error": 1, "sent_slow": 1, "dropped": 1, "capped": 0}
+
+
+def test_fast_successful_requests_are_kept_at_the_route_rate(sampler, monkeypatch):
+    # save: head rate 0.55, so 0.5 / 0.55 of the traced requests are kept
+    monkeypatch.setattr(trace_sampling.random, "random", lambda: 0.9)
+    assert sampler.before_send_transaction(transaction("save"), {}) is not None
+    monkeypatch.setattr(trace_sampling.random, "random", lambda: 0.95)
+    assert sampler.before_send_transaction(transaction("save"), {}) is None
+
+
+def test_sent_transactions_are_capped_per_minute(sampler, monkeypatch):
+    monkeypatch.setattr(sampler, "_load_overrides", lambda: {"max_per_minute": 2})
+    for _ in range(3):
+        sampler.before_send_transaction(transaction("search", status="internal_error"), {})
+    assert sampler.stats()["counters"]["capped"] == 1
+
+
+@pytest.mark.parametrize("changes, message", [
+    ({"sample_everything": True}, "Unknown settings"),
+    ({"default_rate": 1.5}, "between 0 and 1"),
+    ({"tail_rate": 0.5}, "at most 0.2"),
+    ({"route_rates": {"nope": 0.1}}, "Unknown endpoint"),
+    ({"route_rates": {"search": -1}}, "between 0 and 1"),
+    ({"max_per_minute": -1}, "non-negative"),
+])
+def test_invalid_updates_are_rejected(sampler, changes, message):
+    with pytest.raises(ValueError, match=message):
+        sampler.update(changes)
+
+
+@requires_postgres
+def test_overrides_are_shared_through_the_database(app):
+    sampler = app.extensions["trace_sampler"]
+    sampler.update({"default_rate": 0.2, "route_rates": {"books_bp.detail": 0.5}})
+
+    # A second process starts from config and picks the overrides up from the table
+    other = TraceSampler(app)
+    assert other.current_settings()["default_rate"] == 0.2
+    assert other.current_settings()["route_rates"]["books_bp.detail"] == 0.5
+    assert other.current_settings()["route_rates"]["index"] == 0.0
+
+    sampler.reset()
+    assert TraceSampler(app).current_settings() == sampler.defaults
@@ -0,0 +1,64 @@
+from app.models import Book, User, UserBooks, db
+
+from .conftest import make_user, requires_postgres
+
+pytestmark = requires_postgres
+
+
+def test_sign_up_creates_the_user(client):
+    response = client.post("/api/users/sign-up", json={
+        "username": "newreader", "email": "new@example.com", "password": "secret"})
+    assert response.status_code == 201
+    assert response.get_json()["token"]
+
+    user = User.query.filter_by(username="newreader").one()
+    assert user.check_password("secret")
+    assert not user.is_admin
+
+
+def test_sign_up_rejects_missing_fields_and_taken_names(client, user):
+    assert client.post("/api/users/sign-up", json={"username": "x", "email": "x@example.com"}).status_code == 400
+    response = client.post("/api/users/sign-up", json={
+        "username": user.username, "email": "other@example.com", "password": "secret"})
+    assert response.status_code == 400
+    assert User.query.count() == 1
+
+
+def test_sign_in(client, user):
+    response = client.post("/api/users/sign-in", json={"email": user.email, "password": "password"})
+    assert response.status_code == 200
+    assert response.get_json()["username"] == user.username
+    assert client.post("/api/users/sign-in", json={"email": user.email, "password": "wrong"}).status_code == 401
+
+
+def test_profile(client, user, headers):
+    response = client.get("/api/users/profile", headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["email"] == user.email
+    assert client.get("/api/users/profile").status_code == 401
+
+
+def test_edit_profile_needs_the_password_and_a_free_username(client, user, headers):
+    make_user("taken")
+    changes = {"username": "renamed", "email": user.email, "bio": "Reads a lot", "location": "Here"}
+
+    assert client.post("/api/users/profile/edit", headers=headers,
+                       json={**changes, "password": "wrong"}).status_code == 401
+    assert client.post("/api/users/profile/edit", headers=headers,
+                       json={**changes, "username": "taken", "password": "password"}).status_code == 400
+    assert client.post("/api/users/profile/edit", headers=headers,
+                       json={**changes, "password": "password"}).status_code == 200
+    assert db.session.get(User, user.id).username == "renamed"
+
+
+def test_deleting_an_account_removes_its_shelves(client, user, headers):
+    book = Book(google_books_id="vol", title="Dune", authors="Frank Herbert", thumbnail_url="")
+    db.session.add(book)
+    db.session.flush()
+    db.session.add(UserBooks(user_id=user.id, book_id=book.id, status="want_to_read"))
+    db.session.commit()
+
+    assert client.post("/api/users/delete", headers=headers).status_code == 200
+    assert User.query.count() == 0
+    assert UserBooks.query.count() == 0
+    assert Book.query.count() == 1
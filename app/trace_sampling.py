@@ -0,0 +1,235 @@
+import datetime
+import logging
+import random
+import threading
+import time
+
+from sqlalchemy import select
+from werkzeug.exceptions import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# Runtime overrides are an app_settings row, so every worker picks them up
+SETTINGS_KEY = "trace_sampling"
+
+# Span statuses (set from the HTTP status) that count as a failed request
+ERROR_STATUSES = {"internal_error", "unknown_error", "unavailable", "deadline_exceeded", "data_loss"}
+
+RATE_SETTINGS = ("default_rate", "tail_rate")
+
+
+def _seconds(value):
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    return value
+
+
+class TraceSampler:
+    """
+    Sentry trace sampling per route, replacing a flat traces_sample_rate.
+
+    Head (`traces_sampler`): a request is traced with its endpoint's rate from
+    `route_rates` (`default_rate` otherwise). On top of that, `tail_rate` of
+    the other requests are traced as candidates for the tail keep; it is
+    bounded by SENTRY_TRACES_MAX_TAIL_RATE so tracing stays off for most
+    requests. A rate of 0 turns tracing off for the route entirely. An
+    upstream sampling decision is always honoured.
+    Tail (`before_send_transaction`): of the requests traced at the head,
+    failed ones and ones slower than `slow_threshold_ms` are sent; the rest
+    are sent so that the route's own rate holds. A request the head did not
+    trace is never sent, however it ends, so errors and slow requests are only
+    seen at the head rate. At most `max_per_minute` transactions per process
+    are sent.
+
+    Settings start from the SENTRY_TRACES_* config and can be changed at
+    runtime through `update` (PATCH /api/admin/tracing). Changes are stored in
+    the `app_settings` table, and every worker re-reads them within
+    `SENTRY_TRACES_SETTINGS_REFRESH` seconds.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.defaults = {}
+        self.settings = {}
+        self.refresh_interval = 30
+        self.max_tail_rate = 0.2
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self._minute = None
+        self._sent_this_minute = 0
+        self._counters = {"sent_sampled": 0, "sent_error": 0, "sent_slow": 0, "dropped": 0, "capped": 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.max_tail_rate = app.config.get("SENTRY_TRACES_MAX_TAIL_RATE", 0.2)
+        self.defaults = {
+            "default_rate": app.config.get("SENTRY_TRACES_DEFAULT_RATE", 0.05),
+            "route_rates": dict(app.config.get("SENTRY_TRACES_ROUTE_RATES", {})),
+            "tail_rate": min(app.config.get("SENTRY_TRACES_TAIL_RATE", 0.05), self.max_tail_rate),
+            "slow_threshold_ms": app.config.get("SENTRY_TRACES_SLOW_THRESHOLD_MS", 1000),
+            "max_per_minute": app.config.get("SENTRY_TRACES_MAX_PER_MINUTE", 600),
+        }
+        self.settings = dict(self.defaults)
+        self.refresh_interval = app.config.get("SENTRY_TRACES_SETTINGS_REFRESH", 30)
+        self._loaded_at = None
+        app.extensions["trace_sampler"] = self
+
+    # Settings
+
+    def current_settings(self):
+        """Config defaults merged with runtime overrides, re-read from the database every `refresh_interval`."""
+        now = time.monotonic()
+        if self._loaded_at is None or now - self._loaded_at > self.refresh_interval:
+            try:
+                overrides = self._load_overrides()
+            except Exception as e:
+                logger.warning("Could not load trace sampling settings: %s", e)
+                overrides = {}
+            self.settings = {**self.defaults, **overrides}
+            self._loaded_at = now
+        return self.settings
+
+    def update(self, changes):
+        """Validate and store runtime overrides; returns the new settings. Raises ValueError."""
+        unknown = set(changes) - set(self.defaults)
+        if unknown:
+            raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+        for name in RATE_SETTINGS:
+            if name in changes and not self._is_rate(changes[name]):
+                raise ValueError(f"{name} must be a number between 0 and 1")
+        if changes.get("tail_rate", 0) > self.max_tail_rate:
+            raise ValueError(f"tail_rate must be at most {self.max_tail_rate}")
+        if "route_rates" in changes:
+            rates = changes["route_rates"]
+            if not isinstance(rates, dict):
+                raise ValueError("route_rates must map endpoints to rates")
+            for endpoint, rate in rates.items():
+                if endpoint not in self.app.view_functions:
+                    raise ValueError(f"Unknown endpoint: {endpoint}")
+                if not self._is_rate(rate):
+                    raise ValueError(f"Rate for {endpoint} must be a number between 0 and 1")
+        for name in ("slow_threshold_ms", "max_per_minute"):
+            if name in changes and (not isinstance(changes[name], (int, float)) or changes[name] < 0):
+                raise ValueError(f"{name} must be a non-negative number")
+
+        current = self.current_settings()
+        overrides = {name: current[name] for name in self.defaults if current[name] != self.defaults[name]}
+        overrides.update(changes)
+        if "route_rates" in changes:
+            overrides["route_rates"] = {**current["route_rates"], **changes["route_rates"]}
+        self._store_overrides(overrides)
+        self.settings = {**self.defaults, **overrides}
+        self._loaded_at = time.monotonic()
+        return self.settings
+
+    def reset(self):
+        """Drop runtime overrides and go back to the config defaults."""
+        self._store_overrides(None)
+        self.settings = dict(self.defaults)
+        self._loaded_at = time.monotonic()
+        return self.settings
+
+    def _load_overrides(self):
+        from .models import AppSetting, db
+
+        # Own app context: the sampler also runs outside requests
+        with self.app.app_context(), db.engine.connect() as conn:
+            value = conn.execute(select(AppSetting.value).where(AppSetting.key == SETTINGS_KEY)).scalar()
+        return value or {}
+
+    @staticmethod
+    def _store_overrides(overrides):
+        from .models import AppSetting, db
+
+        setting = db.session.get(AppSetting, SETTINGS_KEY)
+        if overrides is None:
+            if setting is not None:
+                db.session.delete(setting)
+        elif setting is None:
+            db.session.add(AppSetting(key=SETTINGS_KEY, value=overrides))
+        else:
+            setting.value = overrides
+        db.session.commit()
+
+    @staticmethod
+    def _is_rate(value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and 0 <= value <= 1
+
+    # Sampling
+
+    def _endpoint(self, environ):
+        try:
+            endpoint, _ = self.app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return None
+        return endpoint
+
+    @staticmethod
+    def _rates(endpoint, settings):
+        """(route rate, head rate) for an endpoint: the route's own samples plus tail candidates."""
+        rate = settings["route_rates"].get(endpoint, settings["default_rate"])
+        if rate <= 0:
+            return rate, 0.0
+        return rate, rate + (1 - rate) * min(settings["tail_rate"], 1)
+
+    def traces_sampler(self, sampling_context):
+        parent_sampled = sampling_context.get("parent_sampled")
+        if parent_sampled is not None:
+            return float(parent_sampled)
+        environ = sampling_context.get("wsgi_environ")
+        endpoint = self._endpoint(environ) if environ and self.app else None
+        _, head_rate = self._rates(endpoint, self.current_settings())
+        return head_rate
+
+    def before_send_transaction(self, event, hint):
+        settings = self.current_settings()
+        trace = event.get("contexts", {}).get("trace", {})
+        try:
+            duration_ms = (_seconds(event["timestamp"]) - _seconds(event["start_timestamp"])) * 1000
+        except (KeyError, TypeError, ValueError):
+            duration_ms = 0
+
+        if trace.get("status") in ERROR_STATUSES:
+            reason = "sent_error"
+        elif duration_ms >= settings["slow_threshold_ms"]:
+            reason = "sent_slow"
+        else:
+            rate, head_rate = self._rates(event.get("transaction"), settings)
+            if head_rate and random.random() >= rate / head_rate:
+                self._count("dropped")
+                return None
+            reason = "sent_sampled"
+
+        if not self._take_slot(settings["max_per_minute"]):
+            self._count("capped")
+            return None
+        self._count(reason)
+        return event
+
+    def _take_slot(self, limit):
+        minute = int(time.time() // 60)
+        with self._lock:
+            if minute != self._minute:
+                self._minute = minute
+                self._sent_this_minute = 0
+            if self._sent_this_minute >= limit:
+                return False
+            self._sent_this_minute += 1
+            return True
+
+    def _count(self, outcome):
+        with self._lock:
+            self._counters[outcome] += 1
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            sent_this_minute = self._sent_this_minute
+        return {"settings": self.current_settings(), "counters": counters, "sent_this_minute": sent_this_minute}
+
+
+trace_sampler = TraceSampler()
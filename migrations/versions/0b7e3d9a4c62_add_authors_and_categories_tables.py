@@ -0,0 +1,98 @@
+"""Add normalized authors/categories tables and backfill them from books
+
+Revision ID: 0b7e3d9a4c62
+Revises: f29b7c4d1e56
+Create Date: 2026-10-16 19:02:47.318842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b7e3d9a4c62'
+down_revision = 'f29b7c4d1e56'
+branch_labels = None
+depends_on = None
+
+
+# Same normalization as models.name_key()
+NAME_KEY = r"lower(regexp_replace(btrim({name}), '\s+', ' ', 'g'))"
+
+
+def backfill(column, table, link_table, link_column, placeholder, position):
+    """Split books.<column> on ', ' into <table> rows and <link_table> links."""
+    op.execute(f"""
+        INSERT INTO {table} (name, name_key)
+        SELECT DISTINCT ON (key) btrim(name), key
+        FROM (
+            SELECT n AS name, {NAME_KEY.format(name='n')} AS key
+            FROM books, unnest(string_to_array(books.{column}, ', ')) AS n
+        ) names
+        WHERE key <> '' AND btrim(name) <> '{placeholder}'
+        ORDER BY key, name
+        ON CONFLICT (name_key) DO NOTHING
+    """)
+    position_columns = (", position", ", min(t.ord) - 1") if position else ("", "")
+    op.execute(f"""
+        INSERT INTO {link_table} (book_id, {link_column}{position_columns[0]})
+        SELECT b.id, x.id{position_columns[1]}
+        FROM books b
+        CROSS JOIN LATERAL unnest(string_to_array(b.{column}, ', ')) WITH ORDINALITY AS t(name, ord)
+        JOIN {table} x ON x.name_key = {NAME_KEY.format(name='t.name')}
+        GROUP BY b.id, x.id
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def upgrade():
+    op.create_table('authors',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.Text(), nullable=False),
+    sa.Column('name_key', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name_key')
+    )
+    op.create_table('categories',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.Text(), nullable=False),
+    sa.Column('name_key', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name_key')
+    )
+    op.create_table('book_authors',
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('author_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['author_id'], ['authors.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['book_id'], ['books.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('book_id', 'author_id')
+    )
+    op.create_table('book_categories',
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['book_id'], ['books.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('book_id', 'category_id')
+    )
+
+    backfill('authors', 'authors', 'book_authors', 'author_id', 'Unknown Author', position=True)
+    backfill('categories', 'categories', 'book_categories', 'category_id', 'No categories available', position=False)
+
+    # The tables are new, so a plain (non-concurrent) build is cheap here
+    with op.batch_alter_table('book_authors', schema=None) as batch_op:
+        batch_op.create_index('ix_book_authors_author_id_book_id', ['author_id', 'book_id'], unique=False)
+    with op.batch_alter_table('book_categories', schema=None) as batch_op:
+        batch_op.create_index('ix_book_categories_category_id_book_id', ['category_id', 'book_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('book_categories', schema=None) as batch_op:
+        batch_op.drop_index('ix_book_categories_category_id_book_id')
+    with op.batch_alter_table('book_authors', schema=None) as batch_op:
+        batch_op.drop_index('ix_book_authors_author_id_book_id')
+
+    op.drop_table('book_categories')
+    op.drop_table('book_authors')
+    op.drop_table('categories')
+    op.drop_table('authors')
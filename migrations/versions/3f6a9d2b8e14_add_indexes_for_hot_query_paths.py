@@ -0,0 +1,69 @@
+"""Add indexes for hot query paths
+
+Indexes are built with CREATE INDEX CONCURRENTLY so writes to user_books,
+books and book_rankings are not blocked while they build. A failed
+concurrent build leaves an INVALID index behind that IF NOT EXISTS would
+skip, so any such leftover is dropped and rebuilt.
+
+Revision ID: 3f6a9d2b8e14
+Revises: 9c41d7e0a5f2
+Create Date: 2026-10-16 13:05:52.190448
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6a9d2b8e14'
+down_revision = '9c41d7e0a5f2'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    # (name, table, columns, unique)
+    ('ix_user_books_user_id_status', 'user_books', ['user_id', 'status'], False),
+    ('uq_user_books_user_id_book_id', 'user_books', ['user_id', 'book_id'], True),
+    ('ix_book_rankings_list_name_rank', 'book_rankings', ['list_name', 'rank'], False),
+    ('ix_books_title_authors', 'books', ['title', 'authors'], False),
+]
+
+
+def _is_invalid(name):
+    """True if index `name` exists but is INVALID (left by a failed concurrent build)."""
+    return bool(op.get_bind().execute(sa.text("""
+        SELECT 1
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = :name
+          AND c.relnamespace = to_regnamespace(current_schema())
+          AND NOT i.indisvalid
+    """), {"name": name}).scalar())
+
+
+def upgrade():
+    # The unique index can't build while a user has the same book linked twice;
+    # keep the most recent link.
+    op.execute("""
+        DELETE FROM user_books a
+        USING user_books b
+        WHERE a.user_id = b.user_id
+          AND a.book_id = b.book_id
+          AND a.id < b.id
+    """)
+
+    # CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in INDEXES:
+            if _is_invalid(name):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+            op.create_index(name, table, columns, unique=unique,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in reversed(INDEXES):
+            op.drop_index(name, table_name=table,
+                          postgresql_concurrently=True, if_exists=True)
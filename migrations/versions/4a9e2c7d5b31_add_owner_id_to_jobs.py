@@ -0,0 +1,28 @@
+"""Add owner_id to jobs
+
+Revision ID: 4a9e2c7d5b31
+Revises: 8e3b6d0f2a94
+Create Date: 2026-10-17 10:03:17.224906
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a9e2c7d5b31'
+down_revision = '8e3b6d0f2a94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('owner_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('jobs_owner_id_fkey', 'users', ['owner_id'], ['id'], ondelete='SET NULL')
+
+
+def downgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_constraint('jobs_owner_id_fkey', type_='foreignkey')
+        batch_op.drop_column('owner_id')
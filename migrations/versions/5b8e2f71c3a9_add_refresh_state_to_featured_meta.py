@@ -0,0 +1,34 @@
+"""Add refresh state and list dates to featured_meta
+
+Revision ID: 5b8e2f71c3a9
+Revises: d13301d4dad2
+Create Date: 2026-10-16 09:12:31.418022
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8e2f71c3a9'
+down_revision = 'd13301d4dad2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('featured_meta', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('bestsellers_date', sa.Date(), nullable=True))
+        batch_op.add_column(sa.Column('published_date', sa.Date(), nullable=True))
+        batch_op.add_column(sa.Column('refresh_status', sa.String(length=20), server_default='idle', nullable=False))
+        batch_op.add_column(sa.Column('refresh_started_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('refresh_error', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('featured_meta', schema=None) as batch_op:
+        batch_op.drop_column('refresh_error')
+        batch_op.drop_column('refresh_started_at')
+        batch_op.drop_column('refresh_status')
+        batch_op.drop_column('published_date')
+        batch_op.drop_column('bestsellers_date')
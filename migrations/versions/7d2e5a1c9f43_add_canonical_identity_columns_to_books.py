@@ -0,0 +1,86 @@
+"""Add canonical identity columns (volume id, ISBN-10/13, title/author hash) to books
+
+Replaces ix_books_title_authors, which save_book no longer queries. Indexes
+are built with CREATE INDEX CONCURRENTLY.
+
+Revision ID: 7d2e5a1c9f43
+Revises: 0b7e3d9a4c62
+Create Date: 2026-10-16 19:40:13.502716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2e5a1c9f43'
+down_revision = '0b7e3d9a4c62'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    # (name, table, columns, unique)
+    ('ix_books_volume_id', 'books', ['volume_id'], False),
+    ('ix_books_isbn_13', 'books', ['isbn_13'], False),
+    ('ix_books_isbn_10', 'books', ['isbn_10'], False),
+    ('ix_books_identity_hash', 'books', ['identity_hash'], False),
+]
+
+# Same normalization as book_identity.normalize_text()
+NORMALIZED = "btrim(regexp_replace(lower(coalesce({column}, '')), '[^a-z0-9]+', ' ', 'g'))"
+
+
+def upgrade():
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('volume_id', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('isbn_10', sa.String(length=10), nullable=True))
+        batch_op.add_column(sa.Column('isbn_13', sa.String(length=13), nullable=True))
+        batch_op.add_column(sa.Column('identity_hash', sa.String(length=32), nullable=True))
+
+    # Backfill: volume-keyed rows carry their volume id, "isbn_..." rows their ISBN
+    op.execute("""
+        UPDATE books SET volume_id = google_books_id
+        WHERE google_books_id NOT LIKE 'isbn\\_%'
+    """)
+    op.execute("""
+        UPDATE books SET
+            isbn_13 = CASE WHEN length(isbn) = 13 THEN isbn END,
+            isbn_10 = CASE WHEN length(isbn) = 10 THEN isbn END
+        FROM (
+            SELECT id, upper(regexp_replace(substr(google_books_id, 6), '[^0-9Xx]', '', 'g')) AS isbn
+            FROM books
+            WHERE google_books_id LIKE 'isbn\\_%'
+        ) parsed
+        WHERE books.id = parsed.id
+    """)
+    title = NORMALIZED.format(column='title')
+    authors = NORMALIZED.format(column='authors')
+    op.execute(f"""
+        UPDATE books SET identity_hash = md5({title} || '|' || {authors})
+        WHERE {title} NOT IN ('', 'unknown title')
+          AND {authors} NOT IN ('', 'unknown author')
+    """)
+
+    # CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in INDEXES:
+            op.create_index(name, table, columns, unique=unique,
+                            postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_books_title_authors', table_name='books',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_books_title_authors', 'books', ['title', 'authors'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+        for name, table, columns, unique in reversed(INDEXES):
+            op.drop_index(name, table_name=table,
+                          postgresql_concurrently=True, if_exists=True)
+
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.drop_column('identity_hash')
+        batch_op.drop_column('isbn_13')
+        batch_op.drop_column('isbn_10')
+        batch_op.drop_column('volume_id')
@@ -0,0 +1,29 @@
+"""Add app_settings table for runtime settings
+
+Revision ID: 8e3b6d0f2a94
+Revises: d6a1f8c3b527
+Create Date: 2026-10-17 09:12:40.518263
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e3b6d0f2a94'
+down_revision = 'd6a1f8c3b527'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('app_settings',
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('value', sa.JSON(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade():
+    op.drop_table('app_settings')
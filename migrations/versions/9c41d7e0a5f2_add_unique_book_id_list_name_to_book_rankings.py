@@ -0,0 +1,34 @@
+"""Add unique (book_id, list_name) constraint to book_rankings
+
+Revision ID: 9c41d7e0a5f2
+Revises: 5b8e2f71c3a9
+Create Date: 2026-10-16 11:40:07.552930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c41d7e0a5f2'
+down_revision = '5b8e2f71c3a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep only the most recent ranking for any duplicated (book_id, list_name)
+    op.execute("""
+        DELETE FROM book_rankings a
+        USING book_rankings b
+        WHERE a.book_id = b.book_id
+          AND a.list_name = b.list_name
+          AND a.id < b.id
+    """)
+    with op.batch_alter_table('book_rankings', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_book_rankings_book_id_list_name', ['book_id', 'list_name'])
+
+
+def downgrade():
+    with op.batch_alter_table('book_rankings', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_book_rankings_book_id_list_name', type_='unique')
@@ -0,0 +1,26 @@
+"""Add library_version to users
+
+Revision ID: a72c5e9f1d38
+Revises: 3f6a9d2b8e14
+Create Date: 2026-10-16 14:22:10.604517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a72c5e9f1d38'
+down_revision = '3f6a9d2b8e14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('library_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('library_version')
@@ -0,0 +1,47 @@
+"""Add jobs table for the outbound job queue
+
+Revision ID: b48c6f2e7a15
+Revises: 7d2e5a1c9f43
+Create Date: 2026-10-16 20:26:31.094457
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b48c6f2e7a15'
+down_revision = '7d2e5a1c9f43'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('jobs',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.Text(), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('dedup_key', sa.Text(), nullable=True),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_jobs_status_run_at', ['status', 'run_at'], unique=False)
+        batch_op.create_index('uq_jobs_dedup_key_active', ['dedup_key'], unique=True,
+                              postgresql_where=sa.text("status IN ('queued', 'running')"))
+
+
+def downgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_index('uq_jobs_dedup_key_active', postgresql_where=sa.text("status IN ('queued', 'running')"))
+        batch_op.drop_index('ix_jobs_status_run_at')
+
+    op.drop_table('jobs')
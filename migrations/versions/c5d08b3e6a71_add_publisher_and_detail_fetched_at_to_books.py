@@ -0,0 +1,28 @@
+"""Add publisher and detail_fetched_at to books
+
+Revision ID: c5d08b3e6a71
+Revises: a72c5e9f1d38
+Create Date: 2026-10-16 15:48:36.027713
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d08b3e6a71'
+down_revision = 'a72c5e9f1d38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('publisher', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('detail_fetched_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.drop_column('detail_fetched_at')
+        batch_op.drop_column('publisher')
@@ -0,0 +1,26 @@
+"""Add is_admin to users
+
+Revision ID: d6a1f8c3b527
+Revises: b48c6f2e7a15
+Create Date: 2026-10-16 21:08:54.731290
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6a1f8c3b527'
+down_revision = 'b48c6f2e7a15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('is_admin', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('is_admin')
@@ -0,0 +1,33 @@
+"""Add featured_snapshots table
+
+Revision ID: e81f4a6c2b09
+Revises: c5d08b3e6a71
+Create Date: 2026-10-16 17:03:44.861390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e81f4a6c2b09'
+down_revision = 'c5d08b3e6a71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('featured_snapshots',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('bestsellers_date', sa.Date(), nullable=False),
+    sa.Column('published_date', sa.Date(), nullable=True),
+    sa.Column('payload', sa.LargeBinary(), nullable=False),
+    sa.Column('etag', sa.String(length=64), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('bestsellers_date')
+    )
+
+
+def downgrade():
+    op.drop_table('featured_snapshots')
@@ -0,0 +1,63 @@
+"""Add full-text search vector, trigger and GIN index to books
+
+Revision ID: f29b7c4d1e56
+Revises: e81f4a6c2b09
+Create Date: 2026-10-16 18:31:09.774125
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'f29b7c4d1e56'
+down_revision = 'e81f4a6c2b09'
+branch_labels = None
+depends_on = None
+
+
+SEARCH_VECTOR = """
+    setweight(to_tsvector('english', coalesce({row}title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({row}authors, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce({row}categories, '')), 'C') ||
+    setweight(to_tsvector('english', coalesce({row}description, '')), 'D')
+"""
+
+
+def upgrade():
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION books_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {SEARCH_VECTOR.format(row='NEW.')};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER books_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF title, authors, categories, description ON books
+        FOR EACH ROW EXECUTE FUNCTION books_search_vector_update()
+    """)
+
+    # Backfill existing rows
+    op.execute(f"UPDATE books SET search_vector = {SEARCH_VECTOR.format(row='')}")
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_books_search_vector', 'books', ['search_vector'], unique=False,
+                        postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_books_search_vector', table_name='books',
+                      postgresql_concurrently=True, if_exists=True)
+
+    op.execute("DROP TRIGGER IF EXISTS books_search_vector_trigger ON books")
+    op.execute("DROP FUNCTION IF EXISTS books_search_vector_update()")
+
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.drop_column('search_vector')